@@ -2,9 +2,19 @@ from flask import Flask, render_template
 
 app = Flask(__name__)
 
+# Where each model's page is served; the gateway mounts them all on one origin
+app.config['MODEL_URLS'] = {
+    'model1': 'http://127.0.0.1:5000',
+    'model2': 'http://127.0.0.1:5001',
+    'model3': 'http://127.0.0.1:5002',
+    'model4': 'http://127.0.0.1:5003',
+    'model5': 'http://127.0.0.1:5004',
+    'model6': 'http://127.0.0.1:5005',
+}
+
 @app.route('/')
 def dashboard():
-    return render_template('dashboard.html')
+    return render_template('dashboard.html', urls=app.config['MODEL_URLS'])
 
 if __name__ == '__main__':
     app.run(port=5500, debug=True)
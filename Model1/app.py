@@ -1,87 +1,279 @@
-from flask import Flask, request, jsonify, render_template
-import pickle
-import pandas as pd
+from flask import Flask, request, jsonify, render_template, Response, send_from_directory
+import json
+import logging
+import os
+import sys
+import uuid
 import numpy as np
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.metrics import Metrics
+from common.warmup import Warmup
+from forest import FlatForest
+from recommender import load_artifacts, recommend
+from sweep import SweepEngine, axis
+
 # -------------------------
 # Load trained model files
+# (in the background, so / and the health checks answer straight away)
 # -------------------------
-with open('model/model4.pkl', 'rb') as file:
-    model = pickle.load(file)
+logger = logging.getLogger(__name__)
+
+# (model1.bundle when present, otherwise the separate pickles)
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'model')
+
+model = scaler = le = strategies = strategy_codes = sweeper = None
+
+# Prediction backends: 'flat' evaluates the forest from flattened NumPy
+# arrays (same outputs, without sklearn's per-call overhead), 'sklearn' calls
+# model.predict, and 'auto' uses flat up to FLAT_MAX_ROWS feature rows,
+# past which sklearn's compiled traversal is faster. Requests pick one with
+# "backend" / ?backend=.
+BACKENDS = ('auto', 'flat', 'sklearn')
+DEFAULT_BACKEND = os.environ.get('MODEL1_BACKEND', 'auto')
+FLAT_MAX_ROWS = int(os.environ.get('MODEL1_FLAT_MAX_ROWS', 256))
+backends = {}
+
+# What-if sweeps (/sweep): grids up to MAX_SWEEP_CELLS cells, evaluated on
+# SWEEP_WORKERS processes; larger grids go through `python Model1/sweep.py`.
+# Requested effectiveness tensors are written to SWEEPS_DIR, which keeps the
+# newest MAX_SWEEP_TENSORS of them.
+MAX_SWEEP_CELLS = int(os.environ.get('MODEL1_MAX_SWEEP_CELLS', 250000))
+SWEEP_WORKERS = int(os.environ.get('MODEL1_SWEEP_WORKERS', 0)) or None
+SWEEPS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sweeps')
+MAX_SWEEP_TENSORS = max(int(os.environ.get('MODEL1_MAX_SWEEP_TENSORS', 50)), 1)
+
+def load_models():
+    global model, scaler, le, strategies, strategy_codes, sweeper
+    model, scaler, le = load_artifacts(MODEL_DIR)
+    strategies = le.classes_
+    strategy_codes = le.transform(strategies)
+    sweeper = SweepEngine(model, scaler, strategies, strategy_codes, workers=SWEEP_WORKERS)
+    backends['sklearn'] = model
+    try:
+        backends['flat'] = FlatForest.from_sklearn(model)
+    except (AttributeError, ValueError):
+        logger.exception('Cannot flatten the model; serving it through sklearn')
+    # One throwaway prediction per backend pulls in pandas and the predict paths
+    for predictor in backends.values():
+        recommend(predictor, scaler, strategy_codes, [1.0], [1.0])
+
+warmup = Warmup(load_models).start()
 
-with open('model/scaler4.pkl', 'rb') as file:
-    scaler = pickle.load(file)
+# Scenarios predicted per model call when streaming a batch
+STREAM_CHUNK_SIZE = 1000
 
-with open('model/label_encoder4.pkl', 'rb') as file:
-    le = pickle.load(file)
+INVALID_INPUT = 'Invalid input values. Both emissions and cost must be positive.'
 
 # -------------------------
 # Initialize Flask app
 # -------------------------
 app = Flask(__name__)
+app.add_url_rule('/healthz', view_func=warmup.health_view)
+app.add_url_rule('/readyz', view_func=warmup.readiness_view)
+# Latency per route and per stage (features, predict, serialize) at /metrics
+metrics = Metrics('model1').init_app(app).track_warmup(warmup)
+
+def choose_backend(data, scenarios, args=None):
+    """The predictor a request asked for; sklearn when the flat forest is unavailable."""
+    args = request.args if args is None else args
+    name = (data or {}).get('backend') or args.get('backend') or DEFAULT_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"backend must be one of {', '.join(BACKENDS)}")
+    if name == 'auto':
+        name = 'flat' if scenarios * len(strategy_codes) <= FLAT_MAX_ROWS else 'sklearn'
+    return backends.get(name, model)
+
+class InvalidRequest(Exception):
+    """A /predict or /predict/batch body that fails validation; `body` is the JSON answered with 400."""
+
+    def __init__(self, body):
+        super().__init__(body['error'])
+        self.body = body
+
+def parse_predict(data, args):
+    """
+    (predictor, emissions, cost) for a /predict body and query args; raises
+    InvalidRequest. Shared with asgi.py so both serving modes accept the same input.
+    """
+    emissions = float(data.get('emissions', 0))
+    cost = float(data.get('cost', 0))
+    if not (0 < emissions < np.inf and 0 < cost < np.inf):
+        raise InvalidRequest({'error': INVALID_INPUT})
+    try:
+        return choose_backend(data, 1, args), emissions, cost
+    except ValueError as e:
+        raise InvalidRequest({'error': str(e)})
+
+def parse_batch(data, args):
+    """(predictor, emissions, costs, stream) for a /predict/batch body and query args; raises InvalidRequest."""
+    scenarios = data.get('scenarios') if data else None
+    if not isinstance(scenarios, list) or not scenarios:
+        raise InvalidRequest({'error': 'A non-empty list of scenarios is required.'})
+    try:
+        emissions, costs = scenario_arrays(scenarios)
+        invalid = np.flatnonzero(~((emissions > 0) & (costs > 0) & np.isfinite(emissions) & np.isfinite(costs)))
+        if len(invalid):
+            raise InvalidRequest({'error': INVALID_INPUT, 'invalid_scenarios': invalid[:100].tolist()})
+        stream = data.get('stream') or args.get('stream') in ('1', 'true')
+        predictor = choose_backend(data, min(len(emissions), STREAM_CHUNK_SIZE) if stream else len(emissions), args)
+    except (TypeError, ValueError, AttributeError) as e:
+        raise InvalidRequest({'error': str(e)})
+    return predictor, emissions, costs, stream
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
 @app.route('/predict', methods=['POST'])
+@warmup.required
 def predict():
     try:
         # -------------------------
         # Get input data from frontend
         # -------------------------
-        data = request.get_json()
-        emissions = float(data.get('emissions', 0))
-        cost = float(data.get('cost', 0))
-
-        if emissions <= 0 or cost <= 0:
-            return jsonify({'error': 'Invalid input values. Both emissions and cost must be positive.'}), 400
+        try:
+            predictor, emissions, cost = parse_predict(request.get_json(), request.args)
+        except InvalidRequest as e:
+            return jsonify(e.body), 400
 
         # -------------------------
-        # Prepare all strategies for prediction
+        # Predict all strategies, select the best one and return it
         # -------------------------
-        strategies = le.classes_
-        input_data = pd.DataFrame({
-            'Emissions (tonnes)': [emissions] * len(strategies),
-            'Cost (USD)': [cost] * len(strategies),
-            'Strategy': le.transform(strategies),
-            'Cost_per_Tonne': [cost / emissions] * len(strategies),
-            'log_Cost': [np.log1p(cost)] * len(strategies),
-            'log_Emission': [np.log1p(emissions)] * len(strategies)
-        })
+        return jsonify(recommend_one(predictor, emissions, cost))
 
-        # -------------------------
-        # Scale numerical columns
-        # -------------------------
-        numeric_cols = ['Emissions (tonnes)', 'Cost (USD)', 'Cost_per_Tonne', 'log_Cost', 'log_Emission']
-        input_data[numeric_cols] = scaler.transform(input_data[numeric_cols])
+    except Exception as e:
+        logger.exception('Prediction failed')
+        return jsonify({'error': str(e)}), 500
 
-        # -------------------------
-        # Model prediction
-        # -------------------------
-        predicted_effectiveness = model.predict(input_data)
+@app.route('/predict/batch', methods=['POST'])
+@warmup.required
+def predict_batch():
+    """
+    Recommend a strategy for many (emissions, cost) scenarios at once.
 
-        # -------------------------
-        # Select the best strategy
-        # -------------------------
-        best_index = np.argmax(predicted_effectiveness)
-        best_strategy = strategies[best_index]
-        best_effectiveness = predicted_effectiveness[best_index]
+    Body: {"scenarios": [{"emissions": ..., "cost": ...}, ...], "stream": false}
+    With "stream": true (or ?stream=1) results are returned as NDJSON, one
+    line per scenario, predicted STREAM_CHUNK_SIZE scenarios at a time.
+    """
+    try:
+        predictor, emissions, costs, stream = parse_batch(request.get_json(), request.args)
+        if stream:
+            return Response(stream_batch(predictor, emissions, costs), mimetype='application/x-ndjson')
 
-        # Apply a realistic constraint (effectiveness ≤ emissions)
-        best_effectiveness = float(min(best_effectiveness, emissions))
+        return jsonify({'results': batch_results(predictor, emissions, costs)})
 
-        # -------------------------
-        # Return results
-        # -------------------------
-        return jsonify({
-            'best_strategy': best_strategy,
-            'best_effectiveness': round(best_effectiveness, 2)
-        })
+    except InvalidRequest as e:
+        return jsonify(e.body), 400
+    except Exception as e:
+        logger.exception('Batch prediction failed')
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/sweep', methods=['POST'])
+@warmup.required
+def sweep():
+    """
+    Best strategy, capped effectiveness and cost per tonne over an
+    emissions x cost grid, plus the efficient frontier per emissions level.
 
+    Body: {"emissions": {"start": 1000, "stop": 1e7, "num": 50, "scale": "log"},
+           "costs": [10000, 50000, 250000], "tensor": false}
+    With "tensor": true the capped effectiveness of every strategy is saved
+    as an (emissions, costs, strategies) .npy and linked as tensor_url.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        emissions = axis(data.get('emissions'), 'emissions')
+        costs = axis(data.get('costs'), 'costs')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    cells = len(emissions) * len(costs)
+    if cells > MAX_SWEEP_CELLS:
+        return jsonify({'error': f'At most {MAX_SWEEP_CELLS} grid cells per request (got {cells}); '
+                                 'use `python Model1/sweep.py` for larger sweeps'}), 400
+
+    tensor_path = sweep_id = None
+    if data.get('tensor'):
+        os.makedirs(SWEEPS_DIR, exist_ok=True)
+        prune_sweep_tensors(MAX_SWEEP_TENSORS - 1)
+        sweep_id = uuid.uuid4().hex
+        tensor_path = os.path.join(SWEEPS_DIR, f'{sweep_id}.npy')
+    try:
+        result = sweeper.run(emissions, costs, tensor_path)
     except Exception as e:
+        logger.exception('Sweep failed')
         return jsonify({'error': str(e)}), 500
 
+    body = result.to_json()
+    if sweep_id:
+        body['tensor_url'] = f'{request.script_root}/sweeps/{sweep_id}.npy'
+    return jsonify(body)
+
+
+def prune_sweep_tensors(keep):
+    """Delete all but the newest `keep` tensors in SWEEPS_DIR."""
+    tensors = []
+    for entry in os.scandir(SWEEPS_DIR):
+        if entry.name.endswith('.npy'):
+            try:
+                tensors.append((entry.stat().st_mtime, entry.path))
+            except FileNotFoundError:
+                pass
+    tensors.sort(reverse=True)
+    for _, path in tensors[keep:]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            # Another request pruned it first
+            pass
+
+
+@app.route('/sweeps/<sweep_id>.npy', methods=['GET'])
+def get_sweep_tensor(sweep_id):
+    if not sweep_id.isalnum():
+        return jsonify({'error': 'Sweep not found'}), 404
+    return send_from_directory(SWEEPS_DIR, f'{sweep_id}.npy', as_attachment=True,
+                               mimetype='application/octet-stream')
+
+
+def recommend_one(predictor, emissions, cost):
+    """The best strategy for one scenario (effectiveness is capped at emissions)."""
+    best_index, best_effectiveness = recommend(predictor, scaler, strategy_codes, [emissions], [cost])
+    return {
+        'best_strategy': strategies[best_index[0]],
+        'best_effectiveness': round(float(best_effectiveness[0]), 2)
+    }
+
+
+def scenario_arrays(scenarios):
+    """(emissions, costs) arrays of a /predict/batch body's scenarios."""
+    emissions = np.array([float(s.get('emissions', 0)) for s in scenarios])
+    costs = np.array([float(s.get('cost', 0)) for s in scenarios])
+    return emissions, costs
+
+
+def batch_results(predictor, emissions, costs):
+    best_index, best_effectiveness = recommend(predictor, scaler, strategy_codes, emissions, costs)
+    return [_batch_result(i, best_index[i], best_effectiveness[i]) for i in range(len(emissions))]
+
+
+def _batch_result(i, best_index, best_effectiveness):
+    return {
+        'index': i,
+        'best_strategy': strategies[best_index],
+        'best_effectiveness': round(float(best_effectiveness), 2)
+    }
+
+
+def stream_batch(predictor, emissions, costs):
+    for start in range(0, len(emissions), STREAM_CHUNK_SIZE):
+        stop = start + STREAM_CHUNK_SIZE
+        best_index, best_effectiveness = recommend(
+            predictor, scaler, strategy_codes, emissions[start:stop], costs[start:stop])
+        lines = [json.dumps(_batch_result(start + i, best_index[i], best_effectiveness[i]))
+                 for i in range(len(best_index))]
+        yield '\n'.join(lines) + '\n'
+
 
 if __name__ == '__main__':
     app.run(port=5000, debug=True)
@@ -0,0 +1,47 @@
+"""
+ASGI serving mode for Model1 (see common/asgi.py). /predict and
+/predict/batch are answered from the event loop, with the forest on a
+bounded thread pool; every other route is served by the Flask app. Both
+routes validate their input with the Flask app's parse_predict and
+parse_batch, so the two modes accept exactly the same requests.
+
+    cd Model1 && uvicorn asgi:app --port 5000
+    python Model1/asgi.py
+
+MODEL1_ASGI_THREADS forest calls run at once and MODEL1_ASGI_QUEUE more
+may wait; past that, requests are answered 429.
+"""
+import os
+
+import app as service
+from common.asgi import AsgiApp, Stream
+
+app = AsgiApp(service.app, service.metrics, service.warmup,
+              threads=int(os.environ.get('MODEL1_ASGI_THREADS', 4)),
+              queue=int(os.environ.get('MODEL1_ASGI_QUEUE', 64)))
+
+
+@app.route('/predict', ready=True)
+async def predict(request):
+    try:
+        predictor, emissions, cost = service.parse_predict(request.get_json(), request.args)
+    except service.InvalidRequest as e:
+        return e.body, 400
+    return await app.offload.run(service.recommend_one, predictor, emissions, cost)
+
+
+@app.route('/predict/batch', ready=True)
+async def predict_batch(request):
+    try:
+        predictor, emissions, costs, stream = service.parse_batch(request.get_json(), request.args)
+    except service.InvalidRequest as e:
+        return e.body, 400
+
+    if stream:
+        return Stream(service.stream_batch(predictor, emissions, costs), 'application/x-ndjson')
+    return {'results': await app.offload.run(service.batch_results, predictor, emissions, costs)}
+
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, port=5000)
@@ -0,0 +1,92 @@
+import numpy as np
+
+
+class FlatForest:
+    """
+    A fitted RandomForestRegressor (or single DecisionTreeRegressor) as
+    flat NumPy node arrays, evaluated for a whole batch at once.
+
+    All trees' nodes are concatenated; leaves point at themselves, so every
+    sample can take max_depth steps through every tree with fancy indexing
+    and no per-node branching. Inputs are compared as float32 against the
+    float64 thresholds and leaf values are summed tree by tree before
+    dividing, exactly as sklearn does, so predictions match
+    RandomForestRegressor.predict bit for bit (for the default n_jobs,
+    which sums the trees in order).
+
+    It wins on the small batches of a single request, where sklearn's input
+    validation and per-tree dispatch dominate; every cell takes max_depth
+    steps, so for large batches sklearn's compiled traversal is faster.
+    """
+
+    # Cap on samples x trees node indices held per step, to bound memory
+    MAX_CELLS = 1 << 20
+
+    def __init__(self, feature, threshold, children, value, roots, max_depth, n_features):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.n_features_in_ = n_features
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """Flatten a fitted single-output tree regressor or forest of them."""
+        trees = [est.tree_ for est in model.estimators_] if hasattr(model, 'estimators_') else [model.tree_]
+        if any(tree.n_outputs != 1 or tree.value.shape[2] != 1 for tree in trees):
+            raise ValueError('Only single-output regression trees can be flattened')
+
+        sizes = np.array([tree.node_count for tree in trees])
+        offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        feature = np.empty(sizes.sum(), dtype=np.intp)
+        threshold = np.empty(sizes.sum(), dtype=np.float64)
+        children = np.empty((2, sizes.sum()), dtype=np.intp)
+        value = np.empty(sizes.sum(), dtype=np.float64)
+
+        for tree, start, size in zip(trees, offsets, sizes):
+            nodes = slice(start, start + size)
+            own = np.arange(start, start + size)
+            leaf = tree.children_left == -1
+            # Leaves loop back to themselves; their feature/threshold are never looked at twice
+            feature[nodes] = np.where(leaf, 0, tree.feature)
+            threshold[nodes] = np.where(leaf, np.inf, tree.threshold)
+            children[0, nodes] = np.where(leaf, own, tree.children_left + start)
+            children[1, nodes] = np.where(leaf, own, tree.children_right + start)
+            value[nodes] = tree.value[:, 0, 0]
+
+        return cls(feature, threshold, children, value, offsets.astype(np.intp),
+                   max(tree.max_depth for tree in trees), model.n_features_in_)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def leaves(self, X):
+        """Leaf node index per (sample, tree) for float32 inputs X."""
+        rows = np.arange(len(X))[:, None]
+        nodes = np.broadcast_to(self.roots, (len(X), self.n_trees))
+        for _ in range(self.max_depth):
+            go_right = ~(X[rows, self.feature[nodes]] <= self.threshold[nodes])
+            nodes = self.children[go_right.view(np.int8), nodes]
+        return nodes
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f'Expected {self.n_features_in_} features, got shape {X.shape}')
+        # sklearn rejects these too (including values too large for float32)
+        if not np.isfinite(X).all():
+            raise ValueError('Input contains NaN, infinity or a value too large for float32')
+
+        out = np.empty(len(X))
+        step = max(self.MAX_CELLS // self.n_trees, 1)
+        for start in range(0, len(X), step):
+            values = self.value[self.leaves(X[start:start + step])]
+            # Accumulate tree by tree (not a pairwise sum) to reproduce sklearn's rounding
+            total = np.zeros(len(values))
+            for t in range(self.n_trees):
+                total += values[:, t]
+            out[start:start + step] = total / self.n_trees
+        return out
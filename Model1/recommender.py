@@ -0,0 +1,91 @@
+import os
+import pickle
+
+import numpy as np
+
+from common.metrics import timer
+
+# Column order the model was trained on
+FEATURE_COLUMNS = ['Emissions (tonnes)', 'Cost (USD)', 'Strategy', 'Cost_per_Tonne', 'log_Cost', 'log_Emission']
+NUMERIC_COLS = ['Emissions (tonnes)', 'Cost (USD)', 'Cost_per_Tonne', 'log_Cost', 'log_Emission']
+NUMERIC_IDX = [FEATURE_COLUMNS.index(col) for col in NUMERIC_COLS]
+
+# Single-file artefact built with `python -m common.model_bundle pack`; the
+# separate pickles are used when it doesn't exist
+BUNDLE_NAME = 'model1.bundle'
+
+
+def load_artifacts(model_dir):
+    """(model, scaler, label encoder) from model_dir."""
+    bundle_path = os.path.join(model_dir, BUNDLE_NAME)
+    if os.path.isdir(bundle_path):
+        from common.model_bundle import load_bundle
+        bundle = load_bundle(bundle_path).require_features(FEATURE_COLUMNS)
+        return bundle['estimator'], bundle['scaler'], bundle['encoder']
+
+    artifacts = []
+    for name in ('model4.pkl', 'scaler4.pkl', 'label_encoder4.pkl'):
+        with open(os.path.join(model_dir, name), 'rb') as file:
+            artifacts.append(pickle.load(file))
+    return tuple(artifacts)
+
+
+def _frame(values, columns):
+    # pandas is only needed once predictions start, so keep it out of the app's import
+    import pandas as pd
+    return pd.DataFrame(values, columns=columns)
+
+
+def build_features(emissions, costs, strategy_codes, scaler):
+    """
+    Build the scaled feature matrix for N scenarios x S strategies.
+
+    Rows are scenario-major: rows [i*S, (i+1)*S) hold every strategy for
+    scenario i, in the order of strategy_codes.
+    """
+    emissions = np.asarray(emissions, dtype=float)
+    costs = np.asarray(costs, dtype=float)
+    n_strategies = len(strategy_codes)
+
+    e = np.repeat(emissions, n_strategies)
+    c = np.repeat(costs, n_strategies)
+    features = np.empty((len(e), len(FEATURE_COLUMNS)))
+    features[:, 0] = e
+    features[:, 1] = c
+    features[:, 2] = np.tile(strategy_codes, len(emissions))
+    features[:, 3] = c / e
+    features[:, 4] = np.log1p(c)
+    features[:, 5] = np.log1p(e)
+
+    # The scaler was fitted on named columns, so hand it a frame to keep sklearn quiet
+    numeric = _frame(features[:, NUMERIC_IDX], NUMERIC_COLS)
+    features[:, NUMERIC_IDX] = scaler.transform(numeric)
+    return features
+
+
+def predict_strategies(model, scaler, strategy_codes, emissions, costs):
+    """Uncapped predicted effectiveness as an (N scenarios, S strategies) array, in one model call."""
+    emissions = np.asarray(emissions, dtype=float)
+    with timer('features'):
+        features = build_features(emissions, costs, strategy_codes, scaler)
+        # Models fitted on a DataFrame want named columns; FlatForest takes the array as is
+        if getattr(model, 'feature_names_in_', None) is not None:
+            features = _frame(features, FEATURE_COLUMNS)
+    with timer('predict'):
+        predicted = model.predict(features)
+    return predicted.reshape(len(emissions), len(strategy_codes))
+
+
+def recommend(model, scaler, strategy_codes, emissions, costs):
+    """
+    Predict every strategy for every scenario in one model call.
+
+    Returns (best_index, best_effectiveness) arrays of length N, with the
+    effectiveness capped at the scenario's emissions.
+    """
+    emissions = np.asarray(emissions, dtype=float)
+    predicted = predict_strategies(model, scaler, strategy_codes, emissions, costs)
+
+    best_index = predicted.argmax(axis=1)
+    best_effectiveness = predicted[np.arange(len(emissions)), best_index]
+    return best_index, np.minimum(best_effectiveness, emissions)
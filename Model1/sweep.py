@@ -0,0 +1,277 @@
+"""
+What-if sweeps: every neutralisation strategy evaluated over a grid of
+emissions and budgets.
+
+The grid is the Cartesian product of a sorted emissions axis and a sorted
+cost axis. Cells are numbered row-major (cell = emissions index * len(costs)
++ cost index), cut into chunks of CHUNK_CELLS and evaluated on a process
+pool. For each chunk the (cells x strategies) effectiveness matrix is
+predicted in one model call and capped at each cell's emissions with
+np.minimum. Only the per-cell winner (strategy index and capped
+effectiveness) is kept, so memory grows by 6 bytes a cell. The full
+(emissions, costs, strategies) tensor can also be written chunk by chunk
+to a memory-mapped .npy file. A cell's winner is the same strategy
+/predict would recommend for that (emissions, cost) pair.
+
+    python Model1/sweep.py --emissions 1e3 1e7 1000 --costs 1e4 1e9 1000 --log \
+        --workers 4 --out sweep.npz --tensor sweep_tensor.npy
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from recommender import load_artifacts, predict_strategies  # noqa: E402
+
+# Cells per model call (x strategies feature rows)
+CHUNK_CELLS = 20000
+MAX_AXIS_POINTS = 100000
+
+
+def axis(spec, name):
+    """
+    Sorted, distinct positive grid values from a list of numbers or
+    {"start": ..., "stop": ..., "num": ..., "scale": "linear" | "log"}.
+    """
+    if isinstance(spec, dict):
+        try:
+            start, stop, num = float(spec['start']), float(spec['stop']), int(spec['num'])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f'{name} needs numeric start, stop and num')
+        scale = spec.get('scale', 'linear')
+        if scale not in ('linear', 'log'):
+            raise ValueError(f"{name} scale must be 'linear' or 'log'")
+        if not 1 <= num <= MAX_AXIS_POINTS:
+            raise ValueError(f'{name} num must be between 1 and {MAX_AXIS_POINTS}')
+        if start <= 0 or stop <= 0:
+            raise ValueError(f'{name} values must be positive')
+        values = np.geomspace(start, stop, num) if scale == 'log' else np.linspace(start, stop, num)
+    elif isinstance(spec, list):
+        try:
+            values = np.asarray(spec, dtype=float)
+        except (TypeError, ValueError):
+            raise ValueError(f'{name} must be a list of numbers')
+        if values.ndim != 1 or not 1 <= len(values) <= MAX_AXIS_POINTS:
+            raise ValueError(f'{name} must have between 1 and {MAX_AXIS_POINTS} values')
+    else:
+        raise ValueError(f'{name} must be a list of numbers or {{"start", "stop", "num"}}')
+
+    if not np.isfinite(values).all() or (values <= 0).any():
+        raise ValueError(f'{name} values must be positive')
+    return np.unique(values)
+
+
+def evaluate(model, scaler, strategy_codes, emissions, costs, tensor=False):
+    """
+    (best index, capped best effectiveness[, capped effectiveness of every
+    strategy]) for cells given as parallel emissions/costs arrays.
+    """
+    predicted = predict_strategies(model, scaler, strategy_codes, emissions, costs)
+    # The winner is picked before capping, exactly as recommend() does
+    best_index = predicted.argmax(axis=1)
+    capped = np.minimum(predicted, emissions[:, None])
+    best = capped[np.arange(len(emissions)), best_index]
+    return best_index.astype(np.int16), best.astype(np.float32), capped.astype(np.float32) if tensor else None
+
+
+# Model, scaler and strategy codes of a pool worker, set once by the initializer
+_worker = {}
+
+
+def _init_worker(model, scaler, strategy_codes):
+    _worker.update(model=model, scaler=scaler, strategy_codes=strategy_codes)
+
+
+def _evaluate_chunk(emissions, costs, tensor):
+    return evaluate(_worker['model'], _worker['scaler'], _worker['strategy_codes'], emissions, costs, tensor)
+
+
+class SweepResult:
+    def __init__(self, emissions, costs, strategies, best_index, best_effectiveness, seconds, tensor_path=None):
+        self.emissions = emissions
+        self.costs = costs
+        self.strategies = [str(strategy) for strategy in strategies]
+        self.best_index = best_index
+        self.best_effectiveness = best_effectiveness
+        self.seconds = seconds
+        self.tensor_path = tensor_path
+
+    @property
+    def cells(self):
+        return self.best_index.size
+
+    @property
+    def cost_per_tonne(self):
+        """Budget per tonne neutralised by the winning strategy (NaN where it neutralises nothing)."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(self.best_effectiveness > 0, self.costs[None, :] / self.best_effectiveness, np.nan)
+
+    @property
+    def frontier(self):
+        """
+        Efficient frontier mask: for each emissions level, the budgets that
+        neutralise more than every smaller budget does.
+        """
+        reached = np.maximum.accumulate(self.best_effectiveness, axis=1)
+        before = np.concatenate([np.full((len(self.emissions), 1), -np.inf), reached[:, :-1]], axis=1)
+        return self.best_effectiveness > before
+
+    def frontier_points(self):
+        cost_per_tonne = self.cost_per_tonne
+        frontier = self.frontier
+        points = []
+        for i, emissions in enumerate(self.emissions):
+            points.append({'emissions': float(emissions), 'points': [
+                {'cost': float(self.costs[j]),
+                 'strategy': self.strategies[self.best_index[i, j]],
+                 'effectiveness': round(float(self.best_effectiveness[i, j]), 2),
+                 'cost_per_tonne': _number(cost_per_tonne[i, j])}
+                for j in np.flatnonzero(frontier[i])
+            ]})
+        return points
+
+    def to_json(self):
+        cost_per_tonne = self.cost_per_tonne
+        return {
+            'strategies': self.strategies,
+            'emissions': self.emissions.tolist(),
+            'costs': self.costs.tolist(),
+            'cells': self.cells,
+            'seconds': round(self.seconds, 3),
+            # [emissions index][cost index]
+            'best_strategy': self.best_index.tolist(),
+            'best_effectiveness': np.round(self.best_effectiveness.astype(float), 2).tolist(),
+            'cost_per_tonne': [[_number(v) for v in row] for row in cost_per_tonne],
+            'frontier': self.frontier_points(),
+        }
+
+    def save(self, path):
+        """Everything except the tensor as a compressed .npz."""
+        np.savez_compressed(path, emissions=self.emissions, costs=self.costs,
+                            strategies=np.array(self.strategies), best_index=self.best_index,
+                            best_effectiveness=self.best_effectiveness, frontier=self.frontier)
+
+
+def _number(value):
+    return None if np.isnan(value) else round(float(value), 4)
+
+
+class SweepEngine:
+    """
+    Runs sweeps for one loaded model. Grids larger than one chunk go to a
+    process pool that is started on first use in each process (the workers
+    get the model once, through the pool initializer).
+    """
+
+    def __init__(self, model, scaler, strategies, strategy_codes, workers=None, chunk_cells=CHUNK_CELLS):
+        self.model = model
+        self.scaler = scaler
+        self.strategies = [str(strategy) for strategy in strategies]
+        self.strategy_codes = np.asarray(strategy_codes)
+        self.workers = workers or min(os.cpu_count() or 1, 4)
+        self.chunk_cells = chunk_cells
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _executor(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                                 initargs=(self.model, self.scaler, self.strategy_codes))
+            return self._pool
+
+    def _chunks(self, emissions, costs):
+        n_cells = len(emissions) * len(costs)
+        for start in range(0, n_cells, self.chunk_cells):
+            stop = min(start + self.chunk_cells, n_cells)
+            e_idx, c_idx = np.divmod(np.arange(start, stop), len(costs))
+            yield start, stop, emissions[e_idx], costs[c_idx]
+
+    def run(self, emissions, costs, tensor_path=None):
+        """Evaluate the emissions x costs grid (sorted, positive axes; see axis())."""
+        started = time.perf_counter()
+        shape = (len(emissions), len(costs))
+        best_index = np.empty(shape, dtype=np.int16)
+        best = np.empty(shape, dtype=np.float32)
+        tensor = None
+        if tensor_path is not None:
+            tensor = np.lib.format.open_memmap(tensor_path, mode='w+', dtype=np.float32,
+                                               shape=shape + (len(self.strategy_codes),))
+
+        def store(start, stop, result):
+            chunk_index, chunk_best, chunk_tensor = result
+            best_index.reshape(-1)[start:stop] = chunk_index
+            best.reshape(-1)[start:stop] = chunk_best
+            if tensor is not None:
+                tensor.reshape(-1, tensor.shape[-1])[start:stop] = chunk_tensor
+
+        keep_tensor = tensor is not None
+        if best.size <= self.chunk_cells or self.workers == 1:
+            for start, stop, e, c in self._chunks(emissions, costs):
+                store(start, stop, evaluate(self.model, self.scaler, self.strategy_codes, e, c, keep_tensor))
+        else:
+            # At most two chunks per worker in flight, so memory stays bounded for any grid size
+            pool = self._executor()
+            pending = {}
+            for start, stop, e, c in self._chunks(emissions, costs):
+                if len(pending) >= 2 * self.workers:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        store(*pending.pop(future), future.result())
+                pending[pool.submit(_evaluate_chunk, e, c, keep_tensor)] = (start, stop)
+            for future in list(pending):
+                store(*pending.pop(future), future.result())
+
+        if tensor is not None:
+            tensor.flush()
+            del tensor
+        return SweepResult(emissions, costs, self.strategies, best_index, best,
+                           time.perf_counter() - started, tensor_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--emissions', type=float, nargs=3, metavar=('START', 'STOP', 'NUM'), required=True)
+    parser.add_argument('--costs', type=float, nargs=3, metavar=('START', 'STOP', 'NUM'), required=True)
+    parser.add_argument('--log', action='store_true', help='log-spaced axes (default linear)')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-cells', type=int, default=CHUNK_CELLS)
+    parser.add_argument('--model-dir', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'model'))
+    parser.add_argument('--out', help='write the per-cell results to this .npz')
+    parser.add_argument('--tensor', help='write every strategy\'s capped effectiveness to this .npy')
+    args = parser.parse_args()
+
+    scale = 'log' if args.log else 'linear'
+    try:
+        emissions = axis(dict(zip(('start', 'stop', 'num'), args.emissions), scale=scale), 'emissions')
+        costs = axis(dict(zip(('start', 'stop', 'num'), args.costs), scale=scale), 'costs')
+    except ValueError as e:
+        parser.error(str(e))
+
+    model, scaler, le = load_artifacts(args.model_dir)
+    engine = SweepEngine(model, scaler, le.classes_, le.transform(le.classes_), args.workers, args.chunk_cells)
+    result = engine.run(emissions, costs, args.tensor)
+
+    print(f"{result.cells} cells ({len(emissions)} emissions x {len(costs)} costs x {len(engine.strategies)} "
+          f"strategies) in {result.seconds:.2f} s, {result.cells / result.seconds:.0f} cells/s, "
+          f"workers: {engine.workers}")
+    shares = np.bincount(result.best_index.ravel(), minlength=len(engine.strategies)) / result.cells
+    for strategy, share in sorted(zip(engine.strategies, shares), key=lambda item: -item[1]):
+        print(f"  {strategy:>32}: best in {share:.1%} of cells")
+    print(f"  efficient frontier: {int(result.frontier.sum())} cells")
+    if args.out:
+        result.save(args.out)
+        print(f"results written to {args.out}")
+    if args.tensor:
+        print(f"tensor written to {args.tensor}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,47 +1,91 @@
 from flask import Flask, request, jsonify, render_template
-import joblib
-import pandas as pd
+import os
+import sys
 
-# Load the trained model
-model = joblib.load('./model/carbonCreditPrice1.pkl')
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.metrics import Metrics
+from common.model_bundle import load_bundle
+from common.warmup import Warmup
+from pricing import FEATURE_COLUMNS, PriceService
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Single-file artefact built with `python -m common.model_bundle pack`; the
+# pickle is used when it doesn't exist
+BUNDLE_PATH = os.path.join(BASE_DIR, 'model', 'model2.bundle')
+
+# Cached pricing on top of the model; numeric inputs are rounded to
+# PRICE_PRECISION decimals before lookup
+PRICE_PRECISION = int(os.environ.get('MODEL2_PRICE_PRECISION', 2))
+MAX_PORTFOLIO_SIZE = 10000
+
+model = prices = None
+
+def load_models():
+    """Load the trained model (in the background, see common.warmup)."""
+    global model, prices
+    if os.path.isdir(BUNDLE_PATH):
+        model = load_bundle(BUNDLE_PATH).require_features(FEATURE_COLUMNS)['estimator']
+    else:
+        import joblib
+        model = joblib.load(os.path.join(BASE_DIR, 'model', 'carbonCreditPrice1.pkl'))
+    prices = PriceService(model, precision=PRICE_PRECISION,
+                          cache_size=int(os.environ.get('MODEL2_CACHE_SIZE', 10000)),
+                          ttl=float(os.environ.get('MODEL2_CACHE_TTL', 3600)))
+    metrics.track_cache('prices', prices)
+
+warmup = Warmup(load_models)
 
 # Initialize Flask app
 app = Flask(__name__)
+app.add_url_rule('/healthz', view_func=warmup.health_view)
+app.add_url_rule('/readyz', view_func=warmup.readiness_view)
+# Latency per route, the predict stage and the price cache at /metrics
+metrics = Metrics('model2').init_app(app).track_warmup(warmup)
+warmup.start()
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
 @app.route('/predict', methods=['POST'])
+@warmup.required
 def predict():
     # Get input data from the request
     data = request.get_json()
-    offset_method = data.get('offset_method')
-    project_location = data.get('project_location')
-    verification_status = data.get('verification_status')
-    technology_used = data.get('technology_used')
-    emission_reduction = data.get('emission_reduction')
-    project_size = data.get('project_size')
-    
-    if not all([offset_method, project_location, verification_status, technology_used, emission_reduction, project_size]):
-        return jsonify({'error': 'Missing input data'}), 400
-
-    # Prepare the data for prediction
-    input_data = {
-        'OffsetMethod': [offset_method],
-        'ProjectLocation': [project_location],
-        'VerificationStatus': [verification_status],
-        'TechnologyUsed': [technology_used],
-        'EmissionReduction': [emission_reduction],
-        'ProjectSize': [project_size]
-    }
-    df = pd.DataFrame(input_data)
-
-    # Predict the carbon credit price
-    predicted_price = model.predict(df)
-    predicted_price = predicted_price[0] * 8.1  # Convert to INR
-
-    return jsonify({'predicted_price': round(predicted_price, 2)})
+
+    # Predict the carbon credit price (in INR)
+    try:
+        predicted_price = prices.price(data or {})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({'predicted_price': predicted_price})
+
+@app.route('/predict/batch', methods=['POST'])
+@warmup.required
+def predict_batch():
+    # {"projects": [{"offset_method": ..., "project_location": ..., ...}, ...]}
+    data = request.get_json(silent=True) or {}
+    projects = data.get('projects')
+    if not isinstance(projects, list) or not projects:
+        return jsonify({'error': 'A non-empty list of projects is required'}), 400
+    if len(projects) > MAX_PORTFOLIO_SIZE:
+        return jsonify({'error': f'At most {MAX_PORTFOLIO_SIZE} projects per request'}), 400
+
+    try:
+        predicted = prices.price_many(projects)
+    except (ValueError, AttributeError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({
+        'predicted_prices': predicted,
+        'total_price': round(sum(predicted), 2)
+    })
+
+@app.route('/cache-stats')
+@warmup.required
+def cache_stats():
+    return jsonify(prices.stats())
 
 if __name__ == '__main__':
     app.run(port=5001,debug=True)
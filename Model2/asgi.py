@@ -0,0 +1,62 @@
+"""
+ASGI serving mode for Model2 (see common/asgi.py). /predict and
+/predict/batch are validated and looked up in the price cache on the event
+loop; only cache misses go to the model on a bounded thread pool. Every
+other route is served by the Flask app.
+
+    cd Model2 && uvicorn asgi:app --port 5001
+    python Model2/asgi.py
+
+MODEL2_ASGI_THREADS model calls run at once and MODEL2_ASGI_QUEUE more
+may wait; past that, requests are answered 429.
+"""
+import os
+
+import app as service
+from common.asgi import AsgiApp
+
+app = AsgiApp(service.app, service.metrics, service.warmup,
+              threads=int(os.environ.get('MODEL2_ASGI_THREADS', 4)),
+              queue=int(os.environ.get('MODEL2_ASGI_QUEUE', 64)))
+
+
+async def price_many(projects):
+    keys, prices = service.prices.lookup(projects)
+    if None in prices:
+        prices = await app.offload.run(service.prices.fill, keys, prices)
+    return prices
+
+
+@app.route('/predict', ready=True)
+async def predict(request):
+    data = request.get_json()
+    try:
+        predicted = await price_many([data or {}])
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    return {'predicted_price': predicted[0]}
+
+
+@app.route('/predict/batch', ready=True)
+async def predict_batch(request):
+    data = request.get_json(silent=True) or {}
+    projects = data.get('projects')
+    if not isinstance(projects, list) or not projects:
+        return {'error': 'A non-empty list of projects is required'}, 400
+    if len(projects) > service.MAX_PORTFOLIO_SIZE:
+        return {'error': f'At most {service.MAX_PORTFOLIO_SIZE} projects per request'}, 400
+
+    try:
+        predicted = await price_many(projects)
+    except (ValueError, AttributeError) as e:
+        return {'error': str(e)}, 400
+
+    return {
+        'predicted_prices': predicted,
+        'total_price': round(sum(predicted), 2)
+    }
+
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, port=5001)
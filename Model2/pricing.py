@@ -0,0 +1,183 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from common.metrics import timer
+
+CATEGORICAL_COLS = ['OffsetMethod', 'ProjectLocation', 'VerificationStatus', 'TechnologyUsed']
+NUMERICAL_COLS = ['EmissionReduction', 'ProjectSize']
+# Columns of the frames handed to the pipeline
+FEATURE_COLUMNS = CATEGORICAL_COLS + NUMERICAL_COLS
+
+# Request field -> model column
+FIELDS = {
+    'offset_method': 'OffsetMethod',
+    'project_location': 'ProjectLocation',
+    'verification_status': 'VerificationStatus',
+    'technology_used': 'TechnologyUsed',
+    'emission_reduction': 'EmissionReduction',
+    'project_size': 'ProjectSize',
+}
+
+USD_TO_INR = 8.1
+
+
+def _frame(rows, columns):
+    # pandas is only needed once the service is built, so keep it out of the app's import
+    import pandas as pd
+    return pd.DataFrame(rows, columns=columns)
+
+
+class PriceCache:
+    """Bounded LRU of final prices whose entries also expire after ttl seconds."""
+
+    def __init__(self, max_entries=10000, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, price):
+        with self._lock:
+            self._entries[key] = (price, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+class PriceService:
+    """
+    Carbon credit pricing on top of the trained preprocessing + forest pipeline.
+
+    The one-hot encoding of every combination of the known categories is
+    computed once up front, so a request only scales its two numeric fields
+    before calling the forest. Final prices are cached on the normalized
+    inputs, with the numeric fields rounded to `precision` decimals.
+    """
+
+    def __init__(self, pipeline, precision=2, cache_size=10000, ttl=3600):
+        self.pipeline = pipeline
+        self.precision = precision
+        self.cache = PriceCache(cache_size, ttl)
+        self.vocabulary = {col: [] for col in CATEGORICAL_COLS}
+        self._spelling = {col: {} for col in CATEGORICAL_COLS}
+        self._encoded = {}
+        self._fast_path = self._prepare(pipeline)
+
+    def _prepare(self, pipeline):
+        # Expected layout: Pipeline(preprocessor=ColumnTransformer(num=scaler, cat=one-hot), model=regressor).
+        # Anything else falls back to pipeline.predict.
+        try:
+            preprocessor = pipeline.named_steps['preprocessor']
+            self.regressor = pipeline.named_steps['model']
+            self.scaler = preprocessor.named_transformers_['num']
+            self.encoder = preprocessor.named_transformers_['cat']
+            self.layout = [name for name, _, _ in preprocessor.transformers_ if name in ('num', 'cat')]
+        except (AttributeError, KeyError):
+            return False
+        if sorted(self.layout) != ['cat', 'num'] or list(getattr(self.encoder, 'feature_names_in_', CATEGORICAL_COLS)) != CATEGORICAL_COLS:
+            return False
+
+        self.vocabulary = {col: [str(c) for c in cats] for col, cats in zip(CATEGORICAL_COLS, self.encoder.categories_)}
+        self._spelling = {col: {v.lower(): v for v in values} for col, values in self.vocabulary.items()}
+        combos = list(itertools.product(*self.vocabulary.values()))
+        encoded = self._dense(self.encoder.transform(_frame(combos, CATEGORICAL_COLS)))
+        self._encoded = dict(zip(combos, encoded))
+        return True
+
+    @staticmethod
+    def _dense(matrix):
+        return matrix.toarray() if hasattr(matrix, 'toarray') else np.asarray(matrix)
+
+    def normalize(self, project):
+        """
+        Validate one request dict and return its cache key:
+        (OffsetMethod, ProjectLocation, VerificationStatus, TechnologyUsed, EmissionReduction, ProjectSize)
+        """
+        missing = [field for field in FIELDS if project.get(field) in (None, '')]
+        if missing:
+            raise ValueError('Missing input data: ' + ', '.join(missing))
+
+        categories = []
+        for field, col in list(FIELDS.items())[:4]:
+            value = str(project[field]).strip()
+            # Match the trained spelling regardless of case
+            categories.append(self._spelling[col].get(value.lower(), value))
+        numbers = [round(float(project[field]), self.precision) for field in ('emission_reduction', 'project_size')]
+        return tuple(categories) + tuple(numbers)
+
+    def _predict(self, keys):
+        """Model prices (in USD) for normalized keys, in one forest call."""
+        frame = _frame(keys, FEATURE_COLUMNS)
+        if not self._fast_path:
+            return self.pipeline.predict(frame)
+
+        numeric = self._dense(self.scaler.transform(frame[NUMERICAL_COLS]))
+        categorical = np.array([self._encode(frame, i, key[:4]) for i, key in enumerate(keys)])
+        parts = {'num': numeric, 'cat': categorical}
+        return self.regressor.predict(np.hstack([parts[name] for name in self.layout]))
+
+    def _encode(self, frame, i, combo):
+        encoded = self._encoded.get(combo)
+        if encoded is None:
+            # Unknown category: the encoder ignores it (all zeros), not worth caching
+            encoded = self._dense(self.encoder.transform(frame.iloc[[i]][CATEGORICAL_COLS]))[0]
+        return encoded
+
+    def price(self, project):
+        return self.price_many([project])[0]
+
+    def price_many(self, projects):
+        """Prices in INR for a list of request dicts; cached ones skip the model."""
+        return self.fill(*self.lookup(projects))
+
+    def lookup(self, projects):
+        """(keys, prices): validated cache keys and the cached prices, None where the model is needed."""
+        keys = [self.normalize(project) for project in projects]
+        return keys, [self.cache.get(key) for key in keys]
+
+    def fill(self, keys, prices):
+        """Predict and cache the prices lookup() left as None."""
+        todo = [i for i, price in enumerate(prices) if price is None]
+        if todo:
+            with timer('predict'):
+                predicted = self._predict([keys[i] for i in todo])
+            for i, usd in zip(todo, predicted):
+                prices[i] = round(float(usd) * USD_TO_INR, 2)  # Convert to INR
+                self.cache.put(keys[i], prices[i])
+        return prices
+
+    def stats(self):
+        stats = self.cache.stats()
+        stats['precision'] = self.precision
+        stats['encoded_combinations'] = len(self._encoded)
+        return stats
@@ -1,29 +1,97 @@
-from flask import Flask, render_template, jsonify
-import pandas as pd
+from flask import Flask, render_template, jsonify, request
+import os
+import sys
 import numpy as np
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.columnar import load_table
+from common.metrics import Metrics, timer
+from common.response_cache import ResponseCache
+from leaderboard import Leaderboard, METRICS
+
 
 app = Flask(__name__)
 
-# Load CSV data
-df = pd.read_csv('./static/rankings.csv')
+# Load CSV data (memory-mapped from static/rankings.store when it is up to date)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+df = load_table(os.path.join(BASE_DIR, 'static', 'rankings.csv'))
+leaderboard = Leaderboard(df)
+
+# The rankings never change while the process runs, so entries stay valid
+response_cache = ResponseCache(max_entries=256)
+
+# Latency per route, the aggregate/serialize stages and the cache at /metrics
+metrics = Metrics('model3').init_app(app).track_cache('responses', response_cache)
+
+MAX_LIMIT = 1000
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
 @app.route('/data')
+@response_cache.cached
 def data():
     # Select specific columns
     columns = ['CompanyID', 'CompanyName', 'Emission_Intensity', 'Green_Investment_Ratio', 'RenewableEnergyUsage_MWh', 'CoalProduced_Tons']
     
-    # Replace NaN with None for JSON compatibility
-    df_cleaned = df[columns].replace({np.nan: None})
-    
-    # Convert to JSON-friendly format
-    data = df_cleaned.to_dict(orient='records')
+    # Replace NaN with None for JSON compatibility (object dtype so the
+    # categorical columns from the columnar store accept None as well)
+    with timer('aggregate'):
+        df_cleaned = df[columns].astype(object).replace({np.nan: None})
+
+        # Convert to JSON-friendly format
+        data = df_cleaned.to_dict(orient='records')
     
     return jsonify(data)
 
+@app.route('/api/leaderboard')
+@response_cache.cached
+def query_leaderboard():
+    """
+    One page of the ranking, sorted and filtered on the server.
+
+    /api/leaderboard?sort_by=Emission_Intensity&order=asc&limit=50&offset=0
+        &min_CoalProduced_Tons=100000&max_Emission_Intensity=2.5
+    """
+    sort_by = request.args.get('sort_by', 'Emission_Intensity')
+    order = request.args.get('order', 'asc')
+    if sort_by not in METRICS:
+        return jsonify({'error': f"sort_by must be one of {', '.join(METRICS)}"}), 400
+    if order not in ('asc', 'desc'):
+        return jsonify({'error': "order must be 'asc' or 'desc'"}), 400
+
+    try:
+        limit = min(max(int(request.args.get('limit', 50)), 1), MAX_LIMIT)
+        offset = max(int(request.args.get('offset', 0)), 0)
+        filters = {}
+        for col in METRICS:
+            low = request.args.get(f'min_{col}')
+            high = request.args.get(f'max_{col}')
+            if low is not None or high is not None:
+                filters[col] = (float(low) if low is not None else None,
+                                float(high) if high is not None else None)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    with timer('aggregate'):
+        total, rows = leaderboard.query(sort_by, order, limit, offset, filters)
+        records = leaderboard.records(rows)
+    for i, record in enumerate(records):
+        record['rank'] = offset + i + 1
+
+    return jsonify({
+        'total': total,
+        'sort_by': sort_by,
+        'order': order,
+        'limit': limit,
+        'offset': offset,
+        'rows': records
+    })
+
+@app.route('/api/cache-stats')
+def cache_stats():
+    return response_cache.stats_view()
+
 if __name__ == '__main__':
     app.run(port=5002, debug=True)
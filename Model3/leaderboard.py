@@ -0,0 +1,71 @@
+import numpy as np
+
+# Columns returned for each company and the metrics that can be sorted/filtered on
+COLUMNS = ['CompanyID', 'CompanyName', 'Emission_Intensity', 'Green_Investment_Ratio', 'RenewableEnergyUsage_MWh', 'CoalProduced_Tons']
+METRICS = ['Emission_Intensity', 'Green_Investment_Ratio', 'RenewableEnergyUsage_MWh', 'CoalProduced_Tons']
+
+
+class Leaderboard:
+    """
+    Rank indexes over the rankings table, built once at load.
+
+    For every metric we keep the row order sorted ascending and descending
+    (missing values always last) plus each row's position in that order, so
+    an unfiltered page is a slice and a filtered top-k is a partial
+    selection over the matching rows' positions.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self.values = {}
+        self.order = {}
+        self.rank = {}
+        n = len(df)
+        for col in METRICS:
+            values = df[col].to_numpy(dtype=float)
+            valid = np.flatnonzero(~np.isnan(values))
+            missing = np.flatnonzero(np.isnan(values))
+            asc = valid[np.argsort(values[valid], kind='stable')]
+            self.values[col] = values
+            self.order[col, 'asc'] = np.concatenate([asc, missing])
+            self.order[col, 'desc'] = np.concatenate([asc[::-1], missing])
+            for direction in ('asc', 'desc'):
+                rank = np.empty(n, dtype=np.int64)
+                rank[self.order[col, direction]] = np.arange(n)
+                self.rank[col, direction] = rank
+
+    def query(self, sort_by, order='asc', limit=50, offset=0, filters=None):
+        """
+        Return (total matching rows, row positions for the requested page).
+
+        filters maps a metric to a (min, max) pair; either bound may be None.
+        """
+        mask = None
+        for col, (low, high) in (filters or {}).items():
+            values = self.values[col]
+            cond = ~np.isnan(values)
+            if low is not None:
+                cond &= values >= low
+            if high is not None:
+                cond &= values <= high
+            mask = cond if mask is None else mask & cond
+
+        if mask is None:
+            return len(self.df), self.order[sort_by, order][offset:offset + limit]
+
+        candidates = np.flatnonzero(mask)
+        ranks = self.rank[sort_by, order][candidates]
+        k = min(offset + limit, len(candidates))
+        if k == 0:
+            return len(candidates), candidates[:0]
+        if k < len(candidates):
+            # Only the first k positions matter: select them without sorting the rest
+            top = np.argpartition(ranks, k - 1)[:k]
+        else:
+            top = np.arange(len(candidates))
+        top = top[np.argsort(ranks[top])]
+        return len(candidates), candidates[top[offset:]]
+
+    def records(self, rows):
+        page = self.df.iloc[rows][COLUMNS].astype(object)
+        return page.where(page.notna(), None).to_dict(orient='records')
@@ -1,19 +1,53 @@
-from flask import Flask, request, render_template, jsonify
-import pandas as pd
+from flask import Flask, request, render_template, jsonify, send_from_directory
+import json
 import os
-import matplotlib.pyplot as plt
-from io import BytesIO
-import base64
+import sys
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.metrics import Metrics, timer
+from credits import PREVIEW_ROWS, read_page
+from charts import ChartRenderer
+from batch import BatchJobs, calculate, load_totals, result_key, save_stream
 
 app = Flask(__name__)
+# Latency per route and the process/render/serialize stages at /metrics
+metrics = Metrics('model4').init_app(app)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 # Configure upload folder
-UPLOAD_FOLDER = 'uploads'
+UPLOAD_FOLDER = os.path.join(BASE_DIR, 'uploads')
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 
 if not os.path.exists(UPLOAD_FOLDER):
     os.makedirs(UPLOAD_FOLDER)
 
+# Processed results (<id>.csv) and their totals (<id>.json)
+OUTPUT_FOLDER = os.path.join(BASE_DIR, 'outputs')
+os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+
+MAX_PAGE_SIZE = 1000
+
+# Rendered charts, named by a hash of the uploaded file
+CHARTS_FOLDER = os.path.join(BASE_DIR, 'charts')
+charts = ChartRenderer(CHARTS_FOLDER, max_workers=2)
+
+# Multi-file and archive uploads, processed in the background
+batches = BatchJobs(UPLOAD_FOLDER, OUTPUT_FOLDER, charts=charts,
+                    max_workers=int(os.environ.get('MODEL4_BATCH_WORKERS', 0)) or None)
+# A batch request can wait up to BATCH_SYNC_WAIT seconds for its job before answering 202
+BATCH_SYNC_WAIT = 30
+
+def with_urls(totals):
+    """Result totals plus the links for this request's mount point."""
+    root = request.script_root
+    return dict(totals,
+                result_url=f"{root}/results/{totals['result_id']}",
+                download_url=f"{root}/results/{totals['result_id']}/download",
+                chart_url=f"{root}/charts/{totals['chart_key']}.png" if totals.get('chart_key')
+                else totals.get('chart_url'))
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -22,75 +56,129 @@ def index():
 def upload_file():
     if 'file' not in request.files:
         return jsonify({'error': 'No file part'})
-    
+
     file = request.files['file']
-    
+
     if file.filename == '':
         return jsonify({'error': 'No selected file'})
-    
+
     if file:
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], file.filename)
-        file.save(file_path)
-        
-        # Read the CSV file
-        df = pd.read_csv(file_path)
-        
-        # Calculate emissions for each gas
-        df['Emissions_CO2'] = df['Activity'] * df['Emission_Factor_CO2']
-        df['Emissions_CH4'] = df['Activity'] * df['Emission_Factor_CH4']
-        df['Emissions_N2O'] = df['Activity'] * df['Emission_Factor_N2O']
-        df['Emissions_HFCs'] = df['Activity'] * df['Emission_Factor_HFCs']
-        df['Emissions_PFCs'] = df['Activity'] * df['Emission_Factor_PFCs']
-        df['Emissions_SF6'] = df['Activity'] * df['Emission_Factor_SF6']
-
-        # Convert to CO2 equivalents
-        df['CO2_eq_CO2'] = df['Emissions_CO2'] * df['GWP_CO2']
-        df['CO2_eq_CH4'] = df['Emissions_CH4'] * df['GWP_CH4']
-        df['CO2_eq_N2O'] = df['Emissions_N2O'] * df['GWP_N2O']
-        df['CO2_eq_HFCs'] = df['Emissions_HFCs'] * df['GWP_HFCs']
-        df['CO2_eq_PFCs'] = df['Emissions_PFCs'] * df['GWP_PFCs']
-        df['CO2_eq_SF6'] = df['Emissions_SF6'] * df['GWP_SF6']
-
-        # Calculate total CO2 equivalent emissions (carbon offset)
-        df['Carbon Offset'] = (df['CO2_eq_CO2'] + df['CO2_eq_CH4'] + df['CO2_eq_N2O'] +
-                               df['CO2_eq_HFCs'] + df['CO2_eq_PFCs'] + df['CO2_eq_SF6'])  # Convert to tons
-
-        # Assuming 1 carbon credit equals 1 ton of CO2
-        df['Carbon_Credits'] = df['Carbon Offset'] / 1000 
-
-        # Generate the plot
-        plt.figure(figsize=(12, 6))
-
-        # Emissions Breakdown
-        plt.subplot(1, 2, 1)
-        plt.bar(df.index, df[['CO2_eq_CO2', 'CO2_eq_CH4', 'CO2_eq_N2O', 'CO2_eq_HFCs', 'CO2_eq_PFCs', 'CO2_eq_SF6']].sum(axis=1), color='c')
-        plt.xlabel('Index')
-        plt.ylabel('Carbon Offset Generated (tons)')
-        plt.title('Emissions Breakdown by Source')
-
-        # Carbon Credits
-        plt.subplot(1, 2, 2)
-        plt.bar(df.index, df['Carbon_Credits'], color='g')
-        plt.xlabel('Index')
-        plt.ylabel('Carbon Credits')
-        plt.title('Carbon Credits Earned')
-
-        plt.tight_layout()
-
-        # Save the plot to a BytesIO object
-        img = BytesIO()
-        plt.savefig(img, format='png')
-        img.seek(0)
-
-        # Encode the plot to display on the frontend
-        plot_url = base64.b64encode(img.getvalue()).decode('utf8')
-
-        # Convert dataframe to HTML table
-        result_table = df.to_html(index=False, classes="table table-bordered")
-
-        return render_template('index.html', table=result_table, plot_url=plot_url)
+        # A unique name, so concurrent uploads of the same file name cannot clash
+        file_path, digest, _ = save_stream(file.stream, app.config['UPLOAD_FOLDER'])
+        try:
+            # Results are named by content: a file processed before is not processed again
+            result_id = result_key(digest)
+            totals = load_totals(OUTPUT_FOLDER, result_id)
+            if totals is not None:
+                result_path = os.path.join(OUTPUT_FOLDER, f'{result_id}.csv')
+                df = read_page(result_path, 1, PREVIEW_ROWS) if totals['rows'] else None
+                # Redraw the chart if its first render failed or the image was removed
+                if totals.get('chart_key'):
+                    charts.submit_result(totals['chart_key'], result_path)
+            else:
+                # Stream the CSV through the calculation chunk by chunk
+                try:
+                    with timer('process'):
+                        totals, df, binner = calculate(file_path, OUTPUT_FOLDER, digest, preview_rows=PREVIEW_ROWS)
+                except (KeyError, ValueError) as e:
+                    return jsonify({'error': str(e)}), 400
+                # Draw the chart in the background; the page links to it by URL
+                charts.submit(totals['chart_key'], binner)
+        finally:
+            os.remove(file_path)
+
+        totals = with_urls(totals)
+        if request.args.get('format') == 'json':
+            return jsonify(totals)
+
+        # Convert the preview rows to an HTML table
+        with timer('render'):
+            result_table = df.to_html(index=False, classes="table table-bordered") if df is not None else None
+
+        return render_template('index.html', table=result_table, plot_url=totals['chart_url'], totals=totals,
+                               preview_rows=PREVIEW_ROWS)
 
     return jsonify({'error': 'File upload failed'})
 
+def batch_response(job):
+    for entry in job['files']:
+        if entry['totals'] is not None:
+            entry.update(with_urls(dict(entry['totals'], result_id=entry['result_id'], chart_key=entry['chart_key'])))
+            del entry['totals']
+    body = {'job': job, 'status_url': f"{request.script_root}/upload/batch/{job['id']}"}
+    if job['status'] == 'failed':
+        return jsonify(dict(body, error=job['error'])), 500
+    return jsonify(body), 200 if job['status'] == 'done' else 202
+
+@app.route('/upload/batch', methods=['POST'])
+def upload_batch():
+    """
+    Several activity CSVs and/or zip/tar archives of them, as multipart
+    'files' (or 'file') fields: /upload/batch?wait=10
+
+    Answers 202 with the job and a status_url to poll right away, or once
+    `wait` seconds (BATCH_SYNC_WAIT at most) pass without it finishing. A
+    finished job has per-file and consolidated totals.
+    """
+    files = [f for f in request.files.getlist('files') + request.files.getlist('file') if f.filename]
+    if not files:
+        return jsonify({'error': 'No selected file'}), 400
+    try:
+        wait = min(max(float(request.args.get('wait', 0)), 0), BATCH_SYNC_WAIT)
+    except ValueError:
+        return jsonify({'error': 'wait must be a number of seconds'}), 400
+
+    uploads = []
+    for file in files:
+        path, digest, _ = save_stream(file.stream, app.config['UPLOAD_FOLDER'])
+        uploads.append((file.filename, path, digest))
+    job = batches.submit(uploads)
+    if wait:
+        job = batches.wait(job['id'], wait)
+    return batch_response(job)
+
+@app.route('/upload/batch/<job_id>', methods=['GET'])
+def batch_status(job_id):
+    job = batches.get(job_id) if job_id.isalnum() else None
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return batch_response(job)
+
+@app.route('/results/<result_id>', methods=['GET'])
+def get_results(result_id):
+    """Totals plus one page of rows: /results/<id>?page=1&per_page=100"""
+    totals_path = os.path.join(OUTPUT_FOLDER, f'{result_id}.json')
+    if not result_id.isalnum() or not os.path.exists(totals_path):
+        return jsonify({'error': 'Result not found'}), 404
+
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 100, type=int), 1), MAX_PAGE_SIZE)
+
+    with open(totals_path) as f:
+        totals = json.load(f)
+    rows = read_page(os.path.join(OUTPUT_FOLDER, f'{result_id}.csv'), page, per_page) if totals['rows'] else None
+    return jsonify({
+        'totals': with_urls(totals),
+        'page': page,
+        'per_page': per_page,
+        'rows': rows.replace({np.nan: None}).to_dict(orient='records') if rows is not None else []
+    })
+
+@app.route('/charts/<key>.png', methods=['GET'])
+def get_chart(key):
+    if not key.isalnum() or not charts.wait(key):
+        return jsonify({'error': 'Chart not found'}), 404
+    # Content-addressed, so the image at this URL never changes
+    response = send_from_directory(CHARTS_FOLDER, f'{key}.png', max_age=31536000)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+@app.route('/results/<result_id>/download', methods=['GET'])
+def download_results(result_id):
+    if not result_id.isalnum():
+        return jsonify({'error': 'Result not found'}), 404
+    return send_from_directory(OUTPUT_FOLDER, f'{result_id}.csv', as_attachment=True,
+                               download_name='carbon_credits.csv')
+
 if __name__ == '__main__':
     app.run(port=5003, debug=True)
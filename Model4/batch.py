@@ -0,0 +1,327 @@
+"""
+Batch uploads for the credit calculator: several activity CSVs, or zip/tar
+archives of them, processed as one background job.
+
+Uploads are saved under unique names, and CSVs are pulled out of archives
+member by member into more of them (nothing is extracted by its archive
+path). Each file is identified by the SHA-256 of its content, and its
+result id is derived from that digest, so a file that was processed
+before, by an earlier job or a single /upload, is skipped and its saved
+totals are reused. The remaining files are processed in parallel on a
+process pool. A job's state, with per-file and consolidated totals, is
+written to outputs/jobs/<id>.json after every file, so any worker can
+answer a status poll.
+"""
+import hashlib
+import json
+import logging
+import os
+import tarfile
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+from charts import RowBinner, chart_key
+from credits import GASES, process_csv
+
+logger = logging.getLogger(__name__)
+
+# Bump when the calculation changes so earlier results are not reused
+RESULT_VERSION = 1
+
+# Limits per batch, archives included
+MAX_BATCH_FILES = int(os.environ.get('MODEL4_MAX_BATCH_FILES', 500))
+MAX_BATCH_BYTES = int(os.environ.get('MODEL4_MAX_BATCH_BYTES', 4 << 30))
+
+BLOCK_SIZE = 1 << 20
+
+
+def result_key(digest):
+    return hashlib.sha256(f'{digest}:{RESULT_VERSION}'.encode()).hexdigest()[:40]
+
+
+def save_stream(stream, directory, limit=None):
+    """
+    Copy a binary stream to a uniquely named file in directory.
+    Returns (path, SHA-256 hex digest, bytes written).
+    """
+    path = os.path.join(directory, f'{uuid.uuid4().hex}.upload')
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(path, 'wb') as f:
+            for block in iter(lambda: stream.read(BLOCK_SIZE), b''):
+                size += len(block)
+                if limit is not None and size > limit:
+                    raise ValueError(f'Batch is larger than {MAX_BATCH_BYTES} bytes uncompressed')
+                digest.update(block)
+                f.write(block)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, digest.hexdigest(), size
+
+
+def _write_json(path, data):
+    tmp = f'{path}.{uuid.uuid4().hex}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def load_totals(output_dir, result_id):
+    """Saved totals of a processed file, or None."""
+    try:
+        with open(os.path.join(output_dir, f'{result_id}.json')) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def calculate(source, output_dir, digest, preview_rows=0):
+    """
+    Process the CSV with content `digest` into <result id>.csv and
+    <result id>.json in output_dir.
+
+    Both are written under temporary names and renamed, the totals last, so
+    a result whose totals exist is complete. Returns (totals, preview
+    DataFrame, RowBinner).
+    """
+    binner = RowBinner()
+    result_id = result_key(digest)
+    result_path = os.path.join(output_dir, f'{result_id}.csv')
+    tmp = f'{result_path}.{uuid.uuid4().hex}.tmp'
+    try:
+        totals, preview = process_csv(source, tmp, preview_rows=preview_rows, binner=binner)
+        if os.path.exists(tmp):
+            os.replace(tmp, result_path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    totals.update(result_id=result_id, chart_key=chart_key(digest))
+    _write_json(os.path.join(output_dir, f'{result_id}.json'), totals)
+    return totals, preview, binner
+
+
+def _calculate_file(source, output_dir, digest):
+    """calculate() in a pool worker; the preview is not needed."""
+    totals, _, binner = calculate(source, output_dir, digest)
+    return totals, binner
+
+
+def _members(path):
+    """(member name, binary stream) for every CSV in a zip or tar archive; None if path is not one."""
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and _is_csv(info.filename):
+                    with archive.open(info) as stream:
+                        yield info.filename, stream
+    elif tarfile.is_tarfile(path):
+        with tarfile.open(path, 'r:*') as archive:
+            for info in archive:
+                if info.isfile() and _is_csv(info.name):
+                    yield info.name, archive.extractfile(info)
+    else:
+        yield None, None
+
+
+def _is_csv(name):
+    base = os.path.basename(name)
+    return base.lower().endswith('.csv') and not base.startswith('.') and not name.startswith('__MACOSX/')
+
+
+def _summary(totals):
+    return {key: totals[key] for key in ('rows', 'carbon_offset', 'carbon_credits', 'co2_eq_by_gas')}
+
+
+def consolidate(files):
+    """Totals over the files that were processed or skipped as already processed."""
+    counts = dict.fromkeys(('queued', 'done', 'skipped', 'duplicate', 'failed'), 0)
+    totals = {'rows': 0, 'carbon_offset': 0.0, 'carbon_credits': 0.0, 'co2_eq_by_gas': dict.fromkeys(GASES, 0.0)}
+    for entry in files:
+        counts[entry['status']] += 1
+        if entry['status'] in ('done', 'skipped'):
+            for key in ('rows', 'carbon_offset', 'carbon_credits'):
+                totals[key] += entry['totals'][key]
+            for gas in GASES:
+                totals['co2_eq_by_gas'][gas] += entry['totals']['co2_eq_by_gas'][gas]
+    return dict(totals, files=len(files), **counts)
+
+
+class BatchJobs:
+    """
+    Runs batch jobs: one coordinator thread per job expands its uploads and
+    hands the files to a shared process pool. A file already being processed
+    for another job is waited on rather than processed twice.
+    """
+
+    def __init__(self, upload_dir, output_dir, charts=None, max_workers=None, max_jobs=2):
+        self.upload_dir = upload_dir
+        self.output_dir = output_dir
+        self.jobs_dir = os.path.join(output_dir, 'jobs')
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        self.charts = charts
+        self.max_workers = max_workers or min(os.cpu_count() or 1, 4)
+        self._jobs = ThreadPoolExecutor(max_workers=max_jobs, thread_name_prefix='batch')
+        self._pool = None
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def _job_path(self, job_id):
+        return os.path.join(self.jobs_dir, f'{job_id}.json')
+
+    def _save(self, job):
+        job['totals'] = consolidate(job['files'])
+        _write_json(self._job_path(job['id']), job)
+
+    def submit(self, uploads):
+        """Queue a job for [(name, saved path, digest)], as saved by save_stream(); returns its state."""
+        job = {
+            'id': uuid.uuid4().hex,
+            'status': 'queued',
+            'error': None,
+            'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'finished_at': None,
+            'seconds': None,
+            'uploads': [name for name, _, _ in uploads],
+            'files': [],
+        }
+        self._save(job)
+        self._jobs.submit(self._run, job, uploads)
+        return self.get(job['id'])
+
+    def get(self, job_id):
+        try:
+            with open(self._job_path(job_id)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def wait(self, job_id, timeout):
+        """Poll until the job finishes or `timeout` passes; returns its latest state."""
+        deadline = time.monotonic() + timeout
+        job = self.get(job_id)
+        while job and job['status'] in ('queued', 'running') and time.monotonic() < deadline:
+            time.sleep(0.05)
+            job = self.get(job_id)
+        return job
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._pool
+
+    def _process(self, result_id, path, digest):
+        """The future for result_id: the one in flight, or a new one for path. (future, created)"""
+        with self._lock:
+            future = self._pending.get(result_id)
+            if future is not None:
+                return future, False
+        pool = self._executor()
+        with self._lock:
+            future = self._pending.get(result_id)
+            if future is not None:
+                return future, False
+            future = pool.submit(_calculate_file, path, self.output_dir, digest)
+            self._pending[result_id] = future
+        future.add_done_callback(lambda _: self._done(result_id))
+        return future, True
+
+    def _done(self, result_id):
+        with self._lock:
+            self._pending.pop(result_id, None)
+
+    def _expand(self, uploads):
+        """(name, path, digest) for every CSV in the uploads, archives unpacked."""
+        files, count, remaining = [], 0, MAX_BATCH_BYTES
+        for name, path, digest in uploads:
+            extracted = 0
+            try:
+                for member, stream in _members(path):
+                    if count >= MAX_BATCH_FILES:
+                        raise ValueError(f'Batch has more than {MAX_BATCH_FILES} CSV files')
+                    count += 1
+                    if member is None:
+                        files.append((name, path, digest))
+                        break
+                    member_path, member_digest, size = save_stream(stream, self.upload_dir, remaining)
+                    remaining -= size
+                    extracted += 1
+                    files.append((f'{name}/{member}', member_path, member_digest))
+                else:
+                    os.remove(path)
+                    if not extracted:
+                        files.append((name, None, 'Archive has no CSV files'))
+            except Exception as e:
+                # A broken or oversized archive fails on its own; what was extracted is still processed
+                files.append((name, None, f'{type(e).__name__}: {e}'))
+                os.remove(path)
+        return files
+
+    def _run(self, job, uploads):
+        started = time.perf_counter()
+        job['status'] = 'running'
+        self._save(job)
+        temp_paths = [path for _, path, _ in uploads]
+        try:
+            files = self._expand(uploads)
+            temp_paths = [path for _, path, _ in files if path is not None]
+            futures, seen = {}, {}
+            for name, path, digest in files:
+                entry = {'name': name, 'status': 'queued', 'error': None, 'digest': None,
+                         'result_id': None, 'chart_key': None, 'totals': None}
+                job['files'].append(entry)
+                if path is None:
+                    # digest holds the reason the upload could not be read
+                    entry.update(status='failed', error=digest)
+                    continue
+                result_id = result_key(digest)
+                entry.update(digest=digest, result_id=result_id, chart_key=chart_key(digest))
+                if result_id in seen:
+                    entry.update(status='duplicate', duplicate_of=seen[result_id])
+                    continue
+                seen[result_id] = name
+                totals = load_totals(self.output_dir, result_id)
+                if totals is not None:
+                    entry.update(status='skipped', totals=_summary(totals))
+                    if self.charts is not None:
+                        # Redrawn if its first render failed or the image was removed
+                        self.charts.submit_result(entry['chart_key'],
+                                                  os.path.join(self.output_dir, f'{result_id}.csv'))
+                    continue
+                future, created = self._process(result_id, path, digest)
+                futures[future] = (entry, created)
+            self._save(job)
+
+            for future in as_completed(futures):
+                entry, created = futures[future]
+                try:
+                    totals, binner = future.result()
+                except (KeyError, ValueError) as e:
+                    # Not an activity CSV (missing columns, unparseable values)
+                    entry.update(status='failed', error=f'{type(e).__name__}: {e}')
+                except Exception as e:
+                    logger.exception('Batch %s: %s failed', job['id'], entry['name'])
+                    entry.update(status='failed', error=f'{type(e).__name__}: {e}')
+                else:
+                    # Processed for another job in the meantime
+                    entry.update(status='done' if created else 'skipped', totals=_summary(totals))
+                    if created and self.charts is not None:
+                        self.charts.submit(entry['chart_key'], binner)
+                self._save(job)
+            job['status'] = 'done'
+        except Exception as e:
+            logger.exception('Batch %s failed', job['id'])
+            job.update(status='failed', error=f'{type(e).__name__}: {e}')
+        finally:
+            for path in temp_paths:
+                if os.path.exists(path):
+                    os.remove(path)
+        job['finished_at'] = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        job['seconds'] = round(time.perf_counter() - started, 3)
+        self._save(job)
@@ -0,0 +1,177 @@
+"""
+Chart rendering for the credit calculator, kept off the request thread.
+
+Rows are summed into at most 2 * CHART_BINS bars while the upload streams
+through the calculation. The bars are drawn with matplotlib's object API
+on the Agg canvas in a process pool, so no pyplot global state is involved.
+PNGs are named after a hash of the uploaded file, which means re-uploading
+the same file reuses the existing image. A result reused from its saved
+totals whose image is missing (its render failed, or charts/ was cleared)
+is redrawn from the Carbon Offset column of its result CSV.
+"""
+import hashlib
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+CHART_BINS = 100
+# Bump when the chart layout changes so cached images are redrawn
+CHART_VERSION = 1
+
+
+class RowBinner:
+    """
+    Streaming row-index histogram with bounded size.
+
+    Values are summed into buckets of bucket_size consecutive rows; whenever
+    there are more than 2 * max_bins buckets, neighbours are merged and the
+    bucket size doubles.
+    """
+
+    def __init__(self, max_bins=CHART_BINS):
+        self.max_bins = max_bins
+        self.bucket_size = 1
+        self.sums = np.zeros(0)
+        self._partial = 0.0
+        self._partial_rows = 0
+
+    def add(self, values):
+        values = np.asarray(values, dtype=float)
+        while len(values):
+            # Finish the current bucket first
+            take = min(self.bucket_size - self._partial_rows, len(values))
+            self._partial += values[:take].sum()
+            self._partial_rows += take
+            values = values[take:]
+            if self._partial_rows < self.bucket_size:
+                break
+            self.sums = np.append(self.sums, self._partial)
+            self._partial, self._partial_rows = 0.0, 0
+
+            # Then whole buckets in one reshape-and-sum
+            whole = len(values) // self.bucket_size
+            if whole:
+                block = values[:whole * self.bucket_size].reshape(whole, self.bucket_size).sum(axis=1)
+                self.sums = np.concatenate([self.sums, block])
+                values = values[whole * self.bucket_size:]
+            self._shrink()
+
+    def _shrink(self):
+        while len(self.sums) > 2 * self.max_bins:
+            if len(self.sums) % 2:
+                # Odd bucket out goes back to being the partial one
+                self._partial += self.sums[-1]
+                self._partial_rows += self.bucket_size
+                self.sums = self.sums[:-1]
+            self.sums = self.sums.reshape(-1, 2).sum(axis=1)
+            self.bucket_size *= 2
+
+    def bins(self):
+        if self._partial_rows:
+            return np.append(self.sums, self._partial)
+        return self.sums
+
+
+def file_digest(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chart_key(digest):
+    return hashlib.sha256(f'{digest}:{CHART_BINS}:{CHART_VERSION}'.encode()).hexdigest()[:40]
+
+
+def render_chart(path, offsets, bucket_size):
+    """Draw the two-panel offset/credit bar chart to path (runs in a worker process)."""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=(12, 6))
+    FigureCanvasAgg(fig)
+    ax_offset, ax_credits = fig.subplots(1, 2)
+    x = np.arange(len(offsets)) * bucket_size
+    xlabel = 'Row' if bucket_size == 1 else f'Row (bars of {bucket_size} rows)'
+
+    # Emissions Breakdown
+    ax_offset.bar(x, offsets, width=bucket_size, align='edge', color='c')
+    ax_offset.set_xlabel(xlabel)
+    ax_offset.set_ylabel('Carbon Offset Generated (tons)')
+    ax_offset.set_title('Emissions Breakdown by Source')
+
+    # Carbon Credits
+    ax_credits.bar(x, np.asarray(offsets) / 1000, width=bucket_size, align='edge', color='g')
+    ax_credits.set_xlabel(xlabel)
+    ax_credits.set_ylabel('Carbon Credits')
+    ax_credits.set_title('Carbon Credits Earned')
+
+    fig.tight_layout()
+    tmp = f'{path}.{os.getpid()}.tmp'
+    fig.savefig(tmp, format='png')
+    os.replace(tmp, path)
+    return path
+
+
+def render_result_chart(path, result_path, chunksize=100000):
+    """Bin a saved result CSV's Carbon Offset column and draw the chart to path (runs in a worker process)."""
+    import pandas as pd
+
+    binner = RowBinner()
+    # A file with no rows leaves no result CSV, and gets an empty chart
+    if os.path.exists(result_path):
+        for chunk in pd.read_csv(result_path, usecols=['Carbon Offset'], dtype='float64', chunksize=chunksize):
+            binner.add(chunk['Carbon Offset'].to_numpy())
+    return render_chart(path, binner.bins(), binner.bucket_size)
+
+
+class ChartRenderer:
+    """Submits renders to a process pool and keeps track of the ones in flight."""
+
+    def __init__(self, cache_dir, max_workers=2):
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
+        os.makedirs(cache_dir, exist_ok=True)
+        self._pool = None
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, f'{key}.png')
+
+    def submit(self, key, binner):
+        """Start rendering unless the chart is cached or already being drawn."""
+        self._submit(key, render_chart, binner.bins(), binner.bucket_size)
+
+    def submit_result(self, key, result_path):
+        """Like submit(), for a result whose bins are gone: they are rebuilt from its result CSV."""
+        self._submit(key, render_result_chart, result_path)
+
+    def _submit(self, key, render, *args):
+        path = self.path(key)
+        with self._lock:
+            if os.path.exists(path) or key in self._pending:
+                return
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            future = self._pool.submit(render, path, *args)
+            self._pending[key] = future
+        future.add_done_callback(lambda _: self._done(key))
+
+    def _done(self, key):
+        with self._lock:
+            self._pending.pop(key, None)
+
+    def wait(self, key, timeout=30):
+        """Block until the chart exists (or its render fails). Returns True if it is on disk."""
+        with self._lock:
+            future = self._pending.get(key)
+        if future is not None:
+            try:
+                future.result(timeout)
+            except Exception:
+                return False
+        return os.path.exists(self.path(key))
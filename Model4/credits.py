@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+GASES = ['CO2', 'CH4', 'N2O', 'HFCs', 'PFCs', 'SF6']
+EF_COLUMNS = [f'Emission_Factor_{gas}' for gas in GASES]
+GWP_COLUMNS = [f'GWP_{gas}' for gas in GASES]
+REQUIRED_COLUMNS = ['Activity'] + EF_COLUMNS + GWP_COLUMNS
+
+# Parse the numeric inputs straight to float64 instead of letting pandas infer
+COLUMN_DTYPES = {col: 'float64' for col in REQUIRED_COLUMNS}
+
+CHUNK_SIZE = 100000
+PREVIEW_ROWS = 100
+
+
+def chunk_offsets(chunk):
+    """
+    CO2-equivalent per row and per gas for one chunk.
+
+    Carbon Offset = Activity * sum(EF_gas * GWP_gas), evaluated as a single
+    row-wise dot product. Returns (offset per row, CO2-eq total per gas).
+    """
+    activity = chunk['Activity'].to_numpy()
+    ef = chunk[EF_COLUMNS].to_numpy()
+    gwp = chunk[GWP_COLUMNS].to_numpy()
+    offset = activity * np.einsum('ij,ij->i', ef, gwp)
+    gas_totals = np.einsum('i,ij,ij->j', activity, ef, gwp)
+    return offset, gas_totals
+
+
+def process_csv(source, result_path, chunksize=CHUNK_SIZE, preview_rows=PREVIEW_ROWS, binner=None):
+    """
+    Stream an activity CSV through the credit calculation.
+
+    Each chunk gets its 'Carbon Offset' and 'Carbon_Credits' columns and is
+    appended to result_path, so memory stays bounded by chunksize. Row
+    offsets are also fed to `binner` (for the chart) when one is given.
+    Returns the aggregate totals and a DataFrame with the first preview_rows
+    results.
+    """
+    totals = {
+        'rows': 0,
+        'carbon_offset': 0.0,
+        'carbon_credits': 0.0,
+        'co2_eq_by_gas': dict.fromkeys(GASES, 0.0),
+    }
+    preview = []
+    preview_count = 0
+    first = True
+
+    for chunk in pd.read_csv(source, dtype=COLUMN_DTYPES, chunksize=chunksize):
+        missing = [col for col in REQUIRED_COLUMNS if col not in chunk.columns]
+        if missing:
+            raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+        offset, gas_totals = chunk_offsets(chunk)
+        chunk['Carbon Offset'] = offset
+        # Assuming 1 carbon credit equals 1 ton of CO2
+        chunk['Carbon_Credits'] = offset / 1000
+
+        chunk.to_csv(result_path, mode='w' if first else 'a', header=first, index=False)
+        if binner is not None:
+            binner.add(offset)
+        first = False
+
+        totals['rows'] += len(chunk)
+        totals['carbon_offset'] += float(offset.sum())
+        for gas, value in zip(GASES, gas_totals):
+            totals['co2_eq_by_gas'][gas] += float(value)
+
+        if preview_count < preview_rows:
+            preview.append(chunk.iloc[:preview_rows - preview_count])
+            preview_count += len(preview[-1])
+
+    totals['carbon_credits'] = totals['carbon_offset'] / 1000
+    preview_df = pd.concat(preview, ignore_index=True) if preview else pd.DataFrame(columns=REQUIRED_COLUMNS)
+    return totals, preview_df
+
+
+def read_page(result_path, page, per_page):
+    """Read one page (1-based) of a processed result file."""
+    start = (page - 1) * per_page
+    return pd.read_csv(result_path, skiprows=range(1, start + 1), nrows=per_page)
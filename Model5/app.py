@@ -1,16 +1,69 @@
 from flask import Flask, request, jsonify, render_template, send_from_directory
-import joblib
 import numpy as np
-import matplotlib.pyplot as plt
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.metrics import Metrics, timer
+from common.model_bundle import load_bundle
+from common.warmup import Warmup
+from batching import MicroBatcher
 
 app = Flask(__name__)
 
-# Load the trained model
-model = joblib.load('./model/carbon_emission_model1.pkl')
+# Load the trained model (in the background, see common.warmup)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Single-file artefact built with `python -m common.model_bundle pack`; the
+# pickle is used when it doesn't exist
+BUNDLE_PATH = os.path.join(BASE_DIR, 'model', 'model5.bundle')
+# Column order of the rows sent to model.predict
+FEATURE_COLUMNS = ['Coal_Production', 'Coal_Type', 'Energy_Consumption', 'Emission_Factor']
+model = None
+
+def load_models():
+    global model
+    if os.path.isdir(BUNDLE_PATH):
+        model = load_bundle(BUNDLE_PATH).require_features(FEATURE_COLUMNS)['estimator']
+    else:
+        import joblib
+        model = joblib.load(os.path.join(BASE_DIR, 'model', 'carbon_emission_model1.pkl'))
+    model.predict(np.zeros((1, 4)))
+
+warmup = Warmup(load_models).start()
+app.add_url_rule('/healthz', view_func=warmup.health_view)
+app.add_url_rule('/readyz', view_func=warmup.readiness_view)
+# Latency per route and the predict/render/serialize stages at /metrics
+metrics = Metrics('model5').init_app(app).track_warmup(warmup)
+
+# Concurrent /predict calls are grouped for up to BATCH_WINDOW_MS or MAX_BATCH_SIZE rows
+BATCH_WINDOW_MS = float(os.environ.get('MODEL5_BATCH_WINDOW_MS', 3))
+MAX_BATCH_SIZE = int(os.environ.get('MODEL5_MAX_BATCH_SIZE', 64))
+MAX_READINGS = 100000
+
+def predict_rows(rows):
+    # Runs on the batcher's thread, outside any request, so it records through metrics directly
+    with metrics.timer('predict'):
+        return model.predict(rows)
+
+def reading_row(fields):
+    """
+    The model input row (FEATURE_COLUMNS order) for one reading; KeyError
+    for a missing field, ValueError unless every value is a finite number.
+    """
+    row = [float(fields['coal_production']), int(fields['coal_type']),
+           float(fields['energy_consumption']), float(fields['emission_factor'])]
+    if not np.isfinite(row).all():
+        raise ValueError('values must be finite numbers')
+    return row
+
+def reading_rows(readings):
+    """Model input rows for a /predict/batch body's readings."""
+    return np.array([reading_row(r) for r in readings])
+
+batcher = MicroBatcher(predict_rows, max_batch_size=MAX_BATCH_SIZE, max_wait=BATCH_WINDOW_MS / 1000)
 
 # Directory to store plots
-PLOTS_DIR = 'static/plots'
+PLOTS_DIR = os.path.join(BASE_DIR, 'static', 'plots')
 os.makedirs(PLOTS_DIR, exist_ok=True)
 
 @app.route('/')
@@ -18,19 +71,16 @@ def index():
     return render_template('index.html')  # Load the HTML form
 
 @app.route('/predict', methods=['POST'])
+@warmup.required
 def predict():
-    # Get the input data from the form
-    coal_production = float(request.form['coal_production'])
-    coal_type = int(request.form['coal_type'])
-    energy_consumption = float(request.form['energy_consumption'])
-    emission_factor = float(request.form['emission_factor'])
-    
-    # Create input array for prediction
-    input_data = np.array([[coal_production, coal_type, energy_consumption, emission_factor]])
-    
-    
-    # Make prediction
-    prediction = model.predict(input_data)[0]
+    # Get the input data from the form (rejected here, so one bad row can't fail a whole batch)
+    try:
+        row = reading_row(request.form)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid reading: {e}'}), 400
+
+    # Make prediction (batched together with other concurrent requests)
+    prediction = batcher.predict(row)
     
     # Generate and save histogram plot
     #generate_histogram([coal_production, energy_consumption, emission_factor])
@@ -41,21 +91,50 @@ def predict():
         #'histogram_image': '/static/plots/histogram.png'
     })
 
+@app.route('/predict/batch', methods=['POST'])
+@warmup.required
+def predict_batch():
+    # {"readings": [{"coal_production": ..., "coal_type": ..., "energy_consumption": ..., "emission_factor": ...}, ...]}
+    data = request.get_json(silent=True) or {}
+    readings = data.get('readings')
+    if not isinstance(readings, list) or not readings:
+        return jsonify({'error': 'A non-empty list of readings is required'}), 400
+    if len(readings) > MAX_READINGS:
+        return jsonify({'error': f'At most {MAX_READINGS} readings per request'}), 400
+
+    try:
+        input_data = reading_rows(readings)
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid reading: {e}'}), 400
+
+    with timer('predict'):
+        predictions = model.predict(input_data)
+    return jsonify({'predictions': predictions.tolist()})
+
+@app.route('/batch-stats')
+def batch_stats():
+    return jsonify(batcher.stats())
+
 @app.route('/static/<path:filename>')
 def serve_static(filename):
     return send_from_directory('static', filename)
 
 def generate_histogram(data):
-    plt.figure(figsize=(10, 6))
-    plt.hist(data, bins=5, color='blue', edgecolor='black')
-    plt.title('Histogram of Input Data')
-    plt.xlabel('Values')
-    plt.ylabel('Frequency')
-    
-    # Save plot
-    plot_path = os.path.join(PLOTS_DIR, 'histogram.png')
-    plt.savefig(plot_path)
-    plt.close()
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    with timer('render'):
+        plt.figure(figsize=(10, 6))
+        plt.hist(data, bins=5, color='blue', edgecolor='black')
+        plt.title('Histogram of Input Data')
+        plt.xlabel('Values')
+        plt.ylabel('Frequency')
+
+        # Save plot
+        plot_path = os.path.join(PLOTS_DIR, 'histogram.png')
+        plt.savefig(plot_path)
+        plt.close()
 
 if __name__ == '__main__':
     app.run(port=5004, debug=True)
@@ -0,0 +1,57 @@
+"""
+ASGI serving mode for Model5 (see common/asgi.py). The /predict form and
+/predict/batch readings are parsed on the event loop. Single predictions
+go through the app's MicroBatcher and batches through a bounded thread
+pool; every other route is served by the Flask app.
+
+    cd Model5 && uvicorn asgi:app --port 5004
+    python Model5/asgi.py
+
+MODEL5_ASGI_THREADS model calls run at once and MODEL5_ASGI_QUEUE more
+(batched or not) may wait; past that, requests are answered 429.
+"""
+import os
+
+import app as service
+from common.asgi import AsgiApp, HTTPError
+
+app = AsgiApp(service.app, service.metrics, service.warmup,
+              threads=int(os.environ.get('MODEL5_ASGI_THREADS', 4)),
+              queue=int(os.environ.get('MODEL5_ASGI_QUEUE', 256)))
+
+
+@app.route('/predict', ready=True)
+async def predict(request):
+    try:
+        row = service.reading_row(request.form)
+    except KeyError as e:
+        raise HTTPError(400, f'Missing form field: {e.args[0]}')
+    except ValueError as e:
+        return {'error': f'Invalid reading: {e}'}, 400
+
+    # Batched together with other concurrent requests
+    prediction = await app.offload.wait(service.batcher.submit, row)
+    return {'prediction': prediction}
+
+
+@app.route('/predict/batch', ready=True)
+async def predict_batch(request):
+    data = request.get_json(silent=True) or {}
+    readings = data.get('readings')
+    if not isinstance(readings, list) or not readings:
+        return {'error': 'A non-empty list of readings is required'}, 400
+    if len(readings) > service.MAX_READINGS:
+        return {'error': f'At most {service.MAX_READINGS} readings per request'}, 400
+
+    try:
+        input_data = service.reading_rows(readings)
+    except (KeyError, TypeError, ValueError) as e:
+        return {'error': f'Invalid reading: {e}'}, 400
+
+    predictions = await app.offload.run(service.predict_rows, input_data)
+    return {'predictions': predictions.tolist()}
+
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, port=5004)
@@ -0,0 +1,100 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class MicroBatcher:
+    """
+    Collects single-row predictions from concurrent requests and runs them
+    through the model together.
+
+    A batch is sent as soon as max_batch_size rows are waiting or max_wait
+    seconds after its first row arrived, whichever comes first. Each caller
+    gets its own row's prediction back through a Future. If the model rejects
+    a batch, its rows are retried one at a time, so only the callers whose
+    rows fail get the exception. The worker thread starts on the first
+    submit, so an instance created before a fork (e.g. a preloaded gunicorn
+    app) runs its own thread in each worker.
+    """
+
+    def __init__(self, predict, max_batch_size=64, max_wait=0.003):
+        self._predict = predict
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.batches = 0
+        self.rows = 0
+        self.retried = 0
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+                threading.Thread(target=self._run, args=(self._queue,), name='micro-batcher', daemon=True).start()
+                self._pid = os.getpid()
+
+    def submit(self, row):
+        self._ensure_started()
+        future = Future()
+        self._queue.put((row, future))
+        return future
+
+    def predict(self, row, timeout=None):
+        return self.submit(row).result(timeout)
+
+    def _collect(self, pending):
+        batch = [pending.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(pending.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self, pending):
+        while True:
+            batch = self._collect(pending)
+            try:
+                predictions = self._predict(np.array([row for row, _ in batch]))
+            except Exception:
+                # One bad row must not fail everyone else's: retry each row on its own
+                if len(batch) > 1:
+                    self.retried += 1
+                    for row, future in batch:
+                        self._predict_one(row, future)
+                else:
+                    self._predict_one(*batch[0])
+                continue
+            self.batches += 1
+            self.rows += len(batch)
+            for (_, future), prediction in zip(batch, predictions):
+                future.set_result(prediction)
+
+    def _predict_one(self, row, future):
+        try:
+            prediction = self._predict(np.array([row]))[0]
+        except Exception as e:
+            future.set_exception(e)
+            return
+        self.batches += 1
+        self.rows += 1
+        future.set_result(prediction)
+
+    def stats(self):
+        return {
+            'batches': self.batches,
+            'rows': self.rows,
+            'retried_batches': self.retried,
+            'mean_batch_size': round(self.rows / self.batches, 2) if self.batches else None,
+        }
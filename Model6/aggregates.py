@@ -0,0 +1,86 @@
+# Ledger columns summed per company (sum and non-null count, so means can be derived)
+COMPANY_COLUMNS = ['CoalProduced_Tons', 'Total_CO2_Emissions_Tons', 'Emission_Intensity', 'Score', 'Green_Investment_Ratio']
+
+# Averaged metrics in the summary endpoint: output key -> (column, decimal places)
+AVERAGED_METRICS = {
+    'intensity': ('Emission_Intensity', 3),
+    'score': ('Score', 2),
+    'green_investment_ratio': ('Green_Investment_Ratio', 2),
+}
+
+
+class CompanyAggregates:
+    """
+    Per-company totals and averages computed with a single groupby pass.
+
+    Built once when the ledger is loaded so the dashboard endpoints only do
+    dictionary lookups instead of scanning the DataFrame for every company.
+    Running sums and counts are kept so that new rows can be folded in
+    with merged() without regrouping the whole ledger.
+    """
+
+    def __init__(self, df=None):
+        self.companies = []
+        self.sums = {}
+        self.rows = {}
+        if df is not None:
+            self._merge(df)
+
+    def merged(self, rows):
+        """A new CompanyAggregates with `rows` folded in; this one is left untouched."""
+        new = CompanyAggregates()
+        new.companies = list(self.companies)
+        new.sums = dict(self.sums)
+        new.rows = dict(self.rows)
+        new._merge(rows)
+        return new
+
+    def _merge(self, df):
+        columns = [col for col in COMPANY_COLUMNS if col in df.columns]
+        # sort=False keeps first-appearance order, same as df['CompanyName'].unique()
+        grouped = df.groupby('CompanyName', sort=False, observed=True)[columns].agg(['sum', 'count'])
+        for company, values in zip(grouped.index, grouped.to_numpy(dtype=float)):
+            if company not in self.sums:
+                self.companies.append(company)
+            stats = dict(self.sums.get(company, {}))
+            for i, col in enumerate(columns):
+                total, count = stats.get(col, (0.0, 0))
+                stats[col] = (total + values[2 * i], count + int(values[2 * i + 1]))
+            self.sums[company] = stats
+            self.rows[company] = self._record(stats)
+
+    @staticmethod
+    def _record(stats):
+        def mean(col):
+            total, count = stats.get(col, (0.0, 0))
+            return total / count if count else None
+
+        record = {
+            'production': int(stats['CoalProduced_Tons'][0]),
+            'production_mean': mean('CoalProduced_Tons'),
+            'emissions': int(stats['Total_CO2_Emissions_Tons'][0]),
+        }
+        for key, (col, digits) in AVERAGED_METRICS.items():
+            value = mean(col)
+            record[key] = round(value, digits) if value is not None else None
+        return record
+
+    def overall(self):
+        """Industry-wide production and emission totals."""
+        return {
+            'production': sum(stats['CoalProduced_Tons'][0] for stats in self.sums.values()),
+            'emissions': sum(stats['Total_CO2_Emissions_Tons'][0] for stats in self.sums.values()),
+        }
+
+    def __contains__(self, company):
+        return company in self.rows
+
+    def __len__(self):
+        return len(self.companies)
+
+    def get(self, company):
+        return self.rows.get(company)
+
+    def items(self):
+        for company in self.companies:
+            yield company, self.rows[company]
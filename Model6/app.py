@@ -1,36 +1,203 @@
-from flask import Flask, request, jsonify, render_template, send_from_directory
+from flask import Flask, request, jsonify, render_template, send_from_directory, Response, stream_with_context
 from flask_cors import CORS
 from datetime import datetime
 import pandas as pd
 import os
+import sys
 import logging
-from sklearn.linear_model import LinearRegression
+import shutil
+import threading
+import time
+import uuid
 import numpy as np
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from common.columnar import load_table
+from common.metrics import Metrics, timer
+from common.response_cache import ResponseCache
+from forecast import NATIONAL
+from ledger import Ledger, normalize_rows
+from reports import BREAKDOWNS, FORMATS, REPORTS, ReportJobs, parquet_available
+from store import Store
+from events import create_hub, format_sse
+
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=['ETag', 'X-Total-Count'])
 
-# Directory to save reports
-REPORTS_DIR = 'reports'
-os.makedirs(REPORTS_DIR, exist_ok=True)
+# Notices, auctions, reports, messages and compliance decisions. SQLite in
+# WAL mode, so every worker process on the host shares the same state.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+store = Store(os.environ.get('MODEL6_DB', os.path.join(BASE_DIR, 'model6.db')))
 
-# Load the CSV file (replace with your actual file path)
-CSV_FILE = 'modified_indian_coal_companies.csv'
-df = pd.read_csv(CSV_FILE)
+# Cached JSON responses; bumped whenever the ledger changes, and keyed on the
+# store's version so a write made by any worker invalidates them all
+response_cache = ResponseCache(max_entries=256, version_source=store.version)
 
-# Mock data for notices, auctions, reports, and messages
-notices = [{"date": "15/11/2025", "text": "New emission norms effective November 2025"}]
-auctions = [{"name": "Coal Block A", "reserve": 1000000, "status": "Open", "created": "03/03/2025"}]  # Added created date
-reports = [{"date": "15/11/2025", "type": "Production Report", "url": "http://example.com/production.pdf"}]
-messages = []  # Store all messages here
+# Latency per route, ledger/report/serialize stages and the cache at /metrics
+metrics = Metrics('model6').init_app(app).track_cache('responses', response_cache)
 
-# In-memory store for compliance status (to persist government approvals/rejections)
-compliance_status = {company: "pending" for company in df['CompanyName'].unique()}  # Default all to "pending"
+# Pushes auctions, notices, messages and compliance decisions to /api/events
+event_hub = create_hub()
+SSE_KEEPALIVE_SECONDS = 15
+LONG_POLL_MAX_SECONDS = 30
+
+# Directory to save reports
+REPORTS_DIR = 'reports'
+REPORTS_PATH = os.path.join(BASE_DIR, REPORTS_DIR)
+os.makedirs(REPORTS_PATH, exist_ok=True)
+
+# Reports are built on a background pool; /api/generate-report waits up to
+# REPORT_SYNC_WAIT seconds for the file before answering 202 with the job
+report_jobs = ReportJobs(store, REPORTS_PATH, max_workers=int(os.environ.get('MODEL6_REPORT_WORKERS', 2)),
+                         metrics=metrics)
+REPORT_SYNC_WAIT = 10
+
+# Load the CSV file (replace with your actual file path).
+# If `python -m common.columnar ingest modified_indian_coal_companies.csv
+# --sort-by CompanyName` has built an up-to-date store next to it, the
+# columns are memory-mapped from there instead of parsing the CSV (and,
+# sorted by company, used without copying them).
+CSV_FILE = os.path.join(BASE_DIR, 'modified_indian_coal_companies.csv')
+MAX_FORECAST_HORIZON = 10
+
+# Largest page of the notice and message lists (?limit=&offset=); without
+# a limit they return every record, as they always have
+MAX_PAGE_SIZE = 1000
+
+# The ledger, its per-company aggregates and forecasts. Handlers read
+# ledger.current once per request; loads and appends swap in a new snapshot.
+ledger = Ledger()
+
+# Records per appended batch, for the ingest endpoint and the file watcher
+INGEST_BATCH_ROWS = 50000
+ingest_lock = threading.Lock()
+
+# Ingest and reload bump the store's ledger version. Every other worker
+# checks it at most every LEDGER_SYNC_SECONDS (on its next request) and
+# reloads the CSV in the background when it has moved.
+LEDGER_SYNC_SECONDS = float(os.environ.get('MODEL6_LEDGER_SYNC_SECONDS', 1))
+ledger_sync = {'version': None, 'checked': 0.0}
+ledger_sync_lock = threading.Lock()
+
+def csv_stamp():
+    try:
+        stat = os.stat(CSV_FILE)
+        return f"{stat.st_size}-{stat.st_mtime_ns}"
+    except OSError:
+        return "missing"
+
+def tag_snapshot(snapshot, version, stamp):
+    """Record the shared ledger version and CSV stamp the snapshot matches (see data_version())."""
+    snapshot.source_version = f"{version}-{stamp}"
+
+def load_data():
+    """(Re)load the ledger and rebuild the per-company aggregates and forecasts from it."""
+    with ingest_lock:
+        # Read first: a change made during the load is picked up by the next sync
+        version, stamp = store.ledger_version(), csv_stamp()
+        ledger_sync['version'] = version
+        with metrics.timer('ledger_load'):
+            snapshot = ledger.load(load_table(CSV_FILE))
+        if store.ledger_version() == version and csv_stamp() == stamp:
+            tag_snapshot(snapshot, version, stamp)
+    response_cache.bump()
+    return snapshot
+
+def record_ledger_change(snapshot):
+    """
+    Bump the shared ledger version; if another worker changed the ledger too,
+    the next sync reloads. Otherwise `snapshot` is tagged with the new version.
+    """
+    previous = ledger_sync['version']
+    version = store.bump_ledger_version()
+    if version == previous + 1:
+        ledger_sync['version'] = version
+        if ledger.current is snapshot:
+            tag_snapshot(snapshot, version, csv_stamp())
+    return version
+
+def publish_ledger_change(snapshot, version):
+    event_hub.publish('ledger', {"version": version, "total_rows": snapshot.rows})
+
+# Report jobs for snapshots that match no shared ledger version are keyed
+# by this worker alone, so no other worker's request is answered with them
+WORKER_TOKEN = uuid.uuid4().hex[:12]
+
+def data_version():
+    """
+    (snapshot, version id) for report dedupe: the shared ledger version and CSV
+    stamp the snapshot was built from, so workers holding the same data share
+    reports and a worker that has not synced yet never files old data under a
+    newer version.
+    """
+    with ingest_lock:
+        snapshot = ledger.current
+    if snapshot.source_version is not None:
+        return snapshot, snapshot.source_version
+    return snapshot, f"{WORKER_TOKEN}-v{snapshot.version}"
+
+def ingest_rows(rows):
+    """Append records to the ledger file and publish them to the running app."""
+    with ingest_lock, timer('ingest'):
+        rows = normalize_rows(rows)
+        snapshot = ledger.append(rows)
+        # Keep the CSV the source of truth so a restart sees the same data
+        header = pd.read_csv(CSV_FILE, nrows=0).columns
+        rows.reindex(columns=header).to_csv(CSV_FILE, mode='a', header=False, index=False)
+        version = record_ledger_change(snapshot)
+    response_cache.bump()
+    publish_ledger_change(snapshot, version)
+    return snapshot
+
+load_data()
+
+def reload_from_peer():
+    try:
+        snapshot = load_data()
+        # With a shared hub the worker that made the change has already told every client
+        if not event_hub.shared:
+            publish_ledger_change(snapshot, ledger_sync['version'])
+    except Exception:
+        app.logger.exception("Reloading the ledger after a change in another worker failed")
+    finally:
+        ledger_sync_lock.release()
+
+@app.before_request
+def sync_ledger():
+    """Reload in the background when another worker has ingested into or reloaded the ledger."""
+    now = time.monotonic()
+    if now - ledger_sync['checked'] < LEDGER_SYNC_SECONDS:
+        return
+    ledger_sync['checked'] = now
+    if store.ledger_version() != ledger_sync['version'] and ledger_sync_lock.acquire(blocking=False):
+        threading.Thread(target=reload_from_peer, name='ledger-sync', daemon=True).start()
+
+def page_args():
+    """(limit, offset) from the query string (limit None: every record), or an error message."""
+    if 'limit' not in request.args:
+        if 'offset' in request.args:
+            return None, None, "offset needs a limit"
+        return None, 0, None
+    limit = request.args.get('limit', type=int)
+    offset = request.args.get('offset', 0, type=int)
+    if limit is None or not 1 <= limit <= MAX_PAGE_SIZE:
+        return None, None, f"limit must be between 1 and {MAX_PAGE_SIZE}"
+    if offset is None or offset < 0:
+        return None, None, "offset must be a non-negative integer"
+    return limit, offset, None
+
+def paged(items, total):
+    """A JSON list response with the unpaged size in X-Total-Count."""
+    response = jsonify(items)
+    response.headers['X-Total-Count'] = str(total)
+    return response
 
 def get_industry_overview():
-    total_production = df['CoalProduced_Tons'].sum()
-    total_emissions = df['Total_CO2_Emissions_Tons'].sum()
-    active_companies = df['CompanyName'].nunique()
+    aggregates = ledger.current.aggregates
+    overall = aggregates.overall()
+    total_production = overall['production']
+    total_emissions = overall['emissions']
+    active_companies = len(aggregates)
     return {
         "total_production": int(total_production),
         "total_emissions": int(total_emissions),
@@ -44,22 +211,38 @@ def index():
 # Company Endpoints
 @app.route('/api/production/<company>', methods=['GET'])
 def get_production(company):
-    if company == "BCCL": company = "Bharat Coking Coal"  # Map BCCL to Bharat Coking Coal
-    company_data = df[df['CompanyName'] == company]
-    if company_data.empty:
+    snapshot = ledger.current
+    company = snapshot.companies.resolve(company)
+    if company is None:
         return jsonify({"error": "Company not found"}), 404
+    totals = snapshot.aggregates.get(company)
     production = {
-        "daily": int(company_data['CoalProduced_Tons'].mean() / 365),  # Rough estimate
-        "monthly": int(company_data['CoalProduced_Tons'].mean() / 12),
-        "yearly": int(company_data['CoalProduced_Tons'].sum())
+        "daily": int(totals['production_mean'] / 365),  # Rough estimate
+        "monthly": int(totals['production_mean'] / 12),
+        "yearly": totals['production']
     }
     return jsonify(production)
 
+@app.route('/api/history/<company>', methods=['GET'])
+@response_cache.cached
+def get_history(company):
+    """A company's production and emissions per year, summed over its units."""
+    snapshot = ledger.current
+    rows = snapshot.company_rows(company)
+    if rows is None:
+        return jsonify({"error": "Company not found"}), 404
+    with timer('aggregate'):
+        yearly = rows.groupby('Year')[['CoalProduced_Tons', 'Total_CO2_Emissions_Tons']].sum()
+    return jsonify({
+        "company": snapshot.companies.display_name(snapshot.companies.resolve(company)),
+        "history": [{"year": int(year), "production": int(production), "emissions": int(emissions)}
+                    for year, (production, emissions) in zip(yearly.index, yearly.to_numpy())]
+    })
+
 @app.route('/api/compliance/<company>', methods=['GET'])
 def get_compliance(company):
-    if company == "BCCL": company = "Bharat Coking Coal"  # Map BCCL to Bharat Coking Coal
-    company_data = df[df['CompanyName'] == company]
-    if company_data.empty:
+    company = ledger.current.companies.resolve(company)
+    if company is None:
         return jsonify({"error": "Company not found"}), 404
     # Default all to "pending" initially
     compliance = {
@@ -68,9 +251,10 @@ def get_compliance(company):
         "report": "pending"
     }
     # Override with government decision
-    if compliance_status.get(company) == "approved":
+    status = store.get_compliance(company)
+    if status == "approved":
         compliance = {key: "approved" for key in compliance}
-    elif compliance_status.get(company) == "rejected":
+    elif status == "rejected":
         compliance = {key: "rejected" for key in compliance}
     return jsonify(compliance)
 
@@ -90,39 +274,42 @@ def predict_emission():
 
 # Government Endpoints
 @app.route('/api/industry-overview', methods=['GET'])
+@response_cache.cached
 def industry_overview():
     return jsonify(get_industry_overview())
 
 @app.route('/api/companies', methods=['GET'])
+@response_cache.cached
 def get_all_companies():
     summary = []
-    for company in df['CompanyName'].unique():
-        company_data = df[df['CompanyName'] == company]
-        current_status = compliance_status.get(company, "pending")  # Default to "pending"
-        # Map "Bharat Coking Coal" to "BCCL" for display
-        display_name = "BCCL" if company == "Bharat Coking Coal" else company
+    statuses = store.compliance_statuses()
+    snapshot = ledger.current
+    for company, totals in snapshot.aggregates.items():
+        current_status = statuses.get(company, "pending")  # Default to "pending"
         summary.append({
-            "name": display_name,
-            "production": int(company_data['CoalProduced_Tons'].sum()),
-            "emissions": int(company_data['Total_CO2_Emissions_Tons'].sum()),
+            "name": snapshot.companies.display_name(company),
+            "production": totals['production'],
+            "emissions": totals['emissions'],
             "compliance_status": current_status
         })
     return jsonify(summary)
 
 @app.route('/api/approve/<company>', methods=['POST'])
 def approve_company(company):
-    if company == "BCCL": company = "Bharat Coking Coal"  # Map BCCL to Bharat Coking Coal
-    if company not in df['CompanyName'].unique():
+    company = ledger.current.companies.resolve(company)
+    if company is None:
         return jsonify({"error": "Company not found"}), 404
-    compliance_status[company] = "approved"
+    store.set_compliance(company, "approved")
+    event_hub.publish('compliance', {"company": company, "status": "approved"})
     return jsonify({"message": f"{company} approved successfully"})
 
 @app.route('/api/reject/<company>', methods=['POST'])
 def reject_company(company):
-    if company == "BCCL": company = "Bharat Coking Coal"  # Map BCCL to Bharat Coking Coal
-    if company not in df['CompanyName'].unique():
+    company = ledger.current.companies.resolve(company)
+    if company is None:
         return jsonify({"error": "Company not found"}), 404
-    compliance_status[company] = "rejected"
+    store.set_compliance(company, "rejected")
+    event_hub.publish('compliance', {"company": company, "status": "rejected"})
     return jsonify({"message": f"{company} rejected successfully"})
 
 @app.route('/api/send-notice', methods=['POST'])
@@ -132,16 +319,23 @@ def send_notice():
     if not notice_text:
         return jsonify({"error": "Notice text required"}), 400
     notice = {"date": datetime.now().strftime("%d/%m/%Y"), "text": notice_text}
-    notices.append(notice)
+    store.add_notice(notice["text"], notice["date"])
+    event_hub.publish('notice', notice)
     return jsonify({"message": "Notice sent successfully", "notice": notice})
 
 @app.route('/api/notices', methods=['GET'])
+@response_cache.cached
 def get_notices():
-    return jsonify(notices)
+    """Most recent notices, oldest first: /api/notices?limit=100&offset=0"""
+    limit, offset, error = page_args()
+    if error:
+        return jsonify({"error": error}), 400
+    return paged(store.list_notices(limit, offset), store.count_notices())
 
 @app.route('/api/auctions', methods=['GET'])
+@response_cache.cached
 def get_auctions():
-    return jsonify(auctions)
+    return jsonify(store.list_auctions())
 
 @app.route('/api/start-auction', methods=['POST'])
 def start_auction():
@@ -156,79 +350,112 @@ def start_auction():
         "status": "Open",
         "created": datetime.now().strftime("%d/%m/%Y")  # Add creation date
     }
-    auctions.append(auction)
+    store.add_auction(auction)
+    event_hub.publish('auction', auction)
     return jsonify({"message": "Auction started successfully", "auction": auction})
 
 @app.route('/api/reports', methods=['GET'])
 def get_reports():
-    return jsonify(reports)
+    return jsonify(store.list_reports())
+
+def report_entry(job, url_root):
+    """The /api/reports record for a finished job."""
+    title = job['type'].capitalize() + " Report"
+    if job['breakdown'] != 'company':
+        title += f" by {job['breakdown']}"
+    return {
+        "date": datetime.fromisoformat(job['finished_at']).strftime("%d/%m/%Y"),
+        "type": title,
+        "url": f"{url_root}{REPORTS_DIR}/{job['filename']}"
+    }
+
+def job_response(job, url_root):
+    body = {"job": job, "status_url": f"{url_root}api/reports/jobs/{job['id']}"}
+    if job['status'] == 'done':
+        body.update(message="Report generated successfully", report=report_entry(job, url_root))
+        return jsonify(body)
+    if job['status'] == 'failed':
+        body.update(error=job['error'] or "Report failed")
+        return jsonify(body), 500
+    body.update(message="Report queued")
+    return jsonify(body), 202
 
 @app.route('/api/generate-report', methods=['POST'])
 def generate_report():
-    data = request.json
+    """
+    Queue a report job: {"type": "production", "breakdown": "company|year|mine",
+    "format": "csv.gz|csv|parquet", "wait": 10}
+
+    Waits up to `wait` seconds (REPORT_SYNC_WAIT at most) and returns the
+    report like before; longer jobs answer 202 with a status_url to poll.
+    The same report on unchanged data returns the existing job and file.
+    """
+    data = request.get_json(silent=True) or {}
     report_type = data.get('type', '')
-    if report_type not in ['production', 'emissions', 'compliance']:
+    breakdown = data.get('breakdown', 'company')
+    fmt = data.get('format', 'csv.gz')
+    if report_type not in REPORTS:
         return jsonify({"error": "Invalid report type"}), 400
-
-    report_date = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = f"{report_type}_report_{report_date}.csv"
-    report_path = os.path.join(REPORTS_DIR, filename)
-
-    if report_type == 'production':
-        report_df = df.groupby('CompanyName').agg({
-            'CoalProduced_Tons': 'sum',
-            'Year': 'count'
-        }).rename(columns={'CoalProduced_Tons': 'Total_Production_Tons', 'Year': 'Years_Covered'})
-        report_df.to_csv(report_path)
-    elif report_type == 'emissions':
-        report_df = df.groupby('CompanyName').agg({
-            'Total_CO2_Emissions_Tons': 'sum',
-            'Net_CO2_Emissions_Tons': 'sum',
-            'Emission_Intensity': 'mean'
-        })
-        report_df.to_csv(report_path)
-    elif report_type == 'compliance':
-        report_df = df.groupby('CompanyName').agg({
-            'Score': 'mean',
-            'Green_Investment_Ratio': 'mean',
-            'RenewableEnergyUsage_MWh': 'sum',
-            'Afforestation_Acres': 'sum'
-        })
-        report_df.to_csv(report_path)
-
-    report = {
-        "date": datetime.now().strftime("%d/%m/%Y"),
-        "type": report_type.capitalize() + " Report",
-        "url": f"http://localhost:5005/{REPORTS_DIR}/{filename}"
-    }
-    reports.append(report)
-    return jsonify({"message": "Report generated successfully", "report": report})
+    if breakdown not in BREAKDOWNS:
+        return jsonify({"error": f"breakdown must be one of {', '.join(BREAKDOWNS)}"}), 400
+    if fmt not in FORMATS:
+        return jsonify({"error": f"format must be one of {', '.join(FORMATS)}"}), 400
+    if fmt == 'parquet' and not parquet_available():
+        return jsonify({"error": "Parquet output needs pyarrow installed"}), 400
+    try:
+        wait = min(max(float(data.get('wait', REPORT_SYNC_WAIT)), 0), REPORT_SYNC_WAIT)
+    except (TypeError, ValueError):
+        return jsonify({"error": "wait must be a number of seconds"}), 400
+
+    url_root = request.url_root
+
+    def publish(job):
+        report = report_entry(job, url_root)
+        store.add_report(report)
+        event_hub.publish('report', report)
+
+    snapshot, version = data_version()
+    job, _ = report_jobs.submit(snapshot, version, report_type, breakdown, fmt, on_done=publish)
+    if job['status'] in ('queued', 'running') and wait:
+        job = report_jobs.wait(job['id'], wait)
+    return job_response(job, url_root)
+
+@app.route('/api/reports/jobs/<job_id>', methods=['GET'])
+def get_report_job(job_id):
+    job = store.get_report_job(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return job_response(job, request.url_root)
 
 @app.route(f'/{REPORTS_DIR}/<filename>')
 def serve_report(filename):
-    return send_from_directory(REPORTS_DIR, filename)
+    return send_from_directory(REPORTS_PATH, filename)
 
 # Communication Channel Endpoints
 @app.route('/api/messages/<company>', methods=['GET'])
 def get_company_messages(company):
-    if company == "BCCL": company = "Bharat Coking Coal"  # Map BCCL to Bharat Coking Coal
-    if company not in df['CompanyName'].unique():
+    company = ledger.current.companies.resolve(company)
+    if company is None:
         return jsonify({"error": "Company not found"}), 404
-    company_messages = [msg for msg in messages if msg["company"] == company]
-    return jsonify(company_messages)
+    limit, offset, error = page_args()
+    if error:
+        return jsonify({"error": error}), 400
+    return paged(store.list_messages(company, limit, offset), store.count_messages(company))
 
 @app.route('/api/messages/all', methods=['GET'])
 def get_all_messages():
-    return jsonify(messages)
+    limit, offset, error = page_args()
+    if error:
+        return jsonify({"error": error}), 400
+    return paged(store.list_messages(None, limit, offset), store.count_messages())
 
 @app.route('/api/send-message', methods=['POST'])
 def send_message():
     data = request.json
-    company = data.get('company', '')
-    if company == "BCCL": company = "Bharat Coking Coal"  # Map BCCL to Bharat Coking Coal
+    company = ledger.current.companies.resolve(data.get('company', ''))
     text = data.get('text', '')
     sender = data.get('sender', company)
-    if not company or not text or company not in df['CompanyName'].unique():
+    if not company or not text:
         return jsonify({"error": "Valid company and message text required"}), 404
     message = {
         "company": company,
@@ -236,27 +463,25 @@ def send_message():
         "sender": sender,
         "date": datetime.now().strftime("%d/%m/%Y %H:%M")
     }
-    messages.append(message)
+    store.add_message(message)
+    event_hub.publish('company-message', message)
     return jsonify({"message": "Message sent successfully", "message": message})
 
 @app.route('/api/company-summary', methods=['GET'])
+@response_cache.cached
 def get_company_summary():
     summary_list = []
-    for company in df['CompanyName'].unique():
-        company_data = df[df['CompanyName'] == company]
-        total_prod = int(company_data['CoalProduced_Tons'].sum())
-        total_emi = int(company_data['Total_CO2_Emissions_Tons'].sum())
-        avg_intensity = round(company_data['Emission_Intensity'].mean(), 3) if 'Emission_Intensity' in df.columns else None
-        avg_score = round(company_data['Score'].mean(), 2) if 'Score' in df.columns else None
-        green_ratio = round(company_data['Green_Investment_Ratio'].mean(), 2) if 'Green_Investment_Ratio' in df.columns else None
-        status = compliance_status.get(company, 'pending')
+    statuses = store.compliance_statuses()
+    snapshot = ledger.current
+    for company, totals in snapshot.aggregates.items():
+        status = statuses.get(company, 'pending')
         summary_list.append({
-            'company': "BCCL" if company=="Bharat Coking Coal" else company,
-            'production': total_prod,
-            'emissions': total_emi,
-            'intensity': avg_intensity,
-            'score': avg_score,
-            'green_investment_ratio': green_ratio,
+            'company': snapshot.companies.display_name(company),
+            'production': totals['production'],
+            'emissions': totals['emissions'],
+            'intensity': totals['intensity'],
+            'score': totals['score'],
+            'green_investment_ratio': totals['green_investment_ratio'],
             'status': status
         })
     return jsonify(summary_list)
@@ -265,44 +490,143 @@ def get_company_summary():
 
 
 @app.route('/api/predict-future', methods=['GET'])
+@response_cache.cached
 def predict_future():
     """
-    Simple linear projection of next month's production and emissions
-    based on yearly averages and growth trend.
+    Linear projection of yearly production and emissions from each series'
+    least-squares trend.
+
+    /api/predict-future                          -> national, next year
+    /api/predict-future?company=BCCL&horizon=3   -> one company, next 3 years
+    """
+    snapshot = ledger.current
+    company = request.args.get('company', NATIONAL)
+    horizon = request.args.get('horizon', 1, type=int)
+    if not horizon or not 1 <= horizon <= MAX_FORECAST_HORIZON:
+        return jsonify({"error": f"horizon must be between 1 and {MAX_FORECAST_HORIZON}"}), 400
+    if company is not NATIONAL:
+        company = snapshot.companies.resolve(company)
+        if company is None:
+            return jsonify({"error": "Company not found"}), 404
+
+    with timer('predict'):
+        forecast = snapshot.forecaster.predict(company, horizon)
+    if forecast is None:
+        # No ledger rows at all
+        forecast = [{"year": datetime.now().year + 1, "predicted_production": 0, "predicted_emissions": 0}]
+
+    # Next year at the top level, as the dashboard expects
+    result = dict(forecast[0], forecast=forecast)
+    if company is not NATIONAL:
+        result["company"] = snapshot.companies.display_name(company)
+    return jsonify(result)
+
+
+# Ledger ingestion
+@app.route('/api/ingest', methods=['POST'])
+def ingest():
+    """
+    Append company-year records without a restart.
+
+    JSON body {"rows": [{"CompanyName": ..., "Year": ..., ...}, ...]} or a
+    text/csv body with the ledger's header row.
     """
     try:
-        # Compute yearly totals for each company
-        df['Year'] = pd.to_datetime(df['Year'], errors='coerce')
-        yearly = df.groupby(df['Year'].dt.year).agg({
-            'CoalProduced_Tons': 'sum',
-            'Total_CO2_Emissions_Tons': 'sum'
-        }).reset_index()
-
-        # Simple trend prediction (linear extrapolation)
-        if len(yearly) > 1:
-            yearly = yearly.sort_values('Year')
-            prod_growth = yearly['CoalProduced_Tons'].pct_change().mean()
-            emi_growth = yearly['Total_CO2_Emissions_Tons'].pct_change().mean()
-
-            next_year = int(yearly['Year'].max() + 1)
-            next_prod = yearly['CoalProduced_Tons'].iloc[-1] * (1 + prod_growth)
-            next_emi = yearly['Total_CO2_Emissions_Tons'].iloc[-1] * (1 + emi_growth)
+        if request.mimetype == 'text/csv':
+            rows = pd.read_csv(request.stream)
         else:
-            next_year = datetime.now().year + 1
-            next_prod = df['CoalProduced_Tons'].mean()
-            next_emi = df['Total_CO2_Emissions_Tons'].mean()
-
-        return jsonify({
-            "year": next_year,
-            "predicted_production": round(next_prod, 2),
-            "predicted_emissions": round(next_emi, 2)
-        })
-
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-
+            data = request.get_json(silent=True) or {}
+            rows = pd.DataFrame(data.get('rows') or [])
+        if rows.empty:
+            return jsonify({"error": "No records to ingest"}), 400
+        snapshot = None
+        for start in range(0, len(rows), INGEST_BATCH_ROWS):
+            snapshot = ingest_rows(rows.iloc[start:start + INGEST_BATCH_ROWS])
+    except (ValueError, pd.errors.ParserError) as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"message": "Records ingested successfully", "rows": len(rows),
+                    "total_rows": snapshot.rows, "version": snapshot.version})
+
+@app.route('/api/reload', methods=['POST'])
+def reload_data():
+    snapshot = load_data()
+    # Other workers reload when they see the new version
+    with ingest_lock:
+        version = record_ledger_change(snapshot)
+    publish_ledger_change(snapshot, version)
+    return jsonify({"message": "Ledger reloaded", "total_rows": snapshot.rows, "version": snapshot.version})
+
+def watch_inbox(inbox, interval):
+    """
+    Ingest CSV files dropped into `inbox`, then move them to inbox/processed.
 
+    Run it in one worker only; the others reload when they see the ledger
+    version it bumps.
+    """
+    done_dir = os.path.join(inbox, 'processed')
+    os.makedirs(done_dir, exist_ok=True)
+    while True:
+        for name in sorted(os.listdir(inbox)):
+            path = os.path.join(inbox, name)
+            if not name.endswith('.csv') or not os.path.isfile(path):
+                continue
+            try:
+                for rows in pd.read_csv(path, chunksize=INGEST_BATCH_ROWS):
+                    ingest_rows(rows)
+                shutil.move(path, os.path.join(done_dir, name))
+            except Exception:
+                app.logger.exception("Failed to ingest %s", path)
+                shutil.move(path, os.path.join(done_dir, name + '.failed'))
+        time.sleep(interval)
+
+# Watch an inbox directory for new ledger files when MODEL6_WATCH_DIR is set
+# (skipped in the debug reloader's parent process, which serves nothing)
+WATCH_DIR = os.environ.get('MODEL6_WATCH_DIR')
+if WATCH_DIR and (__name__ != '__main__' or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'):
+    os.makedirs(WATCH_DIR, exist_ok=True)
+    threading.Thread(target=watch_inbox, args=(WATCH_DIR, float(os.environ.get('MODEL6_WATCH_INTERVAL', 5))),
+                     name='ledger-watcher', daemon=True).start()
+
+# Live updates
+@app.route('/api/events', methods=['GET'])
+def stream_events():
+    """
+    Server-Sent Events stream of dashboard changes.
 
+    Each idle connection is one blocked wait on the hub, so run this under an
+    async worker (see gunicorn.conf.py) rather than one thread per client.
+    """
+    last_id = request.headers.get('Last-Event-ID') or request.args.get('since') or event_hub.last_id()
+
+    def generate(last_id):
+        yield "retry: 3000\n\n"
+        while True:
+            events = event_hub.wait(last_id, SSE_KEEPALIVE_SECONDS)
+            if not events:
+                yield ": keepalive\n\n"
+                continue
+            for event in events:
+                yield format_sse(event)
+            last_id = events[-1]['id']
+
+    response = Response(stream_with_context(generate(last_id)), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/api/events/poll', methods=['GET'])
+def poll_events():
+    """Long-poll fallback: /api/events/poll?since=<id>&timeout=25"""
+    since = request.args.get('since')
+    timeout = min(request.args.get('timeout', 25, type=float), LONG_POLL_MAX_SECONDS)
+    if not since:
+        return jsonify({"events": [], "last_id": event_hub.last_id()})
+    events = event_hub.wait(since, timeout)
+    return jsonify({"events": events, "last_id": events[-1]['id'] if events else since})
+
+@app.route('/api/cache-stats', methods=['GET'])
+def cache_stats():
+    return response_cache.stats_view()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,58 @@
+"""
+Dictionary encoding of the ledger's company names.
+
+Every company gets an integer code in order of first appearance, which is
+also the code of its CompanyName category in the ledger frame. Names and
+short aliases such as BCCL resolve to a code with one dict lookup, so
+handlers never scan the CompanyName column.
+"""
+import pandas as pd
+
+# Short name accepted in URLs and shown on the dashboard -> ledger name
+ALIASES = {'BCCL': 'Bharat Coking Coal'}
+
+
+class CompanyIndex:
+    def __init__(self, names=(), aliases=ALIASES):
+        self.names = []
+        self.codes = {}
+        self.aliases = dict(aliases)
+        self._display = {name: alias for alias, name in self.aliases.items()}
+        self._add(names)
+
+    def _add(self, names):
+        for name in names:
+            if name not in self.codes:
+                self.codes[name] = len(self.names)
+                self.names.append(name)
+
+    def extended(self, names):
+        """A new index with any unseen `names` appended; existing codes do not change."""
+        new = CompanyIndex(aliases=self.aliases)
+        new.names = list(self.names)
+        new.codes = dict(self.codes)
+        new._add(names)
+        return new
+
+    def code(self, name):
+        """The code of a company name or alias, or None if it is not in the ledger."""
+        return self.codes.get(self.aliases.get(name, name))
+
+    def resolve(self, name):
+        """The ledger name for a company name or alias, or None if it is not in the ledger."""
+        code = self.code(name)
+        return None if code is None else self.names[code]
+
+    def display_name(self, name):
+        """The name the dashboard shows for a ledger name (its alias, if it has one)."""
+        return self._display.get(name, name)
+
+    def dtype(self):
+        """Categorical dtype whose codes are this index's codes."""
+        return pd.CategoricalDtype(self.names)
+
+    def __contains__(self, name):
+        return self.code(name) is not None
+
+    def __len__(self):
+        return len(self.names)
@@ -0,0 +1,84 @@
+"""
+Publish/subscribe hub behind the dashboard's live event stream.
+
+Events get increasing ids and are kept in a short history, so a client
+that reconnects with its last id (SSE Last-Event-ID or ?since= on the
+long-poll endpoint) gets whatever it missed. Subscribers never register:
+they simply wait for ids newer than the last one they saw.
+
+LocalEventHub lives in one process and is what tests and single-worker
+runs use. RedisEventHub shares events between gunicorn workers through a
+Redis stream. Pick one with EVENT_HUB_URL (unset = local).
+"""
+import json
+import os
+import threading
+from collections import deque
+
+HISTORY_SIZE = 500
+
+
+class LocalEventHub:
+    shared = False  # events reach this process's clients only
+
+    def __init__(self, history=HISTORY_SIZE):
+        self._cond = threading.Condition()
+        self._events = deque(maxlen=history)
+        self._last_id = 0
+
+    def publish(self, name, data):
+        with self._cond:
+            self._last_id += 1
+            self._events.append({'id': str(self._last_id), 'event': name, 'data': data})
+            self._cond.notify_all()
+
+    def last_id(self):
+        return str(self._last_id)
+
+    def wait(self, after_id, timeout):
+        """Events newer than after_id, blocking up to timeout seconds for the first one."""
+        try:
+            after = int(after_id)
+        except (TypeError, ValueError):
+            after = self._last_id
+        with self._cond:
+            if after > self._last_id:
+                # Id from before a restart: replay what this process has
+                after = 0
+            self._cond.wait_for(lambda: self._last_id > after, timeout)
+            return [e for e in self._events if int(e['id']) > after]
+
+
+class RedisEventHub:
+    shared = True
+
+    def __init__(self, url, stream='model6:events', history=HISTORY_SIZE):
+        import redis  # optional dependency, only needed for multi-worker deployments
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+        self._stream = stream
+        self._history = history
+
+    def publish(self, name, data):
+        self._redis.xadd(self._stream, {'event': name, 'data': json.dumps(data)},
+                         maxlen=self._history, approximate=True)
+
+    def last_id(self):
+        entries = self._redis.xrevrange(self._stream, count=1)
+        return entries[0][0] if entries else '0-0'
+
+    def wait(self, after_id, timeout):
+        after = after_id or self.last_id()
+        result = self._redis.xread({self._stream: after}, block=int(timeout * 1000))
+        if not result:
+            return []
+        return [{'id': event_id, 'event': fields['event'], 'data': json.loads(fields['data'])}
+                for event_id, fields in result[0][1]]
+
+
+def create_hub():
+    url = os.environ.get('EVENT_HUB_URL')
+    return RedisEventHub(url) if url else LocalEventHub()
+
+
+def format_sse(event):
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+
+FORECAST_METRICS = ['CoalProduced_Tons', 'Total_CO2_Emissions_Tons']
+NATIONAL = None  # key used for the all-companies series
+
+
+class ForecastEngine:
+    """
+    Per-company linear trends of yearly production and emissions.
+
+    Each series (every company plus the national total) keeps the sums a
+    least-squares line needs: n, Σx and Σx² over its reported years, and
+    Σy and Σxy per metric, with x the years since the first year seen.
+    New rows only add to those sums (a year seen for the first time also
+    adds to n, Σx and Σx²), so new data never regroups the ledger. The
+    slopes and intercepts of all series are then one vectorized step,
+    reused until the sums change again.
+    """
+
+    def __init__(self, df=None):
+        self.index = pd.Index([NATIONAL], dtype=object)  # row 0 is the national series
+        self.years = pd.Index([], dtype='int64')
+        self.origin = None
+        self.observed = np.zeros((1, 0), dtype=bool)
+        self.n = np.zeros(1)
+        self.sx = np.zeros(1)
+        self.sxx = np.zeros(1)
+        self.sy = np.zeros((1, len(FORECAST_METRICS)))
+        self.sxy = np.zeros((1, len(FORECAST_METRICS)))
+        self.last_year = np.full(1, np.iinfo(np.int64).min)
+        self._fits = None
+        if df is not None:
+            self.add_rows(df)
+
+    def add_rows(self, rows):
+        """Fold new ledger rows into the sums."""
+        if rows.empty:
+            return
+        grouped = rows.groupby(['CompanyName', 'Year'], observed=True)[FORECAST_METRICS].sum()
+        names = np.asarray(grouped.index.get_level_values(0), dtype=object)
+        years = np.asarray(grouped.index.get_level_values(1), dtype=np.int64)
+        values = grouped.to_numpy(dtype=float)
+        if self.origin is None:
+            self.origin = int(years.min())
+
+        series = self._series_codes(names)
+        # The national series gets each year's total over the batch
+        national_years, inverse = np.unique(years, return_inverse=True)
+        national_values = np.zeros((len(national_years), len(FORECAST_METRICS)))
+        np.add.at(national_values, inverse, values)
+
+        self._fold(np.concatenate([series, np.zeros(len(national_years), dtype=np.int64)]),
+                   np.concatenate([years, national_years]),
+                   np.concatenate([values, national_values]))
+        self._fits = None
+
+    def _series_codes(self, names):
+        codes = self.index.get_indexer(names)
+        unseen = pd.unique(names[codes < 0])
+        if len(unseen):
+            self.index = self.index.append(pd.Index(unseen, dtype=object))
+            grow = len(unseen)
+            self.observed = np.vstack([self.observed, np.zeros((grow, self.observed.shape[1]), dtype=bool)])
+            self.n, self.sx, self.sxx = (np.concatenate([a, np.zeros(grow)]) for a in (self.n, self.sx, self.sxx))
+            self.sy, self.sxy = (np.vstack([a, np.zeros((grow, a.shape[1]))]) for a in (self.sy, self.sxy))
+            self.last_year = np.concatenate([self.last_year, np.full(grow, np.iinfo(np.int64).min)])
+            codes = self.index.get_indexer(names)
+        return codes
+
+    def _year_codes(self, years):
+        codes = self.years.get_indexer(years)
+        unseen = np.unique(years[codes < 0])
+        if len(unseen):
+            self.years = self.years.append(pd.Index(unseen, dtype='int64'))
+            self.observed = np.hstack([self.observed, np.zeros((self.observed.shape[0], len(unseen)), dtype=bool)])
+            codes = self.years.get_indexer(years)
+        return codes
+
+    def _fold(self, series, years, values):
+        # (series, year) pairs are unique within one call; series repeat, hence add.at
+        x = (years - self.origin).astype(float)
+        columns = self._year_codes(years)
+        first = ~self.observed[series, columns]
+        self.observed[series, columns] = True
+        np.add.at(self.n, series[first], 1)
+        np.add.at(self.sx, series[first], x[first])
+        np.add.at(self.sxx, series[first], x[first] ** 2)
+        np.add.at(self.sy, series, values)
+        np.add.at(self.sxy, series, x[:, None] * values)
+        np.maximum.at(self.last_year, series, years)
+
+    def extended(self, rows):
+        """A new engine with `rows` added; this one is left untouched."""
+        new = ForecastEngine()
+        new.index, new.years, new.origin = self.index, self.years, self.origin
+        for name in ('observed', 'n', 'sx', 'sxx', 'sy', 'sxy', 'last_year'):
+            setattr(new, name, getattr(self, name).copy())
+        new.add_rows(rows)
+        return new
+
+    def companies(self):
+        return sorted(self.index[1:])
+
+    def fits(self):
+        """(intercept, slope) arrays, one row per series in `index`, with x in years since `origin`."""
+        if self._fits is None:
+            n, sx, sxx = self.n[:, None], self.sx[:, None], self.sxx[:, None]
+            denom = n * sxx - sx * sx
+            with np.errstate(divide='ignore', invalid='ignore'):
+                slope = np.where(denom > 0, (n * self.sxy - sx * self.sy) / denom, 0.0)
+                intercept = np.where(n > 0, (self.sy - slope * sx) / n, 0.0)
+            self._fits = intercept, slope
+        return self._fits
+
+    def predict(self, company=NATIONAL, horizon=1):
+        """
+        Projected totals for the `horizon` years after the company's last
+        reported year, or None if the company has no data.
+        """
+        code = self.index.get_indexer([company])[0]
+        if code < 0 or not self.n[code]:
+            return None
+        intercept, slope = (fit[code] for fit in self.fits())
+        last_year = int(self.last_year[code])
+        forecast = []
+        for year in range(last_year + 1, last_year + horizon + 1):
+            production, emissions = np.maximum(intercept + slope * (year - self.origin), 0)
+            forecast.append({
+                "year": year,
+                "predicted_production": round(float(production), 2),
+                "predicted_emissions": round(float(emissions), 2)
+            })
+        return forecast
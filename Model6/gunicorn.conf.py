@@ -0,0 +1,17 @@
+# Production server for the dashboard API:
+#
+#     gunicorn -c gunicorn.conf.py app:app
+#
+# gevent workers run each request in a greenlet, so the long-lived
+# /api/events streams cost a few KB each instead of a thread apiece.
+# With more than one worker set EVENT_HUB_URL=redis://... so every worker
+# sees the same events.
+import os
+
+bind = os.environ.get('MODEL6_BIND', '0.0.0.0:5005')
+workers = int(os.environ.get('MODEL6_WORKERS', 1))
+worker_class = 'gevent'
+worker_connections = 5000
+# SSE responses stay open; keep-alive comments go out every 15 s
+timeout = 60
+keepalive = 75
@@ -0,0 +1,214 @@
+"""
+The company ledger and everything derived from it, published as immutable
+snapshots.
+
+Request handlers read ``ledger.current`` once and work from that snapshot.
+Writers (a full reload or an appended batch) build a complete new snapshot
+and then swap it in with a single attribute assignment, so readers never
+see a half-updated state and never wait on a lock. Appends only fold the
+new rows into the derived aggregates instead of recomputing them.
+
+The ledger frame is kept compact: CompanyName is a categorical coded by
+the snapshot's CompanyIndex, CompanyID is categorical too, integer columns
+are downcast to the narrowest type that holds them, and rows are sorted
+(stably) by company code. A company's rows are then one contiguous slice,
+found from the code with the offsets array. A columnar store ingested with
+``--sort-by CompanyName`` is already in that order and encoded that way,
+so its memory-mapped columns are used as they are instead of copied.
+
+Appended rows go to a small tail frame, kept in the same order with its
+own offsets, so an append re-sorts the tail rather than the whole ledger
+and leaves the (possibly memory-mapped) base frame alone. Once the tail
+outgrows TAIL_ROWS rows and 1/TAIL_SHARE of the base, the two are merged
+into a new base.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from aggregates import CompanyAggregates
+from common.columnar import downcast
+from companies import CompanyIndex
+from forecast import ForecastEngine
+
+# Columns an appended record must have; the rest of the ledger schema is optional
+REQUIRED_COLUMNS = ['CompanyName', 'Year', 'CoalProduced_Tons', 'Total_CO2_Emissions_Tons']
+
+# Appended rows are merged into the base frame once there are more than
+# TAIL_ROWS of them and more than 1/TAIL_SHARE of the base
+TAIL_ROWS = 65536
+TAIL_SHARE = 16
+
+
+class LedgerSnapshot:
+    def __init__(self, df, aggregates, forecaster, version, companies=None, offsets=None,
+                 tail=None, tail_offsets=None):
+        self.base = df
+        self.aggregates = aggregates
+        self.forecaster = forecaster
+        self.version = version
+        self.companies = companies if companies is not None else CompanyIndex()
+        # Rows of company code c are base.iloc[offsets[c]:offsets[c + 1]], followed by
+        # tail.iloc[tail_offsets[c]:tail_offsets[c + 1]] when rows were appended since
+        self.offsets = offsets if offsets is not None else np.zeros(1, dtype=np.int64)
+        self.tail = tail
+        self.tail_offsets = tail_offsets
+        self.rows = len(df) + (len(tail) if tail is not None else 0)
+        self._df = df if tail is None else None
+        # Shared id of the data this snapshot holds, set by the app when it knows one
+        self.source_version = None
+
+    @property
+    def df(self):
+        """The whole ledger as one frame (base and tail are joined the first time it is needed)."""
+        if self._df is None:
+            self._df = concat([self.base, self.tail], self.companies)
+        return self._df
+
+    def company_rows(self, company):
+        """A company's ledger rows (name or alias), in ledger order; None if it is not in the ledger."""
+        code = self.companies.code(company)
+        if code is None:
+            return None
+        rows = self.base.iloc[self.offsets[code]:self.offsets[code + 1]]
+        if self.tail is None or self.tail_offsets[code] == self.tail_offsets[code + 1]:
+            return rows
+        return concat([rows, self.tail.iloc[self.tail_offsets[code]:self.tail_offsets[code + 1]]], self.companies)
+
+
+class Ledger:
+    def __init__(self):
+        self.current = None
+        self._write_lock = threading.Lock()
+
+    def load(self, df):
+        """Replace the whole ledger, rebuilding every derived structure."""
+        missing = df['CompanyName'].isna().to_numpy()
+        if missing.any():
+            # Rows without a company belong to no group in any view. A sorted
+            # store keeps them last, where slicing them off copies nothing.
+            first = missing.argmax()
+            df = df.iloc[:first] if missing[first:].all() else df[~missing]
+        companies = CompanyIndex(pd.unique(df['CompanyName']))
+        df, offsets = compact(df, companies)
+        with self._write_lock:
+            version = self.current.version + 1 if self.current else 1
+            self.current = LedgerSnapshot(df, CompanyAggregates(df), ForecastEngine(df), version,
+                                          companies, offsets)
+        return self.current
+
+    def append(self, rows):
+        """Add a batch of company-year records and publish the updated snapshot."""
+        rows = normalize_rows(rows)
+        with self._write_lock:
+            old = self.current
+            latest = old.tail if old.tail is not None else old.base
+            if not latest.empty:
+                rows = rows.reindex(columns=latest.columns.union(rows.columns, sort=False))
+            # New companies get the next codes, so the old rows keep theirs
+            companies = old.companies.extended(pd.unique(rows['CompanyName']))
+            batch = encode(rows, companies)
+            tail = batch if old.tail is None else concat([old.tail, batch], companies)
+            tail, tail_offsets = compact(tail, companies)
+            base, offsets = old.base, extend_offsets(old.offsets, len(companies))
+            if len(tail) > max(TAIL_ROWS, len(base) // TAIL_SHARE):
+                base, offsets = compact(concat([base, tail], companies), companies)
+                tail = tail_offsets = None
+            self.current = LedgerSnapshot(base, old.aggregates.merged(rows), old.forecaster.extended(rows),
+                                          old.version + 1, companies, offsets, tail, tail_offsets)
+        return self.current
+
+
+def encode(df, companies):
+    """
+    df with CompanyName coded by `companies`, CompanyID categorical and the
+    integer columns downcast. Columns that already are come through uncopied.
+    """
+    columns = {}
+    for col in df.columns:
+        values = df[col]
+        if col == 'CompanyName':
+            # Unordered dtypes compare equal whatever their category order, so check the codes line up
+            if not (isinstance(values.dtype, pd.CategoricalDtype)
+                    and values.cat.categories.equals(companies.dtype().categories)):
+                values = pd.Categorical(values, dtype=companies.dtype())
+        elif col == 'CompanyID':
+            if not isinstance(values.dtype, pd.CategoricalDtype):
+                values = pd.Categorical(values, categories=values.dropna().unique())
+        elif isinstance(values.dtype, np.dtype) and values.dtype.kind in 'iu':
+            narrow = downcast(values.to_numpy())
+            if narrow.dtype != values.dtype:
+                values = narrow
+        columns[col] = values
+    return pd.DataFrame(columns, index=df.index, copy=False)
+
+
+def concat(frames, companies):
+    """
+    pd.concat of encoded frames. CompanyName is coded by `companies` and
+    CompanyID by the union of the frames' IDs, so both stay categorical; only
+    the codes of frames whose categories differ are remapped.
+    """
+    dtypes = {'CompanyName': companies.dtype()}
+    if all('CompanyID' in f and isinstance(f['CompanyID'].dtype, pd.CategoricalDtype) for f in frames):
+        categories = frames[0]['CompanyID'].cat.categories
+        for f in frames[1:]:
+            new = f['CompanyID'].cat.categories
+            new = new[~new.isin(categories)]
+            if len(new):
+                categories = categories.append(new)
+        dtypes['CompanyID'] = pd.CategoricalDtype(categories)
+    frames = [f.assign(**{col: recode(f[col].array, dtype) for col, dtype in dtypes.items() if col in f})
+              for f in frames]
+    return pd.concat(frames, ignore_index=True)
+
+
+def recode(values, dtype):
+    """A categorical with the categories of `dtype`, which holds all of values' categories."""
+    if values.categories.equals(dtype.categories):
+        return values
+    codes = values.codes
+    if not dtype.categories[:len(values.categories)].equals(values.categories):
+        codes = np.where(codes < 0, -1, dtype.categories.get_indexer(values.categories)[codes])
+    return pd.Categorical.from_codes(codes, dtype=dtype)
+
+
+def extend_offsets(offsets, n_companies):
+    """offsets for n_companies codes; codes added since have no rows."""
+    return np.pad(offsets, (0, n_companies + 1 - len(offsets)), mode='edge')
+
+
+def compact(df, companies):
+    """
+    (frame, offsets): df encoded against `companies` (see encode()) with its
+    rows stably sorted by company code, and each code's first row.
+    """
+    df = encode(df, companies)
+    codes = df['CompanyName'].cat.codes.to_numpy()
+    if len(codes) > 1 and (codes[1:] < codes[:-1]).any():
+        order = np.argsort(codes, kind='stable')
+        df = df.take(order)
+        codes = codes[order]
+    if not df.index.equals(pd.RangeIndex(len(df))):
+        df = df.reset_index(drop=True)
+    offsets = np.zeros(len(companies) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(codes, minlength=len(companies)), out=offsets[1:])
+    return df, offsets
+
+
+def normalize_rows(rows):
+    """Check and coerce incoming records (DataFrame or list of dicts) to the ledger dtypes."""
+    rows = pd.DataFrame(rows)
+    missing = [col for col in REQUIRED_COLUMNS if col not in rows.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    if rows[REQUIRED_COLUMNS].isna().any().any():
+        raise ValueError(f"Columns {', '.join(REQUIRED_COLUMNS)} must be set on every record")
+
+    rows['CompanyName'] = rows['CompanyName'].astype(str)
+    rows['Year'] = pd.to_numeric(rows['Year'], errors='raise').astype('int64')
+    for col in rows.columns:
+        if col not in ('CompanyID', 'CompanyName') and rows[col].dtype == object:
+            rows[col] = pd.to_numeric(rows[col], errors='raise')
+    return rows
@@ -0,0 +1,199 @@
+"""
+Report jobs: aggregate the ledger in the background and write compressed
+files under reports/.
+
+A job aggregates the in-memory ledger snapshot with a single groupby into
+per-group sums and non-null counts, which give the final means, sums and
+counts. A ledger that is not in memory (a CSV read with chunksize) can be
+streamed through aggregate_chunks(): each chunk is reduced on a thread
+pool, a few at a time, and the partials are merged. Jobs are
+recorded in the store, so any worker can answer a status poll, and a
+request for a (type, breakdown, format, data version) that already has a
+finished or running job gets that job back instead of a new one.
+"""
+import logging
+import os
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Report type -> [(ledger column, aggregation, output column)]
+REPORTS = {
+    'production': [
+        ('CoalProduced_Tons', 'sum', 'Total_Production_Tons'),
+        ('Year', 'count', 'Years_Covered'),
+    ],
+    'emissions': [
+        ('Total_CO2_Emissions_Tons', 'sum', 'Total_CO2_Emissions_Tons'),
+        ('Net_CO2_Emissions_Tons', 'sum', 'Net_CO2_Emissions_Tons'),
+        ('Emission_Intensity', 'mean', 'Emission_Intensity'),
+    ],
+    'compliance': [
+        ('Score', 'mean', 'Score'),
+        ('Green_Investment_Ratio', 'mean', 'Green_Investment_Ratio'),
+        ('RenewableEnergyUsage_MWh', 'sum', 'RenewableEnergyUsage_MWh'),
+        ('Afforestation_Acres', 'sum', 'Afforestation_Acres'),
+    ],
+}
+
+# Breakdown -> group keys (each CompanyID is one mine/unit of a company)
+BREAKDOWNS = {
+    'company': ['CompanyName'],
+    'year': ['CompanyName', 'Year'],
+    'mine': ['CompanyName', 'CompanyID'],
+}
+
+# Output format -> file suffix
+FORMATS = {'csv': '.csv', 'csv.gz': '.csv.gz', 'parquet': '.parquet'}
+
+
+def _partial(chunk, keys, columns, sort=False):
+    grouped = chunk.groupby(keys, sort=sort, observed=True)[columns]
+    return grouped.sum(), grouped.count()
+
+
+def _columns(report_type, breakdown, available):
+    """(spec, group keys, value columns) for a report, checked against the ledger's columns."""
+    spec = REPORTS[report_type]
+    keys = BREAKDOWNS[breakdown]
+    columns = list(dict.fromkeys(col for col, _, _ in spec))
+    missing = [col for col in keys + columns if col not in available]
+    if missing:
+        raise ValueError(f"Ledger has no {', '.join(missing)} column")
+    return spec, keys, columns
+
+
+def _report(spec, sums, counts):
+    report = pd.DataFrame(index=sums.index)
+    for col, how, out in spec:
+        if how == 'sum':
+            report[out] = sums[col]
+        elif how == 'count':
+            report[out] = counts[col]
+        else:
+            report[out] = sums[col] / counts[col].where(counts[col] > 0)
+
+    # Categorical keys (the ledger's company columns) group in code order; reports sort by value
+    if any(isinstance(dtype, pd.CategoricalDtype) for dtype in report.index.to_frame().dtypes):
+        keys = list(report.index.names)
+        report = report.reset_index()
+        for key in keys:
+            if isinstance(report[key].dtype, pd.CategoricalDtype):
+                report[key] = report[key].astype(report[key].cat.categories.dtype)
+        report = report.set_index(keys).sort_index()
+    return report
+
+
+def aggregate(df, report_type, breakdown='company'):
+    """The report table for an in-memory ledger `df`, indexed by the breakdown's group keys."""
+    spec, keys, columns = _columns(report_type, breakdown, df.columns)
+    sums, counts = _partial(df, keys, columns, sort=True)
+    return _report(spec, sums, counts)
+
+
+def aggregate_chunks(chunks, report_type, breakdown='company', workers=4):
+    """
+    aggregate() over an iterable of ledger chunks, e.g.
+    pd.read_csv(path, chunksize=250000), without holding the ledger in
+    memory: at most `workers` chunks are grouped at a time.
+    """
+    partials, pending = [], deque()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for chunk in chunks:
+            spec, keys, columns = _columns(report_type, breakdown, chunk.columns)
+            if len(pending) >= workers:
+                partials.append(pending.popleft().result())
+            pending.append(pool.submit(_partial, chunk, keys, columns))
+        partials.extend(future.result() for future in pending)
+    if not partials:
+        raise ValueError('Ledger has no rows')
+
+    # Groups can span chunks, so partial sums and counts are summed once more
+    levels = list(range(len(keys)))
+    sums = pd.concat([s for s, _ in partials]).groupby(level=levels).sum()
+    counts = pd.concat([c for _, c in partials]).groupby(level=levels).sum()
+    return _report(spec, sums, counts)
+
+
+def write_report(report, path, fmt):
+    tmp = f'{path}.{os.getpid()}.tmp'
+    if fmt == 'parquet':
+        report.to_parquet(tmp)
+    else:
+        report.to_csv(tmp, compression='gzip' if fmt == 'csv.gz' else None)
+    os.replace(tmp, path)
+
+
+def parquet_available():
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class ReportJobs:
+    """
+    Runs report jobs on a small thread pool and tracks them in the store.
+    With a common.metrics.Metrics, the aggregate and write stages are timed.
+    """
+
+    def __init__(self, store, reports_path, max_workers=2, metrics=None):
+        self.store = store
+        self.reports_path = reports_path
+        self.metrics = metrics
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='report')
+
+    def submit(self, snapshot, data_version, report_type, breakdown='company', fmt='csv.gz', on_done=None):
+        """
+        (job, created): an existing job for the same report and data, or a
+        newly queued one. on_done(job) is called after a new job succeeds.
+        """
+        job, created = self.store.claim_report_job(uuid.uuid4().hex, report_type, breakdown, fmt, data_version)
+        if not created and job['status'] == 'done' and not os.path.exists(self.path(job)):
+            self.store.update_report_job(job['id'], status='failed', error='report file was removed')
+            return self.submit(snapshot, data_version, report_type, breakdown, fmt, on_done)
+        if created:
+            self._pool.submit(self._run, job, snapshot, on_done)
+        return job, created
+
+    def path(self, job):
+        return os.path.join(self.reports_path, job['filename'] or self.filename(job))
+
+    @staticmethod
+    def filename(job):
+        return f"{job['type']}_{job['breakdown']}_report_{job['id'][:12]}{FORMATS[job['format']]}"
+
+    def _run(self, job, snapshot, on_done):
+        self.store.update_report_job(job['id'], status='running')
+        try:
+            with self._timer('report_aggregate'):
+                report = aggregate(snapshot.df, job['type'], job['breakdown'])
+            filename = self.filename(job)
+            with self._timer('report_write'):
+                write_report(report, os.path.join(self.reports_path, filename), job['format'])
+        except Exception as e:
+            logger.exception('Report job %s failed', job['id'])
+            self.store.update_report_job(job['id'], status='failed', error=f'{type(e).__name__}: {e}')
+            return
+        self.store.update_report_job(job['id'], status='done', filename=filename, rows=len(report))
+        if on_done is not None:
+            on_done(self.store.get_report_job(job['id']))
+
+    def _timer(self, stage):
+        return self.metrics.timer(stage) if self.metrics is not None else nullcontext()
+
+    def wait(self, job_id, timeout):
+        """Poll until the job finishes or `timeout` passes; returns its latest state."""
+        deadline = time.monotonic() + timeout
+        job = self.store.get_report_job(job_id)
+        while job and job['status'] in ('queued', 'running') and time.monotonic() < deadline:
+            time.sleep(0.05)
+            job = self.store.get_report_job(job_id)
+        return job
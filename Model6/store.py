@@ -0,0 +1,337 @@
+"""
+SQLite storage for the dashboard's notices, auctions, reports, messages,
+compliance decisions and report jobs.
+
+The database runs in WAL mode, so readers never block the single writer
+and every gunicorn worker on the host sees the same state without an
+external service. Connections come from a small bounded pool, checked
+out per call and returned afterwards (gevent workers run every request
+in its own greenlet, so per-thread connections would mean one per
+request); the pool is emptied after a fork so workers never share a
+connection with the master. Every write runs in one transaction, which also bumps a shared version counter; the response
+cache uses that counter to notice changes made by other workers. Report
+job bookkeeping is not served from the cache, so it skips the bump. The
+ledger itself lives in the CSV; its `ledger_version` counter tells the
+workers that did not ingest or reload it to reload.
+"""
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS notices (
+    id INTEGER PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    date TEXT NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_notices_created ON notices (created_at);
+CREATE TABLE IF NOT EXISTS auctions (
+    id INTEGER PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    name TEXT NOT NULL,
+    reserve NUMERIC NOT NULL,
+    status TEXT NOT NULL,
+    created TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    date TEXT NOT NULL,
+    type TEXT NOT NULL,
+    url TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    company TEXT NOT NULL,
+    text TEXT NOT NULL,
+    sender TEXT NOT NULL,
+    date TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_messages_company_created ON messages (company, created_at);
+CREATE TABLE IF NOT EXISTS compliance (
+    company TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS report_jobs (
+    id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    finished_at TEXT,
+    type TEXT NOT NULL,
+    breakdown TEXT NOT NULL,
+    format TEXT NOT NULL,
+    data_version TEXT NOT NULL,
+    status TEXT NOT NULL,
+    filename TEXT,
+    rows INTEGER,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_report_jobs_key ON report_jobs (type, breakdown, format, data_version);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('ledger_version', 0);
+"""
+
+# Rows a fresh database starts with (the dashboard's original mock data)
+SEED_NOTICES = [{"date": "15/11/2025", "text": "New emission norms effective November 2025"}]
+SEED_AUCTIONS = [{"name": "Coal Block A", "reserve": 1000000, "status": "Open", "created": "03/03/2025"}]
+SEED_REPORTS = [{"date": "15/11/2025", "type": "Production Report", "url": "http://example.com/production.pdf"}]
+
+
+def _now():
+    return datetime.now().isoformat(timespec='microseconds')
+
+
+class Store:
+    def __init__(self, path, pool_size=int(os.environ.get('MODEL6_DB_POOL', 8))):
+        self.path = path
+        self.pool_size = pool_size
+        self._pool_lock = threading.Lock()
+        self._reset_pool()
+        # Messages waiting for the next group commit (see add_message)
+        self._pending_messages = []
+        self._messages_lock = threading.Lock()
+        self._message_writer = threading.Lock()
+        with self.connection() as conn:
+            conn.executescript(SCHEMA)
+        with self.transaction() as conn:
+            if conn.execute("SELECT value FROM meta WHERE key = 'seeded'").fetchone() is None:
+                self._seed(conn)
+
+    def _reset_pool(self):
+        self._pool = queue.LifoQueue()
+        self._opened = 0
+        self._pid = os.getpid()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """A connection from the pool; opens one while fewer than pool_size exist, else waits for one."""
+        with self._pool_lock:
+            if self._pid != os.getpid():
+                # Connections inherited from the master are dropped, never used
+                self._reset_pool()
+            pool = self._pool
+            try:
+                conn, opening = pool.get_nowait(), False
+            except queue.Empty:
+                conn, opening = None, self._opened < self.pool_size
+                if opening:
+                    self._opened += 1
+        if conn is None and opening:
+            try:
+                conn = self._connect()
+            except BaseException:
+                with self._pool_lock:
+                    self._opened -= 1
+                raise
+        elif conn is None:
+            try:
+                conn = pool.get(timeout=30)
+            except queue.Empty:
+                raise RuntimeError("No database connection became free within 30 s") from None
+        try:
+            yield conn
+        finally:
+            pool.put(conn)
+
+    @contextmanager
+    def transaction(self, bump=True):
+        """One write transaction; bumps the shared version on commit unless bump is False."""
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                if bump:
+                    conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _fetchone(self, sql, params=()):
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchone()
+
+    def _fetchall(self, sql, params=()):
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def _seed(self, conn):
+        now = _now()
+        conn.executemany("INSERT INTO notices (created_at, date, text) VALUES (?, ?, ?)",
+                         [(now, n["date"], n["text"]) for n in SEED_NOTICES])
+        conn.executemany("INSERT INTO auctions (created_at, name, reserve, status, created) VALUES (?, ?, ?, ?, ?)",
+                         [(now, a["name"], a["reserve"], a["status"], a["created"]) for a in SEED_AUCTIONS])
+        conn.executemany("INSERT INTO reports (created_at, date, type, url) VALUES (?, ?, ?, ?)",
+                         [(now, r["date"], r["type"], r["url"]) for r in SEED_REPORTS])
+        conn.execute("INSERT INTO meta (key, value) VALUES ('seeded', 1)")
+
+    def version(self):
+        return self._fetchone("SELECT value FROM meta WHERE key = 'version'")[0]
+
+    def ledger_version(self):
+        return self._fetchone("SELECT value FROM meta WHERE key = 'ledger_version'")[0]
+
+    def bump_ledger_version(self):
+        """Record a change to the ledger file; returns the new ledger version."""
+        with self.transaction() as conn:
+            conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'ledger_version'")
+            return conn.execute("SELECT value FROM meta WHERE key = 'ledger_version'").fetchone()[0]
+
+    def _page(self, sql, params, limit, offset):
+        # Newest rows first for paging, returned oldest-first like the original lists
+        if limit is None:
+            rows = self._fetchall(sql + " ORDER BY created_at, id", params)
+        else:
+            rows = self._fetchall(sql + " ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?",
+                                  params + (limit, offset))[::-1]
+        return [dict(row) for row in rows]
+
+    def _count(self, sql, params=()):
+        return self._fetchone(sql, params)[0]
+
+    # Notices
+    def add_notice(self, text, date):
+        with self.transaction() as conn:
+            conn.execute("INSERT INTO notices (created_at, date, text) VALUES (?, ?, ?)", (_now(), date, text))
+        return {"date": date, "text": text}
+
+    def list_notices(self, limit=None, offset=0):
+        return self._page("SELECT date, text FROM notices", (), limit, offset)
+
+    def count_notices(self):
+        return self._count("SELECT COUNT(*) FROM notices")
+
+    # Auctions
+    def add_auction(self, auction):
+        with self.transaction() as conn:
+            conn.execute("INSERT INTO auctions (created_at, name, reserve, status, created) VALUES (?, ?, ?, ?, ?)",
+                         (_now(), auction["name"], auction["reserve"], auction["status"], auction["created"]))
+        return auction
+
+    def list_auctions(self):
+        return self._page("SELECT name, reserve, status, created FROM auctions", (), None, 0)
+
+    # Reports
+    def add_report(self, report):
+        with self.transaction() as conn:
+            conn.execute("INSERT INTO reports (created_at, date, type, url) VALUES (?, ?, ?, ?)",
+                         (_now(), report["date"], report["type"], report["url"]))
+        return report
+
+    def list_reports(self):
+        return self._page("SELECT date, type, url FROM reports", (), None, 0)
+
+    # Messages
+    def add_messages(self, messages):
+        """Insert a batch of messages in a single transaction."""
+        now = _now()
+        with self.transaction() as conn:
+            conn.executemany("INSERT INTO messages (created_at, company, text, sender, date) VALUES (?, ?, ?, ?, ?)",
+                             [(now, m["company"], m["text"], m["sender"], m["date"]) for m in messages])
+        return messages
+
+    def add_message(self, message):
+        """
+        Insert one message, group-committed with any sent at the same time:
+        whichever sender gets the writer lock inserts every queued message in
+        one transaction, and the senders it wrote for return without their
+        own. Each sender still returns only once its message is committed.
+        """
+        entry = {'message': message, 'done': False, 'error': None}
+        with self._messages_lock:
+            self._pending_messages.append(entry)
+        with self._message_writer:
+            if not entry['done']:
+                with self._messages_lock:
+                    batch, self._pending_messages = self._pending_messages, []
+                try:
+                    self.add_messages([e['message'] for e in batch])
+                except Exception as e:
+                    for queued in batch:
+                        queued['error'] = e
+                    raise
+                finally:
+                    for queued in batch:
+                        queued['done'] = True
+        if entry['error'] is not None:
+            raise entry['error']
+        return message
+
+    def list_messages(self, company=None, limit=None, offset=0):
+        if company is None:
+            return self._page("SELECT company, text, sender, date FROM messages", (), limit, offset)
+        return self._page("SELECT company, text, sender, date FROM messages WHERE company = ?", (company,), limit, offset)
+
+    def count_messages(self, company=None):
+        if company is None:
+            return self._count("SELECT COUNT(*) FROM messages")
+        return self._count("SELECT COUNT(*) FROM messages WHERE company = ?", (company,))
+
+    # Compliance decisions (companies without a row are "pending")
+    def set_compliance(self, company, status):
+        with self.transaction() as conn:
+            conn.execute("INSERT INTO compliance (company, status, updated_at) VALUES (?, ?, ?) "
+                         "ON CONFLICT (company) DO UPDATE SET status = excluded.status, updated_at = excluded.updated_at",
+                         (company, status, _now()))
+
+    def get_compliance(self, company):
+        row = self._fetchone("SELECT status FROM compliance WHERE company = ?", (company,))
+        return row[0] if row else "pending"
+
+    def compliance_statuses(self):
+        return {row[0]: row[1] for row in self._fetchall("SELECT company, status FROM compliance")}
+
+    # Report jobs: one per (type, breakdown, format, data version) unless it failed
+    # or was abandoned (still unfinished after `stale_after` seconds)
+    def claim_report_job(self, job_id, report_type, breakdown, fmt, data_version, stale_after=3600):
+        """(job, created): the live job for this key, or a new queued one with id job_id."""
+        cutoff = (datetime.now() - timedelta(seconds=stale_after)).isoformat(timespec='microseconds')
+        key = (report_type, breakdown, fmt, data_version, cutoff)
+        # Most calls find a live job, so look without taking the write lock first
+        with self.connection() as conn:
+            row = self._live_report_job(conn, key)
+        if row is not None:
+            return row, False
+        with self.transaction(bump=False) as conn:
+            row = self._live_report_job(conn, key)
+            if row is not None:
+                return row, False
+            conn.execute("INSERT INTO report_jobs (id, created_at, type, breakdown, format, data_version, status) "
+                         "VALUES (?, ?, ?, ?, ?, ?, 'queued')",
+                         (job_id, _now(), report_type, breakdown, fmt, data_version))
+        return self.get_report_job(job_id), True
+
+    def _live_report_job(self, conn, key):
+        row = conn.execute(
+            "SELECT * FROM report_jobs WHERE type = ? AND breakdown = ? AND format = ? AND data_version = ? "
+            "AND (status = 'done' OR (status IN ('queued', 'running') AND created_at > ?)) "
+            "ORDER BY created_at DESC LIMIT 1", key).fetchone()
+        return dict(row) if row else None
+
+    def update_report_job(self, job_id, **fields):
+        if fields.get('status') in ('done', 'failed'):
+            fields['finished_at'] = _now()
+        assignments = ', '.join(f"{name} = ?" for name in fields)
+        with self.transaction(bump=False) as conn:
+            conn.execute(f"UPDATE report_jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def get_report_job(self, job_id):
+        row = self._fetchone("SELECT * FROM report_jobs WHERE id = ?", (job_id,))
+        return dict(row) if row else None
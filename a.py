@@ -1,3 +1,12 @@
+"""
+Synthetic ledger generator for the Indian coal companies dataset.
+
+    python a.py                                   # 500 companies x 10 years -> CSV
+    python a.py --companies 100000 --years 10 --seed 7 --format parquet
+"""
+import argparse
+import os
+
 import pandas as pd
 import numpy as np
 
@@ -18,41 +27,119 @@ indian_companies = [
     "Bharat Coking Coal", "Tata Steel Mining", "Hindalco Industries"
 ]
 
-# Generate data for 500 companies over 10 years (2014–2023)
-num_companies = 500
-years = list(range(2014, 2024))
-data = []
-
-for i in range(num_companies):
-    company_id = f"IND{i+1:03d}"
-    company_name = indian_companies[i % len(indian_companies)]
-    for year in years:
-        total_co2 = np.random.randint(100000, 10000000)  # Random total emissions
-        carbon_offsets = np.random.randint(0, total_co2 * 0.8)  # Up to 80% offset
-        renewable_energy = np.random.randint(1000, 500000)  # MWh
-        afforestation = np.random.randint(100, 5000)  # Acres
-        green_investment = np.random.randint(1000000, 100000000)  # INR or similar
-        coal_produced = np.random.randint(50000, 2000000)  # Tons
-        net_co2 = total_co2 - carbon_offsets
-        emission_intensity = round(net_co2 / coal_produced, 3) if coal_produced > 0 else 0
-        green_investment_ratio = round(green_investment / (coal_produced * 1000), 3)  # Rough ratio
-        renewable_intensity = round(renewable_energy / coal_produced, 3)
-        emission_diff = np.random.uniform(-1, 1)  # Random difference
-        green_investment_diff = np.random.uniform(-0.5, 0.5)
-        renewable_diff = np.random.uniform(-0.5, 0.5)
-        score = np.random.uniform(0, 250)  # Random score
-
-        row = [
-            company_id, company_name, year, total_co2, carbon_offsets, renewable_energy,
-            afforestation, green_investment, coal_produced, net_co2, emission_intensity,
-            green_investment_ratio, renewable_intensity, emission_diff,
-            green_investment_diff, renewable_diff, score
-        ]
-        data.append(row)
-
-# Create DataFrame
-df = pd.DataFrame(data, columns=columns)
-
-# Save to CSV
-df.to_csv('modified_indian_coal_companies.csv', index=False)
-print("Generated 'modified_indian_coal_companies.csv' with 5000 rows.")
\ No newline at end of file
+FORMATS = {'csv': '.csv', 'parquet': '.parquet', 'feather': '.feather'}
+DEFAULT_OUTPUT = 'modified_indian_coal_companies'
+
+# Companies drawn from one random stream. Each block of companies gets its
+# own stream, derived from the seed and the block number, so a seed
+# produces the same rows whatever --chunk-rows is.
+SEED_BLOCK_COMPANIES = 1000
+
+
+def generate_chunk(rng, first_company, num_companies, years):
+    """Rows for companies [first_company, first_company + num_companies) over all years."""
+    years = np.asarray(years)
+    company_idx = np.repeat(np.arange(first_company, first_company + num_companies), len(years))
+    n = len(company_idx)
+
+    total_co2 = rng.integers(100000, 10000000, n)  # Random total emissions
+    carbon_offsets = rng.integers(0, (total_co2 * 0.8).astype(np.int64))  # Up to 80% offset
+    renewable_energy = rng.integers(1000, 500000, n)  # MWh
+    afforestation = rng.integers(100, 5000, n)  # Acres
+    green_investment = rng.integers(1000000, 100000000, n)  # INR or similar
+    coal_produced = rng.integers(50000, 2000000, n)  # Tons
+    net_co2 = total_co2 - carbon_offsets
+
+    company_ids = np.array([f"IND{i + 1:03d}" for i in range(first_company, first_company + num_companies)])
+    names = np.array(indian_companies)
+    return pd.DataFrame({
+        "CompanyID": np.repeat(company_ids, len(years)),
+        "CompanyName": names[company_idx % len(names)],
+        "Year": np.tile(years, num_companies),
+        "Total_CO2_Emissions_Tons": total_co2,
+        "CarbonOffsets_Tons": carbon_offsets,
+        "RenewableEnergyUsage_MWh": renewable_energy,
+        "Afforestation_Acres": afforestation,
+        "Investment_Green_Technologies": green_investment,
+        "CoalProduced_Tons": coal_produced,
+        "Net_CO2_Emissions_Tons": net_co2,
+        "Emission_Intensity": np.round(net_co2 / coal_produced, 3),
+        "Green_Investment_Ratio": np.round(green_investment / (coal_produced * 1000), 3),  # Rough ratio
+        "RenewableEnergy_Intensity": np.round(renewable_energy / coal_produced, 3),
+        "Emission_Intensity_Difference": rng.uniform(-1, 1, n),  # Random difference
+        "Green_Investment_Ratio_Difference": rng.uniform(-0.5, 0.5, n),
+        "RenewableEnergy_Intensity_Difference": rng.uniform(-0.5, 0.5, n),
+        "Score": rng.uniform(0, 250, n),  # Random score
+    }, columns=columns)
+
+
+def generate(num_companies=500, years=range(2014, 2024), seed=None, chunk_rows=1000000):
+    """Yield the dataset as DataFrames of roughly chunk_rows rows each (whole seed blocks)."""
+    root = np.random.SeedSequence(seed)
+    years = list(years)
+    block_rows = SEED_BLOCK_COMPANIES * max(len(years), 1)
+    companies_per_chunk = max(chunk_rows // block_rows, 1) * SEED_BLOCK_COMPANIES
+    for first in range(0, num_companies, companies_per_chunk):
+        blocks = []
+        for block_first in range(first, min(first + companies_per_chunk, num_companies), SEED_BLOCK_COMPANIES):
+            # The same stream as root.spawn() would hand the block, without spawning all earlier ones
+            rng = np.random.default_rng(np.random.SeedSequence(
+                root.entropy, spawn_key=(block_first // SEED_BLOCK_COMPANIES,)))
+            count = min(SEED_BLOCK_COMPANIES, num_companies - block_first)
+            blocks.append(generate_chunk(rng, block_first, count, years))
+        yield blocks[0] if len(blocks) == 1 else pd.concat(blocks, ignore_index=True)
+
+
+def write_chunks(chunks, path, fmt):
+    """Write DataFrame chunks to a single CSV, Parquet or Feather file. Returns the row count."""
+    rows = 0
+    writer = None
+    try:
+        for chunk in chunks:
+            if fmt == 'csv':
+                chunk.to_csv(path, mode='w' if rows == 0 else 'a', header=rows == 0, index=False)
+            else:
+                import pyarrow as pa
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    if fmt == 'parquet':
+                        import pyarrow.parquet as pq
+                        writer = pq.ParquetWriter(path, table.schema)
+                    else:
+                        writer = pa.ipc.new_file(path, table.schema)
+                writer.write_table(table)
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f'must be at least 1 (got {value})')
+    return number
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the synthetic coal company ledger.")
+    parser.add_argument('--companies', type=positive_int, default=500)
+    parser.add_argument('--start-year', type=int, default=2014)
+    parser.add_argument('--years', type=positive_int, default=10)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--format', choices=FORMATS, default='csv')
+    parser.add_argument('--chunk-rows', type=positive_int, default=1000000)
+    parser.add_argument('--output', default=None,
+                        help=f"output path (default: {DEFAULT_OUTPUT} + format extension)")
+    args = parser.parse_args()
+
+    output = args.output or DEFAULT_OUTPUT + FORMATS[args.format]
+    years = range(args.start_year, args.start_year + args.years)
+    chunks = generate(args.companies, years, args.seed, args.chunk_rows)
+    rows = write_chunks(chunks, output, args.format)
+    print(f"Generated '{os.path.basename(output)}' with {rows} rows.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Model1, Model2 and Model5 served the current way (the Flask app on
+werkzeug's threaded server, as `python app.py` runs it) versus the ASGI
+mode (ModelN/asgi.py under uvicorn): throughput and latency of each
+prediction endpoint at rising concurrency, and the max sustainable QPS,
+the best throughput at a level where p99 stays under --slo-ms and under
+1% of the requests fail. 429s from the ASGI mode's backpressure count as
+failures and are also reported on their own.
+
+Each server is started as a subprocess on --port and stopped with SIGTERM
+afterwards; requests come from benchmarks/load.py. The ASGI runs need
+uvicorn (`pip install uvicorn`).
+
+    python benchmarks/asgi_qps.py --only model1.predict model5 --concurrency 1 8 32 128
+"""
+import argparse
+import fnmatch
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from gateway_startup import wait_for
+from harness import add_arguments, finish, summarize
+from load import Target, drive, endpoints
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+DIRECTORIES = {'model1': 'Model1', 'model2': 'Model2', 'model5': 'Model5'}
+
+# Mode -> server command, run in the app's directory
+SERVERS = {
+    'wsgi': lambda port: [sys.executable, '-c',
+                          f'from app import app; app.run(port={port}, threaded=True)'],
+    'asgi': lambda port: [sys.executable, '-m', 'uvicorn', 'asgi:app', '--port', str(port),
+                          '--log-level', 'warning', '--no-access-log'],
+}
+
+
+def start(mode, app, port, timeout):
+    proc = subprocess.Popen(SERVERS[mode](port), cwd=os.path.join(ROOT, DIRECTORIES[app]),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+    if not wait_for(f'http://127.0.0.1:{port}/readyz', time.monotonic() + timeout):
+        stop(proc)
+        raise RuntimeError(f'{app} ({mode}) did not become ready within {timeout} s')
+    return proc
+
+
+def stop(proc):
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+    except ProcessLookupError:
+        pass
+    proc.wait(timeout=60)
+
+
+def sustainable(levels, slo_ms):
+    """Best throughput among the levels within the SLO (p99 and <1% failures), or None."""
+    ok = [r['throughput'] for r in levels if r['p99_ms'] <= slo_ms and r['errors'] <= 0.01 * r['n']]
+    return max(ok, default=None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--only', nargs='+', default=['model1', 'model2', 'model5'],
+                        help='endpoint names or prefixes, e.g. model1.predict model5')
+    parser.add_argument('--modes', nargs='+', choices=SERVERS, default=list(SERVERS))
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32, 128])
+    parser.add_argument('--requests', type=int, default=1000, help='requests per endpoint and concurrency level')
+    parser.add_argument('--warmup', type=int, default=50, help='untimed requests per endpoint first')
+    parser.add_argument('--batch-size', type=int, default=100, help='items per /predict/batch request')
+    parser.add_argument('--slo-ms', type=float, default=250, help='p99 latency a sustainable level must stay under')
+    parser.add_argument('--port', type=int, default=5900)
+    parser.add_argument('--timeout', type=float, default=60)
+    add_arguments(parser, metric='p95_ms')
+    args = parser.parse_args()
+
+    selected = {name: spec for name, spec in endpoints(args.batch_size, upload_rows=1).items()
+                if spec[0] in DIRECTORIES and any(fnmatch.fnmatch(name, pattern) or name.startswith(pattern + '.')
+                                                  for pattern in args.only)}
+    target = Target(f'http://127.0.0.1:{args.port}')
+    results, summary = {}, {}
+    print(f"{'endpoint':>16} {'mode':>5} {'conc':>5} {'req/s':>9} {'p50 (ms)':>10} {'p95 (ms)':>10} "
+          f"{'p99 (ms)':>10} {'errors':>7} {'429s':>6}")
+    for app in DIRECTORIES:
+        names = [name for name, spec in selected.items() if spec[0] == app]
+        for mode in args.modes if names else ():
+            proc = start(mode, app, args.port, args.timeout)
+            try:
+                for name in names:
+                    _, method, requests_iter = selected[name]
+                    drive(target, method, requests_iter, 1, args.warmup, args.timeout)
+                    levels = []
+                    for concurrency in args.concurrency:
+                        latencies, errors, elapsed = drive(target, method, requests_iter, concurrency,
+                                                           args.requests, args.timeout)
+                        result = dict(summarize(latencies, elapsed), concurrency=concurrency, errors=len(errors),
+                                      rejected=errors.count(429))
+                        if errors:
+                            result['error_statuses'] = {str(s): errors.count(s) for s in set(errors)}
+                        results[f'{name}[{mode}]@c{concurrency}'] = result
+                        levels.append(result)
+                        print(f"{name:>16} {mode:>5} {concurrency:>5} {result['throughput']:>9.1f} "
+                              f"{result['p50_ms']:>10.2f} {result['p95_ms']:>10.2f} {result['p99_ms']:>10.2f} "
+                              f"{len(errors):>7} {result['rejected']:>6}")
+                    summary.setdefault(name, {})[mode] = sustainable(levels, args.slo_ms)
+            finally:
+                stop(proc)
+
+    print(f"\nmax sustainable QPS (p99 <= {args.slo_ms:g} ms, < 1% failed)")
+    print(f"{'endpoint':>16} " + ' '.join(f'{mode:>9}' for mode in args.modes) + f" {'ratio':>7}")
+    for name, by_mode in summary.items():
+        qps = [by_mode.get(mode) for mode in args.modes]
+        ratio = f"{qps[-1] / qps[0]:>6.2f}x" if len(qps) > 1 and all(qps) else f"{'-':>7}"
+        print(f"{name:>16} " + ' '.join(f'{q:>9.1f}' if q else f"{'-':>9}" for q in qps) + f" {ratio}")
+
+    finish(args, 'asgi_qps', results, sustainable_qps=summary, slo_ms=args.slo_ms)
+
+
+if __name__ == '__main__':
+    main()
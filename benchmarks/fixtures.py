@@ -0,0 +1,128 @@
+"""
+Synthetic data for the benchmarks, at fixed scales and seeds so runs are
+comparable.
+
+    ledger       the company-year ledger in the a.py schema (Model6)
+    rankings     one row per company, latest year (Model3's rankings.csv)
+    activity     activity rows with per-gas emission factors and GWPs (Model4 uploads)
+    requests     request bodies for the Model1, Model2 and Model5 predictors
+
+Write them to a directory to run the apps on them:
+
+    python benchmarks/fixtures.py --scale medium --out /tmp/bench
+    # -> modified_indian_coal_companies.csv (Model6), rankings.csv (Model3/static),
+    #    activity.csv (a Model4 upload)
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+from a import generate  # noqa: E402
+
+# Scale -> (companies x years of ledger, Model4 activity rows)
+SCALES = {
+    'small': {'companies': 100, 'years': 10, 'activity_rows': 1000},
+    'medium': {'companies': 10000, 'years': 10, 'activity_rows': 100000},
+    'large': {'companies': 100000, 'years': 10, 'activity_rows': 1000000},
+}
+
+GASES = ['CO2', 'CH4', 'N2O', 'HFCs', 'PFCs', 'SF6']
+# 100-year GWPs (IPCC AR5); HFCs and PFCs vary by compound, so they get a range
+GWP = {'CO2': (1, 1), 'CH4': (28, 28), 'N2O': (265, 265), 'HFCs': (124, 14800),
+       'PFCs': (6630, 11100), 'SF6': (23500, 23500)}
+
+# Model2 request vocabulary
+VOCABULARY = {
+    'offset_method': ['Afforestation', 'Renewable Energy', 'Energy Efficiency', 'Reforestation'],
+    'project_location': ['India', 'USA', 'China', 'Brazil'],
+    'verification_status': ['Verified', 'Pending', 'Rejected'],
+    'technology_used': ['Solar', 'Wind', 'Hydro', 'Biomass'],
+}
+
+_cache = {}
+
+
+def ledger(scale):
+    """The a.py ledger at `scale` (cached per process)."""
+    if ('ledger', scale) not in _cache:
+        spec = SCALES[scale]
+        years = range(2024 - spec['years'], 2024)
+        _cache['ledger', scale] = pd.concat(generate(spec['companies'], years, seed=0), ignore_index=True)
+    return _cache['ledger', scale]
+
+
+def rankings(scale):
+    """One row per company: its latest ledger year."""
+    df = ledger(scale)
+    return df.loc[df.groupby('CompanyID')['Year'].idxmax()].reset_index(drop=True)
+
+
+def activity(scale, seed=0):
+    """Model4 input rows: Activity, Emission_Factor_<gas> and GWP_<gas> for the six gases."""
+    n = SCALES[scale]['activity_rows']
+    rng = np.random.default_rng(seed)
+    columns = {'Activity': rng.uniform(1, 10000, n)}
+    # Emission factors in t/unit; CO2 dominates, the fluorinated gases are traces
+    ef_scale = {'CO2': 2.0, 'CH4': 0.01, 'N2O': 0.001, 'HFCs': 1e-5, 'PFCs': 1e-6, 'SF6': 1e-7}
+    for gas in GASES:
+        columns[f'Emission_Factor_{gas}'] = rng.uniform(0, ef_scale[gas], n)
+    for gas in GASES:
+        low, high = GWP[gas]
+        columns[f'GWP_{gas}'] = rng.uniform(low, high, n) if high > low else np.full(n, float(low))
+    return pd.DataFrame(columns)
+
+
+def model1_scenarios(n, seed=0):
+    rng = np.random.default_rng(seed)
+    # Log-uniform emissions (tonnes) and costs (USD) across the realistic ranges
+    return [{'emissions': round(float(e), 2), 'cost': round(float(c), 2)}
+            for e, c in zip(10 ** rng.uniform(1, 7, n), 10 ** rng.uniform(3, 9, n))]
+
+
+def model2_projects(n, distinct=None, seed=0):
+    """n quote requests drawn from `distinct` different projects (all different by default)."""
+    rng = np.random.default_rng(seed)
+    pool = [
+        dict({field: str(rng.choice(values)) for field, values in VOCABULARY.items()},
+             emission_reduction=str(round(rng.uniform(100, 10000), 2)),
+             project_size=str(round(rng.uniform(1, 1000), 2)))
+        for _ in range(distinct or n)
+    ]
+    return [pool[i] for i in rng.integers(0, len(pool), n)] if distinct else pool
+
+
+def model5_readings(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [{'coal_production': round(float(p), 2), 'coal_type': int(t),
+             'energy_consumption': round(float(e), 2), 'emission_factor': round(float(f), 4)}
+            for p, t, e, f in zip(rng.uniform(1000, 1000000, n), rng.integers(1, 4, n),
+                                  rng.uniform(100, 100000, n), rng.uniform(1.5, 3.0, n))]
+
+
+def write(scale, directory):
+    os.makedirs(directory, exist_ok=True)
+    paths = {
+        'modified_indian_coal_companies.csv': ledger(scale),
+        'rankings.csv': rankings(scale),
+        'activity.csv': activity(scale),
+    }
+    for name, df in paths.items():
+        df.to_csv(os.path.join(directory, name), index=False)
+        print(f"{name:>36}: {len(df)} rows")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--scale', choices=SCALES, default='small')
+    parser.add_argument('--out', required=True, help='directory to write the CSV files to')
+    args = parser.parse_args()
+    write(args.scale, args.out)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Startup time and memory of the dashboard served as seven separate Flask
+processes (Model1-6 plus Main-Dashboard, each `python app.py`) versus the
+single gateway under gunicorn with preloaded, forked workers.
+
+Startup is the time until every app answers HTTP (the gateway's /readyz).
+Memory is summed over the whole process tree: RSS counts shared pages once
+per process, PSS splits them between the processes sharing them, so PSS is
+the honest total for the copy-on-write workers.
+
+    python benchmarks/gateway_startup.py --workers 2 4
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Directory -> port of the separate-process layout
+SEPARATE = {
+    'Model1': 5000, 'Model2': 5001, 'Model3': 5002, 'Model4': 5003,
+    'Model5': 5004, 'Model6': 5005, 'Main-Dashboard': 5500,
+}
+
+
+def wait_for(url, deadline):
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return True
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.05)
+    return False
+
+
+def descendants(pid):
+    """pid and every process below it."""
+    pids = [pid]
+    for task in os.listdir(f'/proc/{pid}/task'):
+        try:
+            with open(f'/proc/{pid}/task/{task}/children') as f:
+                for child in f.read().split():
+                    pids.extend(descendants(int(child)))
+        except FileNotFoundError:
+            pass
+    return pids
+
+
+def memory_kb(pids):
+    totals = {'Rss': 0, 'Pss': 0}
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/smaps_rollup') as f:
+                for line in f:
+                    key, _, value = line.partition(':')
+                    if key in totals:
+                        totals[key] += int(value.split()[0])
+        except FileNotFoundError:
+            pass
+    return totals
+
+
+def stop(procs):
+    for proc in procs:
+        try:
+            os.killpg(proc.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    for proc in procs:
+        proc.wait(timeout=30)
+
+
+def measure_separate(timeout):
+    t0 = time.monotonic()
+    procs = [subprocess.Popen([sys.executable, 'app.py'], cwd=os.path.join(ROOT, directory),
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+             for directory in SEPARATE]
+    try:
+        deadline = t0 + timeout
+        ready = all(wait_for(f'http://127.0.0.1:{port}/', deadline) for port in SEPARATE.values())
+        startup = time.monotonic() - t0
+        pids = [pid for proc in procs for pid in descendants(proc.pid)]
+        return ready, startup, len(pids), memory_kb(pids)
+    finally:
+        stop(procs)
+
+
+def measure_gateway(workers, port, timeout):
+    env = dict(os.environ, GATEWAY_WORKERS=str(workers), GATEWAY_BIND=f'127.0.0.1:{port}')
+    t0 = time.monotonic()
+    proc = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gateway/gunicorn.conf.py', 'gateway.app:app'],
+                            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                            start_new_session=True)
+    try:
+        ready = wait_for(f'http://127.0.0.1:{port}/readyz', t0 + timeout)
+        startup = time.monotonic() - t0
+        # Let the remaining workers finish booting before reading memory
+        time.sleep(1)
+        pids = descendants(proc.pid)
+        return ready, startup, len(pids), memory_kb(pids)
+    finally:
+        stop([proc])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[2, 4])
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--timeout', type=float, default=120)
+    args = parser.parse_args()
+
+    print(f"{'layout':>16} {'ready':>6} {'startup (s)':>12} {'procs':>6} {'RSS (MB)':>10} {'PSS (MB)':>10}")
+
+    def report(name, result):
+        ready, startup, procs, mem = result
+        print(f"{name:>16} {str(ready):>6} {startup:>12.2f} {procs:>6} "
+              f"{mem['Rss'] / 1024:>10.1f} {mem['Pss'] / 1024:>10.1f}")
+
+    report('separate apps', measure_separate(args.timeout))
+    for workers in args.workers:
+        report(f'gateway x{workers}', measure_gateway(workers, args.port, args.timeout))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Result files and regression checks shared by benchmarks/micro.py and
+benchmarks/load.py.
+
+A run is written as JSON:
+
+    {"meta": {"kind": "micro", "created": ..., "git": ..., "python": ..., ...},
+     "results": {"model6.company_summary[medium]": {"p50_ms": ..., "p95_ms": ..., ...}, ...}}
+
+With --baseline OLD.json, every result present in both runs is compared on
+--metric (a latency, so higher is worse). When a result is more than
+--max-regression (a fraction, 0.2 = 20%) slower than the baseline, the run
+exits with status 1 after writing its results.
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def summarize(latencies, elapsed=None):
+    """Latency percentiles in ms; throughput over `elapsed` seconds (or the latencies' sum)."""
+    latencies = np.asarray(latencies, dtype=float)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    elapsed = elapsed if elapsed is not None else latencies.sum()
+    return {
+        'n': len(latencies),
+        'mean_ms': round(float(latencies.mean() * 1000), 4),
+        'p50_ms': round(float(p50), 4),
+        'p95_ms': round(float(p95), 4),
+        'p99_ms': round(float(p99), 4),
+        'throughput': round(len(latencies) / elapsed, 2) if elapsed else None,
+    }
+
+
+def add_arguments(parser, metric):
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='results JSON of an earlier run to compare against')
+    parser.add_argument('--metric', default=metric, help=f'latency compared with the baseline (default {metric})')
+    parser.add_argument('--max-regression', type=float, default=0.2,
+                        help='fail when a result is this fraction slower than the baseline (default 0.2)')
+
+
+def _git_revision():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, metric, max_regression):
+    """[(name, baseline value, new value, ratio)] for results slower than allowed."""
+    regressions = []
+    for name, result in results.items():
+        old = baseline.get(name, {}).get(metric)
+        new = result.get(metric)
+        if old and new is not None and new > old * (1 + max_regression):
+            regressions.append((name, old, new, new / old))
+    return regressions
+
+
+def finish(args, kind, results, **meta):
+    """Write the run, compare it with the baseline and exit non-zero on a regression."""
+    run = {
+        'meta': dict(meta, kind=kind, created=time.strftime('%Y-%m-%dT%H:%M:%S%z'), git=_git_revision(),
+                     python=platform.python_version(), platform=platform.platform(), cpus=os.cpu_count()),
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(run, f, indent=2)
+        print(f"\nresults written to {args.output}")
+
+    if not args.baseline:
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)['results']
+    regressions = compare(results, baseline, args.metric, args.max_regression)
+    shared = len(set(results) & set(baseline))
+    print(f"\ncompared {shared} results with {args.baseline} on {args.metric} "
+          f"(max regression {args.max_regression:.0%})")
+    for name, old, new, ratio in regressions:
+        print(f"  REGRESSION {name}: {old:.3f} -> {new:.3f} ({ratio - 1:+.0%})")
+    if regressions:
+        sys.exit(1)
+    print("  no regressions")
@@ -0,0 +1,74 @@
+"""
+Cold-start time and memory of loading the company ledger from CSV versus
+the memory-mapped columnar store.
+
+Each measurement runs in a fresh interpreter so import caches and the
+heap do not carry over between runs.
+
+    python benchmarks/ledger_startup.py Model6/modified_indian_coal_companies.csv
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Runs in the child process: load, touch every column, report time and memory
+CHILD = r"""
+import json, sys, time
+sys.path.insert(0, {root!r})
+import pandas as pd
+from common import columnar
+
+start = time.perf_counter()
+if {mode!r} == 'csv':
+    df = pd.read_csv({csv!r})
+else:
+    df = columnar.load({store!r})
+loaded = time.perf_counter() - start
+total = sum(float(df[c].sum()) for c in df.columns if df[c].dtype.kind in 'if')
+touched = time.perf_counter() - start
+
+mem = {{}}
+with open('/proc/self/smaps_rollup') as f:
+    for line in f:
+        key, _, value = line.partition(':')
+        if key in ('Rss', 'Private_Clean', 'Private_Dirty', 'Shared_Clean'):
+            mem[key] = int(value.split()[0])
+print(json.dumps({{'load_s': loaded, 'load_and_scan_s': touched, 'rows': len(df),
+                  'rss_kb': mem.get('Rss'),
+                  'private_kb': mem.get('Private_Clean', 0) + mem.get('Private_Dirty', 0)}}))
+"""
+
+
+def measure(mode, csv_path, store_dir):
+    code = CHILD.format(root=ROOT, mode=mode, csv=csv_path, store=store_dir)
+    out = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    sys.path.insert(0, ROOT)
+    from common import columnar
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('csv')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    store_dir = columnar.store_path(args.csv)
+    if not columnar.is_fresh(store_dir, args.csv):
+        columnar.ingest(args.csv, store_dir)
+
+    print(f"{'mode':>6} {'load (s)':>10} {'+scan (s)':>10} {'RSS (MB)':>10} {'private (MB)':>13}")
+    for mode in ('csv', 'mmap'):
+        runs = [measure(mode, args.csv, store_dir) for _ in range(args.repeat)]
+        best = min(runs, key=lambda r: r['load_s'])
+        print(f"{mode:>6} {best['load_s']:>10.4f} {best['load_and_scan_s']:>10.4f} "
+              f"{best['rss_kb'] / 1024:>10.1f} {best['private_kb'] / 1024:>13.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+"""
+HTTP load driver for the running apps: fires each endpoint's requests at
+fixed concurrency levels and reports throughput and p50/p95/p99 latency.
+
+By default it targets the gateway (gateway/app.py), with every app under
+its /modelN prefix. A separately run app can be pointed at with --app:
+
+    python benchmarks/load.py --base-url http://localhost:8000 --concurrency 1 8 32
+    python benchmarks/load.py --app model6=http://localhost:5005 --only model6 --output load.json
+    python benchmarks/load.py --baseline load.json --max-regression 0.3
+
+Request bodies come from benchmarks/fixtures.py (seeded), so two runs send
+the same requests. Each worker thread keeps one keep-alive connection.
+Responses other than 2xx/304 are counted as errors; their latencies are
+still included.
+"""
+import argparse
+import fnmatch
+import http.client
+import itertools
+import json
+import threading
+import time
+import uuid
+from urllib.parse import quote, urlencode, urlsplit
+
+import fixtures
+from harness import add_arguments, finish, summarize
+
+# The gateway's mount points
+PREFIXES = {f'model{i}': f'/model{i}' for i in range(1, 7)}
+
+
+def json_request(path, payload):
+    return path, json.dumps(payload).encode(), {'Content-Type': 'application/json'}
+
+
+def form_request(path, fields):
+    return path, urlencode(fields).encode(), {'Content-Type': 'application/x-www-form-urlencoded'}
+
+
+def upload_request(path, filename, content):
+    boundary = uuid.uuid4().hex
+    body = (f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+            f'Content-Type: text/csv\r\n\r\n').encode() + content + f'\r\n--{boundary}--\r\n'.encode()
+    return path, body, {'Content-Type': f'multipart/form-data; boundary={boundary}'}
+
+
+def get(*paths):
+    return ((path, None, {}) for path in itertools.cycle(paths))
+
+
+def endpoints(batch_size, upload_rows):
+    """name -> (app, method, iterator of (path, body, headers))"""
+    scenarios = fixtures.model1_scenarios(1000)
+    projects = fixtures.model2_projects(1000)
+    readings = fixtures.model5_readings(1000)
+    companies = ['BCCL', 'Coal India Limited', 'Adani Enterprises', 'Singareni Collieries']
+    upload = fixtures.activity('small').head(upload_rows).to_csv(index=False).encode()
+    # Plus one row that differs per request: an upload seen before is answered from its saved result
+    extra_row = upload.splitlines()[1].split(b',', 1)[1]
+
+    def each(path, items, make=json_request):
+        return (make(path, item) for item in itertools.cycle(items))
+
+    def batches(path, items, key):
+        for start in itertools.cycle(range(0, len(items) - batch_size + 1, batch_size)):
+            yield json_request(path, {key: items[start:start + batch_size]})
+
+    return {
+        'model1.predict': ('model1', 'POST', each('/predict', scenarios)),
+        'model1.batch': ('model1', 'POST', batches('/predict/batch', scenarios, 'scenarios')),
+        'model2.predict': ('model2', 'POST', each('/predict', projects)),
+        'model2.batch': ('model2', 'POST', batches('/predict/batch', projects, 'projects')),
+        'model3.data': ('model3', 'GET', get('/data')),
+        'model3.leaderboard': ('model3', 'GET',
+                               get('/api/leaderboard?sort_by=Emission_Intensity&limit=50&min_CoalProduced_Tons=100000')),
+        # A new file each time, as separate users would upload
+        'model4.upload': ('model4', 'POST', (upload_request('/upload?format=json', f'activity-{i}.csv',
+                                                            upload + b'%d,' % (i + 1) + extra_row + b'\n')
+                                             for i in itertools.count())),
+        'model5.predict': ('model5', 'POST', each('/predict', readings, form_request)),
+        'model5.batch': ('model5', 'POST', batches('/predict/batch', readings, 'readings')),
+        'model6.companies': ('model6', 'GET', get('/api/companies')),
+        'model6.summary': ('model6', 'GET', get('/api/company-summary')),
+        'model6.overview': ('model6', 'GET', get('/api/industry-overview')),
+        'model6.forecast': ('model6', 'GET', get('/api/predict-future?company=BCCL&horizon=3')),
+        'model6.production': ('model6', 'GET', get(*(f'/api/production/{quote(c)}' for c in companies))),
+        'model6.history': ('model6', 'GET', get(*(f'/api/history/{quote(c)}' for c in companies))),
+    }
+
+
+class Target:
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.https = parts.scheme == 'https'
+        self.prefix = parts.path.rstrip('/')
+
+    def connect(self, timeout):
+        cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        return cls(self.host, self.port, timeout=timeout)
+
+
+def drive(target, method, requests_iter, concurrency, requests, timeout):
+    """Send `requests` requests from `concurrency` threads; (latencies, errors, elapsed seconds)."""
+    lock = threading.Lock()
+    remaining = [requests]
+    latencies, errors = [], []
+
+    def worker():
+        conn = target.connect(timeout)
+        mine = []
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    break
+                remaining[0] -= 1
+                path, body, headers = next(requests_iter)
+            t0 = time.perf_counter()
+            try:
+                conn.request(method, target.prefix + path, body=body, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException) as e:
+                status = type(e).__name__
+                conn.close()
+                conn = target.connect(timeout)
+            mine.append(time.perf_counter() - t0)
+            if not (isinstance(status, int) and (200 <= status < 300 or status == 304)):
+                with lock:
+                    errors.append(status)
+        conn.close()
+        with lock:
+            latencies.extend(mine)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--base-url', default='http://localhost:8000', help='the gateway')
+    parser.add_argument('--app', action='append', default=[], metavar='NAME=URL',
+                        help='send NAME\'s requests to URL instead of the gateway (repeatable)')
+    parser.add_argument('--only', nargs='+', default=['*'], help='endpoint names or prefixes, e.g. model6 model1.batch')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--requests', type=int, default=500, help='requests per endpoint and concurrency level')
+    parser.add_argument('--warmup', type=int, default=20, help='untimed requests per endpoint first')
+    parser.add_argument('--batch-size', type=int, default=100, help='items per /predict/batch request')
+    parser.add_argument('--upload-rows', type=int, default=1000, help='rows in each Model4 upload')
+    parser.add_argument('--timeout', type=float, default=60)
+    add_arguments(parser, metric='p95_ms')
+    args = parser.parse_args()
+
+    targets = {name: Target(args.base_url + prefix) for name, prefix in PREFIXES.items()}
+    for override in args.app:
+        name, _, url = override.partition('=')
+        targets[name] = Target(url)
+
+    results = {}
+    print(f"{'endpoint':>28} {'conc':>5} {'req/s':>9} {'p50 (ms)':>10} {'p95 (ms)':>10} {'p99 (ms)':>10} {'errors':>7}")
+    for name, (app, method, requests_iter) in endpoints(args.batch_size, args.upload_rows).items():
+        if not any(fnmatch.fnmatch(name, pattern) or name.startswith(pattern + '.') for pattern in args.only):
+            continue
+        target = targets[app]
+        if args.warmup:
+            drive(target, method, requests_iter, 1, args.warmup, args.timeout)
+        for concurrency in args.concurrency:
+            latencies, errors, elapsed = drive(target, method, requests_iter, concurrency, args.requests, args.timeout)
+            result = dict(summarize(latencies, elapsed), concurrency=concurrency, errors=len(errors))
+            if errors:
+                result['error_statuses'] = {str(s): errors.count(s) for s in set(errors)}
+            results[f'{name}@c{concurrency}'] = result
+            print(f"{name:>28} {concurrency:>5} {result['throughput']:>9.1f} {result['p50_ms']:>10.2f} "
+                  f"{result['p95_ms']:>10.2f} {result['p99_ms']:>10.2f} {len(errors):>7}")
+
+    finish(args, 'load', results, base_url=args.base_url, apps=args.app, requests=args.requests)
+
+
+if __name__ == '__main__':
+    main()
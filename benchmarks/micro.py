@@ -0,0 +1,248 @@
+"""
+Microbenchmarks of the core computations behind every app, called directly
+(no HTTP, no Flask) on the synthetic fixtures.
+
+    python benchmarks/micro.py --scales small medium --output run.json
+    python benchmarks/micro.py --only model6 model3 --baseline run.json --max-regression 0.25
+
+Each benchmark is called repeatedly for at least --min-time seconds and its
+per-call latency percentiles are reported. Benchmarks whose inputs do not
+depend on the data size (the model predictors) run once, not per scale.
+The predictors need the trained model files and are skipped when they are
+not there.
+"""
+import argparse
+import atexit
+import fnmatch
+import json
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import fixtures
+from harness import ROOT, add_arguments, finish, summarize
+
+sys.path.insert(0, ROOT)
+
+
+class Skip(Exception):
+    pass
+
+
+# name -> (setup(scale) -> callable, scaled)
+BENCHMARKS = {}
+
+
+def benchmark(name, scaled=True):
+    def register(setup):
+        BENCHMARKS[name] = (setup, scaled)
+        return setup
+    return register
+
+
+def use(directory):
+    path = os.path.join(ROOT, directory)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+def model_file(*parts):
+    path = os.path.join(ROOT, *parts)
+    if not os.path.exists(path):
+        raise Skip(f"{os.path.relpath(path, ROOT)} not found")
+    return path
+
+
+# -------------------------
+# Model6: ledger aggregates, forecasts and reports
+# -------------------------
+@benchmark('model6.aggregates_build')
+def model6_aggregates_build(scale):
+    use('Model6')
+    from aggregates import CompanyAggregates
+    df = fixtures.ledger(scale)
+    return lambda: CompanyAggregates(df)
+
+
+@benchmark('model6.company_summary')
+def model6_company_summary(scale):
+    use('Model6')
+    from aggregates import CompanyAggregates
+    aggregates = CompanyAggregates(fixtures.ledger(scale))
+    return lambda: json.dumps([dict(totals, company=company) for company, totals in aggregates.items()])
+
+
+@benchmark('model6.company_rows')
+def model6_company_rows(scale):
+    use('Model6')
+    from ledger import Ledger
+    snapshot = Ledger().load(fixtures.ledger(scale))
+    return lambda: snapshot.company_rows('BCCL')
+
+
+@benchmark('model6.forecast')
+def model6_forecast(scale):
+    use('Model6')
+    from forecast import ForecastEngine
+    engine = ForecastEngine(fixtures.ledger(scale))
+    return lambda: engine.predict('Bharat Coking Coal', 3)
+
+
+@benchmark('model6.report_aggregate')
+def model6_report_aggregate(scale):
+    use('Model6')
+    from reports import aggregate
+    df = fixtures.ledger(scale)
+    return lambda: aggregate(df, 'emissions', 'mine')
+
+
+# -------------------------
+# Model3: rankings
+# -------------------------
+@benchmark('model3.full_dump')
+def model3_full_dump(scale):
+    use('Model3')
+    from leaderboard import COLUMNS
+    df = fixtures.rankings(scale)
+    # What /data does before jsonify
+    return lambda: json.dumps(df[COLUMNS].astype(object).replace({np.nan: None}).to_dict(orient='records'))
+
+
+@benchmark('model3.leaderboard_query')
+def model3_leaderboard_query(scale):
+    use('Model3')
+    from leaderboard import Leaderboard
+    leaderboard = Leaderboard(fixtures.rankings(scale))
+    filters = {'CoalProduced_Tons': (100000.0, None)}
+
+    def query():
+        _, rows = leaderboard.query('Emission_Intensity', 'asc', 50, 0, filters)
+        return leaderboard.records(rows)
+    return query
+
+
+# -------------------------
+# Model4: carbon credit calculation over an uploaded CSV
+# -------------------------
+@benchmark('model4.process_csv')
+def model4_process_csv(scale):
+    use('Model4')
+    from credits import process_csv
+    directory = tempfile.mkdtemp(prefix='bench-model4-')
+    atexit.register(shutil.rmtree, directory, ignore_errors=True)
+    source = os.path.join(directory, 'activity.csv')
+    fixtures.activity(scale).to_csv(source, index=False)
+    return lambda: process_csv(source, os.path.join(directory, 'result.csv'))
+
+
+# -------------------------
+# Model1, Model2, Model5: one request's prediction
+# -------------------------
+def _model1():
+    use('Model1')
+    models = {}
+    for name in ('model4.pkl', 'scaler4.pkl', 'label_encoder4.pkl'):
+        with open(model_file('Model1', 'model', name), 'rb') as f:
+            models[name] = pickle.load(f)
+    le = models['label_encoder4.pkl']
+    return models['model4.pkl'], models['scaler4.pkl'], le.transform(le.classes_)
+
+
+@benchmark('model1.recommend_sklearn', scaled=False)
+def model1_recommend_sklearn(scale):
+    model, scaler, codes = _model1()
+    from recommender import recommend
+    return lambda: recommend(model, scaler, codes, [125000.0], [2500000.0])
+
+
+@benchmark('model1.recommend_flat', scaled=False)
+def model1_recommend_flat(scale):
+    model, scaler, codes = _model1()
+    from forest import FlatForest
+    from recommender import recommend
+    flat = FlatForest.from_sklearn(model)
+    return lambda: recommend(flat, scaler, codes, [125000.0], [2500000.0])
+
+
+def _model2(ttl):
+    use('Model2')
+    import joblib
+    from pricing import PriceService
+    model = joblib.load(model_file('Model2', 'model', 'carbonCreditPrice1.pkl'))
+    return PriceService(model, ttl=ttl)
+
+
+@benchmark('model2.price_uncached', scaled=False)
+def model2_price_uncached(scale):
+    # ttl=0: every entry has expired by the next lookup, so each quote runs the model
+    prices = _model2(ttl=0)
+    project = fixtures.model2_projects(1)[0]
+    return lambda: prices.price(project)
+
+
+@benchmark('model2.price_cached', scaled=False)
+def model2_price_cached(scale):
+    prices = _model2(ttl=3600)
+    project = fixtures.model2_projects(1)[0]
+    return lambda: prices.price(project)
+
+
+@benchmark('model5.predict', scaled=False)
+def model5_predict(scale):
+    import joblib
+    model = joblib.load(model_file('Model5', 'model', 'carbon_emission_model1.pkl'))
+    row = np.array([[250000.0, 2, 15000.0, 2.3]])
+    return lambda: model.predict(row)
+
+
+def run(fn, min_time, min_runs, max_runs):
+    fn()  # warm up
+    latencies = []
+    started = time.perf_counter()
+    while len(latencies) < max_runs and (len(latencies) < min_runs or time.perf_counter() - started < min_time):
+        t0 = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t0)
+    return summarize(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--scales', nargs='+', choices=fixtures.SCALES, default=['small', 'medium'])
+    parser.add_argument('--only', nargs='+', default=['*'],
+                        help='benchmark names or prefixes/patterns, e.g. model6 model3.full_dump "*predict*"')
+    parser.add_argument('--min-time', type=float, default=1.0, help='seconds per benchmark')
+    parser.add_argument('--min-runs', type=int, default=5)
+    parser.add_argument('--max-runs', type=int, default=10000)
+    add_arguments(parser, metric='p50_ms')
+    args = parser.parse_args()
+
+    selected = [name for name in BENCHMARKS
+                if any(fnmatch.fnmatch(name, pattern) or name.startswith(pattern + '.') for pattern in args.only)]
+    results = {}
+    print(f"{'benchmark':>36} {'n':>6} {'p50 (ms)':>10} {'p95 (ms)':>10} {'p99 (ms)':>10}")
+    for name in selected:
+        setup, scaled = BENCHMARKS[name]
+        for scale in args.scales if scaled else [None]:
+            key = f'{name}[{scale}]' if scaled else name
+            try:
+                fn = setup(scale)
+            except Skip as e:
+                print(f"{key:>36}   skipped: {e}")
+                results[key] = {'skipped': str(e)}
+                continue
+            result = run(fn, args.min_time, args.min_runs, args.max_runs)
+            results[key] = result
+            print(f"{key:>36} {result['n']:>6} {result['p50_ms']:>10.3f} {result['p95_ms']:>10.3f} "
+                  f"{result['p99_ms']:>10.3f}")
+
+    finish(args, 'micro', results, scales=args.scales, min_time=args.min_time)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Model1 inference through the flattened NumPy forest versus
+RandomForestRegressor.predict: an equivalence check, then per-request
+latency (one scenario = one row per strategy) and batch throughput.
+
+The check fails (exit status 1) unless both backends return bit-identical
+predictions and the same recommended strategies.
+
+    python benchmarks/model1_forest.py --requests 2000 --batch 1 100 10000
+"""
+import argparse
+import os
+import pickle
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+MODEL1 = os.path.join(ROOT, 'Model1')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, MODEL1)
+from forest import FlatForest  # noqa: E402
+from recommender import FEATURE_COLUMNS, build_features, recommend  # noqa: E402
+
+
+def load(name):
+    with open(os.path.join(MODEL1, 'model', name), 'rb') as f:
+        return pickle.load(f)
+
+
+def make_scenarios(n, seed=0):
+    rng = np.random.default_rng(seed)
+    # Log-uniform emissions (tonnes) and costs (USD) across the realistic ranges
+    return 10 ** rng.uniform(1, 7, n), 10 ** rng.uniform(3, 9, n)
+
+
+def check_equivalence(model, flat, scaler, strategy_codes, n):
+    import pandas as pd
+
+    emissions, costs = make_scenarios(n, seed=1)
+    features = build_features(emissions, costs, strategy_codes, scaler)
+    expected = model.predict(pd.DataFrame(features, columns=FEATURE_COLUMNS))
+    actual = flat.predict(features)
+    mismatches = int((expected != actual).sum())
+    print(f"equivalence: {len(features)} rows, {mismatches} mismatches, "
+          f"max |diff| {np.abs(expected - actual).max():.3g}")
+
+    sk_index, sk_best = recommend(model, scaler, strategy_codes, emissions, costs)
+    flat_index, flat_best = recommend(flat, scaler, strategy_codes, emissions, costs)
+    same = np.array_equal(sk_index, flat_index) and np.array_equal(sk_best, flat_best)
+    print(f"recommendations identical: {same}")
+    return mismatches == 0 and same
+
+
+def time_requests(predictor, scaler, strategy_codes, emissions, costs):
+    latencies = np.empty(len(emissions))
+    for i in range(len(emissions)):
+        t0 = time.perf_counter()
+        recommend(predictor, scaler, strategy_codes, emissions[i:i + 1], costs[i:i + 1])
+        latencies[i] = time.perf_counter() - t0
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--batch', type=int, nargs='+', default=[1, 100, 10000])
+    parser.add_argument('--check-rows', type=int, default=20000, help='scenarios in the equivalence check')
+    args = parser.parse_args()
+
+    model, scaler, le = load('model4.pkl'), load('scaler4.pkl'), load('label_encoder4.pkl')
+    strategy_codes = le.transform(le.classes_)
+    t0 = time.perf_counter()
+    flat = FlatForest.from_sklearn(model)
+    print(f"flattened {flat.n_trees} trees, {len(flat.value)} nodes, depth {flat.max_depth} "
+          f"in {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+    ok = check_equivalence(model, flat, scaler, strategy_codes, args.check_rows)
+
+    backends = {'sklearn': model, 'flat': flat}
+    emissions, costs = make_scenarios(args.requests)
+    print(f"\n{'backend':>8} {'p50 (ms)':>10} {'p99 (ms)':>10} {'req/s':>10}   per request ({len(strategy_codes)} rows)")
+    for name, predictor in backends.items():
+        recommend(predictor, scaler, strategy_codes, emissions[:1], costs[:1])
+        latencies = time_requests(predictor, scaler, strategy_codes, emissions, costs)
+        p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+        print(f"{name:>8} {p50:>10.3f} {p99:>10.3f} {1 / latencies.mean():>10.1f}")
+
+    print(f"\n{'backend':>8} {'batch':>8} {'scenarios/s':>12}")
+    for batch in args.batch:
+        e, c = make_scenarios(batch, seed=2)
+        for name, predictor in backends.items():
+            repeats = max(1, 2000 // batch)
+            t0 = time.perf_counter()
+            for _ in range(repeats):
+                recommend(predictor, scaler, strategy_codes, e, c)
+            print(f"{name:>8} {batch:>8} {batch * repeats / (time.perf_counter() - t0):>12.0f}")
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
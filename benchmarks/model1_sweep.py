@@ -0,0 +1,80 @@
+"""
+Model1 what-if sweeps (Model1/sweep.py): an equivalence check against
+recommend() on every cell of a small grid, then sweep throughput for
+several worker counts and the scenario-by-scenario loop it replaces.
+
+The check fails (exit status 1) unless every cell's winning strategy and
+capped effectiveness match recommend().
+
+    python benchmarks/model1_sweep.py --grid 1000 1000 --workers 1 2 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+MODEL1 = os.path.join(ROOT, 'Model1')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, MODEL1)
+from recommender import load_artifacts, recommend  # noqa: E402
+from sweep import SweepEngine, axis  # noqa: E402
+
+
+def log_axis(start, stop, num):
+    return axis({'start': start, 'stop': stop, 'num': num, 'scale': 'log'}, 'axis')
+
+
+def check_equivalence(model, scaler, le, codes):
+    emissions, costs = log_axis(10, 1e7, 60), log_axis(1e3, 1e9, 80)
+    result = SweepEngine(model, scaler, le.classes_, codes, workers=2, chunk_cells=1000).run(emissions, costs)
+    grid_e, grid_c = np.meshgrid(emissions, costs, indexing='ij')
+    best_index, best = recommend(model, scaler, codes, grid_e.ravel(), grid_c.ravel())
+    same_index = np.array_equal(result.best_index.ravel(), best_index)
+    # Results are stored as float32
+    same_value = np.allclose(result.best_effectiveness.ravel(), best, rtol=1e-6)
+    print(f"equivalence: {result.cells} cells, strategies identical: {same_index}, "
+          f"effectiveness within float32: {same_value}")
+    return same_index and same_value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--grid', type=int, nargs=2, default=[1000, 1000], metavar=('EMISSIONS', 'COSTS'))
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--loop-scenarios', type=int, default=200,
+                        help='scenarios timed one /predict call at a time, for comparison')
+    parser.add_argument('--model-dir', default=os.path.join(MODEL1, 'model'))
+    args = parser.parse_args()
+
+    model, scaler, le = load_artifacts(args.model_dir)
+    codes = le.transform(le.classes_)
+    ok = check_equivalence(model, scaler, le, codes)
+
+    emissions, costs = log_axis(10, 1e7, args.grid[0]), log_axis(1e3, 1e9, args.grid[1])
+    cells = len(emissions) * len(costs)
+    t0 = time.perf_counter()
+    for e, c in zip(emissions[:args.loop_scenarios], costs[:args.loop_scenarios]):
+        recommend(model, scaler, codes, [e], [c])
+    loop_rate = min(args.loop_scenarios, len(emissions), len(costs)) / (time.perf_counter() - t0)
+
+    print(f"\n{cells} cells x {len(codes)} strategies")
+    print(f"{'mode':>16} {'seconds':>9} {'cells/s':>11}")
+    print(f"{'per-request loop':>16} {cells / loop_rate:>9.1f} {loop_rate:>11.0f}   (extrapolated)")
+    with tempfile.TemporaryDirectory() as tmp:
+        for workers in args.workers:
+            engine = SweepEngine(model, scaler, le.classes_, codes, workers=workers)
+            result = engine.run(emissions, costs)
+            print(f"{f'sweep x{workers}':>16} {result.seconds:>9.2f} {cells / result.seconds:>11.0f}")
+        result = engine.run(emissions, costs, os.path.join(tmp, 'tensor.npy'))
+        size = os.path.getsize(os.path.join(tmp, 'tensor.npy')) / 1e6
+        print(f"{'+ tensor':>16} {result.seconds:>9.2f} {cells / result.seconds:>11.0f}   ({size:.0f} MB .npy)")
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
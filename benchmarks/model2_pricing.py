@@ -0,0 +1,74 @@
+"""
+Per-quote latency of the Model2 price predictor: the original one-row
+pipeline.predict versus PriceService on a cold and a warm cache.
+
+    python benchmarks/model2_pricing.py --quotes 2000
+"""
+import argparse
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Model2'))
+from fixtures import model2_projects  # noqa: E402
+from pricing import PriceService  # noqa: E402
+
+DEFAULT_MODEL = os.path.join(os.path.dirname(__file__), '..', 'Model2', 'model', 'carbonCreditPrice1.pkl')
+
+
+def legacy_price(model, quote):
+    df = pd.DataFrame({
+        'OffsetMethod': [quote['offset_method']],
+        'ProjectLocation': [quote['project_location']],
+        'VerificationStatus': [quote['verification_status']],
+        'TechnologyUsed': [quote['technology_used']],
+        'EmissionReduction': [quote['emission_reduction']],
+        'ProjectSize': [quote['project_size']],
+    })
+    return round(model.predict(df)[0] * 8.1, 2)
+
+
+def per_call_ms(fn, quotes):
+    latencies = []
+    for quote in quotes:
+        t0 = time.perf_counter()
+        fn(quote)
+        latencies.append(time.perf_counter() - t0)
+    return np.percentile(np.array(latencies) * 1000, [50, 99])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--model', default=DEFAULT_MODEL)
+    parser.add_argument('--quotes', type=int, default=2000)
+    parser.add_argument('--distinct', type=int, default=200)
+    args = parser.parse_args()
+
+    model = joblib.load(args.model)
+    quotes = model2_projects(args.quotes, args.distinct)
+
+    service = PriceService(model)
+    rows = [
+        ('pipeline.predict', per_call_ms(lambda q: legacy_price(model, q), quotes)),
+        ('service (cold)', per_call_ms(service.price, quotes[:args.distinct])),
+        ('service (warm)', per_call_ms(service.price, quotes)),
+    ]
+
+    start = time.perf_counter()
+    PriceService(model).price_many(quotes)
+    batch_ms = (time.perf_counter() - start) * 1000
+
+    print(f"{'path':>18} {'p50 (ms)':>10} {'p99 (ms)':>10}")
+    for name, (p50, p99) in rows:
+        print(f"{name:>18} {p50:>10.4f} {p99:>10.4f}")
+    print(f"batch of {len(quotes)} quotes (cold cache): {batch_ms:.2f} ms")
+    print(f"cache: {service.stats()}")
+
+
+if __name__ == '__main__':
+    main()
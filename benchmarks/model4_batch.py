@@ -0,0 +1,84 @@
+"""
+Model4 batch uploads (Model4/batch.py): a batch of activity CSVs processed
+one after another with process_csv, as repeated /upload requests would,
+versus a BatchJobs job at several worker counts, and the same batch again
+once every file has been processed (all skipped by content hash).
+
+The check fails (exit status 1) unless the job's consolidated totals match
+the sum of the sequential per-file totals.
+
+    python benchmarks/model4_batch.py --files 24 --rows 100000 --workers 1 2 4
+"""
+import argparse
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'Model4'))
+import fixtures  # noqa: E402
+from batch import BatchJobs, save_stream  # noqa: E402
+from credits import process_csv  # noqa: E402
+
+
+def run_job(jobs, sources, upload_dir):
+    uploads = []
+    for source in sources:
+        with open(source, 'rb') as f:
+            path, digest, _ = save_stream(f, upload_dir)
+        uploads.append((os.path.basename(source), path, digest))
+    started = time.perf_counter()
+    job = jobs.submit(uploads)
+    job = jobs.wait(job['id'], timeout=3600)
+    return job, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--files', type=int, default=24)
+    parser.add_argument('--rows', type=int, default=100000, help='rows per file')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix='bench-model4-batch-')
+    try:
+        sources = []
+        scale = 'small' if args.rows <= fixtures.SCALES['small']['activity_rows'] else \
+            'medium' if args.rows <= fixtures.SCALES['medium']['activity_rows'] else 'large'
+        for i in range(args.files):
+            path = os.path.join(tmp, f'activity-{i:02d}.csv')
+            fixtures.activity(scale, seed=i).head(args.rows).to_csv(path, index=False)
+            sources.append(path)
+
+        started = time.perf_counter()
+        expected = sum(process_csv(source, os.path.join(tmp, 'sequential.csv'))[0]['carbon_offset']
+                       for source in sources)
+        sequential = time.perf_counter() - started
+        print(f"{args.files} files x {args.rows} rows")
+        print(f"{'mode':>22} {'seconds':>9} {'files/s':>9}")
+        print(f"{'sequential':>22} {sequential:>9.2f} {args.files / sequential:>9.1f}")
+
+        ok = True
+        for workers in args.workers:
+            upload_dir, output_dir = os.path.join(tmp, f'uploads-{workers}'), os.path.join(tmp, f'outputs-{workers}')
+            os.makedirs(upload_dir)
+            jobs = BatchJobs(upload_dir, output_dir, max_workers=workers)
+            job, seconds = run_job(jobs, sources, upload_dir)
+            ok &= job['status'] == 'done' and job['totals']['done'] == args.files and \
+                math.isclose(job['totals']['carbon_offset'], expected, rel_tol=1e-9)
+            print(f"{f'batch x{workers}':>22} {seconds:>9.2f} {args.files / seconds:>9.1f}")
+            job, seconds = run_job(jobs, sources, upload_dir)
+            ok &= job['totals']['skipped'] == args.files
+            print(f"{f'batch x{workers}, repeat':>22} {seconds:>9.2f} {args.files / seconds:>9.1f}   (all skipped)")
+        print(f"consolidated totals match sequential: {ok}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Throughput and tail latency of Model5 predictions under concurrency:
+one model.predict call per request versus the MicroBatcher.
+
+    python benchmarks/model5_batching.py --clients 1 8 64 512
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import joblib
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Model5'))
+from batching import MicroBatcher  # noqa: E402
+
+DEFAULT_MODEL = os.path.join(os.path.dirname(__file__), '..', 'Model5', 'model', 'carbon_emission_model1.pkl')
+
+
+def make_readings(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([
+        rng.uniform(1000, 1000000, n),   # coal_production
+        rng.integers(0, 4, n),           # coal_type
+        rng.uniform(100, 100000, n),     # energy_consumption
+        rng.uniform(0.5, 3.0, n),        # emission_factor
+    ])
+
+
+def run_clients(call, readings, clients, requests_per_client):
+    """Run `clients` threads each issuing requests_per_client calls; return latencies and wall time."""
+    latencies = [[] for _ in range(clients)]
+    start_gate = threading.Barrier(clients + 1)
+
+    def client(i):
+        start_gate.wait()
+        for j in range(requests_per_client):
+            row = readings[(i * requests_per_client + j) % len(readings)]
+            t0 = time.perf_counter()
+            call(row)
+            latencies[i].append(time.perf_counter() - t0)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    start_gate.wait()
+    t0 = time.perf_counter()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+    return np.concatenate([np.array(l) for l in latencies]), wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--model', default=DEFAULT_MODEL)
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 8, 64, 512])
+    parser.add_argument('--requests', type=int, default=2000, help='total requests per run')
+    parser.add_argument('--window-ms', type=float, default=3)
+    parser.add_argument('--max-batch', type=int, default=64)
+    args = parser.parse_args()
+
+    model = joblib.load(args.model)
+    readings = make_readings(10000)
+    batcher = MicroBatcher(model.predict, max_batch_size=args.max_batch, max_wait=args.window_ms / 1000)
+    modes = {
+        'direct': lambda row: model.predict(row.reshape(1, -1))[0],
+        'batched': batcher.predict,
+    }
+
+    print(f"{'clients':>8} {'mode':>8} {'req/s':>10} {'p50 (ms)':>10} {'p99 (ms)':>10}")
+    for clients in args.clients:
+        per_client = max(args.requests // clients, 1)
+        for name, call in modes.items():
+            latencies, wall = run_clients(call, readings, clients, per_client)
+            p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+            print(f"{clients:>8} {name:>8} {len(latencies) / wall:>10.1f} {p50:>10.3f} {p99:>10.3f}")
+    print(f"batcher: {batcher.stats()}")
+
+
+if __name__ == '__main__':
+    main()
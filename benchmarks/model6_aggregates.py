@@ -0,0 +1,86 @@
+"""
+Latency of the Model6 company endpoints as the ledger grows.
+
+Compares the old per-company boolean-mask scan with building the
+CompanyAggregates index once and answering from it.
+
+    python benchmarks/model6_aggregates.py --rows 5000 50000 500000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Model6'))
+from aggregates import CompanyAggregates  # noqa: E402
+
+COMPANY_NAMES = [
+    "Coal India Limited", "Adani Enterprises", "Singareni Collieries", "NLC India Limited",
+    "South Eastern Coalfields", "Western Coalfields", "Central Coalfields",
+    "Eastern Coalfields", "Mahanadi Coalfields", "Northern Coalfields",
+    "Bharat Coking Coal", "Tata Steel Mining", "Hindalco Industries"
+]
+
+
+def make_ledger(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'CompanyName': np.array(COMPANY_NAMES)[np.arange(rows) % len(COMPANY_NAMES)],
+        'CoalProduced_Tons': rng.integers(50000, 2000000, rows),
+        'Total_CO2_Emissions_Tons': rng.integers(100000, 10000000, rows),
+        'Emission_Intensity': rng.uniform(0, 200, rows),
+        'Score': rng.uniform(0, 250, rows),
+        'Green_Investment_Ratio': rng.uniform(0, 2, rows),
+    })
+
+
+def scan_summary(df):
+    # The original get_company_summary loop
+    summary = []
+    for company in df['CompanyName'].unique():
+        company_data = df[df['CompanyName'] == company]
+        summary.append({
+            'company': company,
+            'production': int(company_data['CoalProduced_Tons'].sum()),
+            'emissions': int(company_data['Total_CO2_Emissions_Tons'].sum()),
+            'intensity': round(company_data['Emission_Intensity'].mean(), 3),
+            'score': round(company_data['Score'].mean(), 2),
+            'green_investment_ratio': round(company_data['Green_Investment_Ratio'].mean(), 2),
+        })
+    return summary
+
+
+def index_summary(aggregates):
+    return [dict(totals, company=company) for company, totals in aggregates.items()]
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[5000, 50000, 500000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'scan (ms)':>12} {'build (ms)':>12} {'lookup (ms)':>12}")
+    for rows in args.rows:
+        df = make_ledger(rows)
+        scan_ms = best_of(lambda: scan_summary(df), args.repeat)
+        build_ms = best_of(lambda: CompanyAggregates(df), args.repeat)
+        aggregates = CompanyAggregates(df)
+        lookup_ms = best_of(lambda: index_summary(aggregates), args.repeat)
+        print(f"{rows:>10} {scan_ms:>12.3f} {build_ms:>12.3f} {lookup_ms:>12.3f}")
+
+
+if __name__ == '__main__':
+    main()
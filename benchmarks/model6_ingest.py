@@ -0,0 +1,56 @@
+"""
+Ingest throughput of the Model6 ledger: appending batches to a snapshot
+versus rebuilding every derived structure from the combined ledger.
+
+    python benchmarks/model6_ingest.py --base-companies 50000 --batch-rows 1000 10000 50000
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'Model6'))
+from a import generate  # noqa: E402
+from ledger import Ledger  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--base-companies', type=int, default=50000, help='companies in the starting ledger (x10 years)')
+    parser.add_argument('--batch-rows', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--batches', type=int, default=5)
+    args = parser.parse_args()
+
+    base = pd.concat(generate(args.base_companies, seed=1), ignore_index=True)
+    print(f"base ledger: {len(base)} rows")
+    print(f"{'batch rows':>10} {'append rows/s':>15} {'rebuild rows/s':>15}")
+
+    for batch_rows in args.batch_rows:
+        companies = max(batch_rows // 10, 1)
+        batches = [pd.concat(generate(companies, seed=100 + i), ignore_index=True) for i in range(args.batches)]
+        total = sum(len(b) for b in batches)
+
+        ledger = Ledger()
+        ledger.load(base)
+        start = time.perf_counter()
+        for batch in batches:
+            ledger.append(batch)
+        append_s = time.perf_counter() - start
+
+        rebuild = Ledger()
+        df = base
+        start = time.perf_counter()
+        for batch in batches:
+            df = pd.concat([df, batch], ignore_index=True)
+            rebuild.load(df)
+        rebuild_s = time.perf_counter() - start
+
+        print(f"{batch_rows:>10} {total / append_s:>15,.0f} {total / rebuild_s:>15,.0f}")
+
+
+if __name__ == '__main__':
+    main()
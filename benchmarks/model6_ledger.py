@@ -0,0 +1,150 @@
+"""
+Model6 ledger layout: the frame as parsed from the CSV versus the compact
+frame the ledger keeps (company columns as categorical codes, integers
+downcast, rows sorted by company). Compares memory footprint and the cost
+of finding one company's rows: a scan of the CompanyName column (with the
+unique() membership check the handlers used to run) versus an index
+lookup and a contiguous slice. The ledger is also loaded from a columnar
+store ingested with --sort-by CompanyName, where its columns should stay
+memory-mapped: "store heap MB" is what it still holds in private memory.
+Then --appends batches of --append-rows records are appended to it, timing
+each append and measuring private memory again afterwards.
+
+The check fails (exit status 1) unless every lookup returns the same rows
+for every company, appended rows included.
+
+    python benchmarks/model6_ledger.py --scales small medium large
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'Model6'))
+import fixtures  # noqa: E402
+from common import columnar  # noqa: E402
+from ledger import Ledger  # noqa: E402
+
+
+def per_call_us(fn, args, min_time=0.5):
+    calls, started = 0, time.perf_counter()
+    while time.perf_counter() - started < min_time:
+        for arg in args:
+            fn(arg)
+        calls += len(args)
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+def scan(df, company):
+    if company not in df['CompanyName'].unique():
+        return None
+    return df[df['CompanyName'] == company]
+
+
+def rows_of(df):
+    """A company's rows as a sorted list, for comparing lookups that may order them differently."""
+    return sorted(map(tuple, df[['CompanyID', 'Year', 'CoalProduced_Tons']].astype(str).values.tolist()))
+
+
+def heap_mb(df):
+    """MB of df held in private memory: columns not mapped from a store file, and category lists."""
+    usage = df.memory_usage(deep=True, index=False)
+    total = 0
+    for col in df.columns:
+        values = df[col].array
+        if isinstance(values, pd.Categorical):
+            total += values.categories.memory_usage(deep=True)
+            values = values.codes
+        else:
+            values = np.asarray(values)
+        while values is not None and not isinstance(values, np.memmap):
+            values = values.base
+        if values is None:
+            total += usage[col]
+    return total / 1e6
+
+
+def append_batches(snapshot, df, batches, batch_rows):
+    """Append `batches` batches of rows resampled from df; (last snapshot, ms per append, rows per company added)."""
+    ledger, rng = Ledger(), np.random.default_rng(0)
+    ledger.current = snapshot
+    times, added = [], {}
+    for i in range(batches):
+        rows = df.iloc[rng.integers(0, len(df), batch_rows)].assign(Year=df['Year'].max() + 1 + i)
+        started = time.perf_counter()
+        ledger.append(rows)
+        times.append((time.perf_counter() - started) * 1000)
+        for company, count in rows['CompanyName'].value_counts().items():
+            added[company] = added.get(company, 0) + count
+    return ledger.current, times, added
+
+
+def load_from_store(df, directory):
+    csv_path = os.path.join(directory, 'ledger.csv')
+    df.to_csv(csv_path, index=False)
+    store_dir = columnar.ingest(csv_path, sort_by='CompanyName')
+    started = time.perf_counter()
+    snapshot = Ledger().load(columnar.load(store_dir))
+    return snapshot, (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--scales', nargs='+', choices=fixtures.SCALES, default=['small', 'medium'])
+    parser.add_argument('--min-time', type=float, default=0.5, help='seconds per lookup timing')
+    parser.add_argument('--appends', type=int, default=20, help='batches appended to the store-loaded ledger')
+    parser.add_argument('--append-rows', type=int, default=1000, help='records per appended batch')
+    args = parser.parse_args()
+
+    ok, appended = True, []
+    print(f"{'scale':>7} {'rows':>9} {'parsed MB':>10} {'compact MB':>11} {'load ms':>8} "
+          f"{'scan us':>10} {'index us':>9} {'speedup':>8} {'store load ms':>14} {'store heap MB':>14}")
+    for scale in args.scales:
+        df = fixtures.ledger(scale)
+        started = time.perf_counter()
+        snapshot = Ledger().load(df)
+        load_ms = (time.perf_counter() - started) * 1000
+
+        companies = list(snapshot.companies.names)
+        for company in companies:
+            ok &= rows_of(scan(df, company)) == rows_of(snapshot.company_rows(company))
+
+        with tempfile.TemporaryDirectory() as directory:
+            stored, store_ms = load_from_store(df, directory)
+            store_heap_mb = heap_mb(stored.df)
+            for company in companies:
+                ok &= rows_of(stored.company_rows(company)) == rows_of(snapshot.company_rows(company))
+
+            after, times, added = append_batches(stored, df, args.appends, args.append_rows)
+            tail_mb = after.tail.memory_usage(deep=True).sum() / 1e6 if after.tail is not None else 0
+            appended.append((scale, after.rows, np.median(times), max(times), heap_mb(after.base) + tail_mb))
+            for company in companies:
+                ok &= len(after.company_rows(company)) == len(stored.company_rows(company)) + added.get(company, 0)
+            del stored, after
+
+        parsed_mb = df.memory_usage(deep=True).sum() / 1e6
+        compact_mb = snapshot.df.memory_usage(deep=True).sum() / 1e6
+        scan_us = per_call_us(lambda company: scan(df, company), companies, args.min_time)
+        index_us = per_call_us(snapshot.company_rows, companies, args.min_time)
+        print(f"{scale:>7} {len(df):>9} {parsed_mb:>10.1f} {compact_mb:>11.1f} {load_ms:>8.0f} "
+              f"{scan_us:>10.0f} {index_us:>9.1f} {scan_us / index_us:>7.0f}x {store_ms:>14.0f} {store_heap_mb:>14.1f}")
+
+    print(f"\nappending {args.appends} batches of {args.append_rows} records to the store-loaded ledger")
+    print(f"{'scale':>7} {'rows':>9} {'p50 ms':>8} {'max ms':>8} {'heap MB':>8}")
+    for scale, rows, p50, slowest, after_mb in appended:
+        print(f"{scale:>7} {rows:>9} {p50:>8.1f} {slowest:>8.1f} {after_mb:>8.1f}")
+
+    print(f"\npandas {pd.__version__}; dtypes of the compact frame: "
+          f"{snapshot.df.dtypes.astype(str).value_counts().to_dict()}")
+    print(f"same rows for every company: {ok}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
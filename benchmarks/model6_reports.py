@@ -0,0 +1,94 @@
+"""
+Model6 report aggregation: the original single groupby().agg() versus
+aggregate() in Model6/reports.py on the in-memory ledger, and
+aggregate_chunks() streaming the ledger from a CSV, per report type and
+breakdown, on a synthetic ledger from a.py. Also times writing the report
+as CSV, gzip CSV and (with pyarrow) Parquet.
+
+The check fails (exit status 1) unless all three give the same table.
+
+    python benchmarks/model6_reports.py --companies 100000 --years 10
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'Model6'))
+from a import generate  # noqa: E402
+from reports import BREAKDOWNS, REPORTS, aggregate, aggregate_chunks, parquet_available, write_report  # noqa: E402
+
+
+def single_groupby(df, report_type, breakdown):
+    # The original generate_report, generalised to the breakdown's keys
+    spec = REPORTS[report_type]
+    report = df.groupby(BREAKDOWNS[breakdown]).agg({col: how for col, how, _ in spec})
+    return report.rename(columns={col: out for col, _, out in spec})
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--companies', type=int, default=100000)
+    parser.add_argument('--years', type=int, default=10)
+    parser.add_argument('--chunk-rows', type=int, default=250000)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    df = pd.concat(generate(args.companies, range(2024 - args.years, 2024), seed=0), ignore_index=True)
+    print(f"ledger: {len(df)} rows")
+
+    def same(expected, actual):
+        return (expected.index.equals(actual.index) and list(expected.columns) == list(actual.columns)
+                and np.allclose(expected.to_numpy(float), actual.to_numpy(float), equal_nan=True))
+
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger_path = os.path.join(tmp, 'ledger.csv')
+        df.to_csv(ledger_path, index=False)
+        print(f"\n{'report':>11} {'breakdown':>10} {'groups':>8} {'groupby (ms)':>13} {'aggregate (ms)':>15}"
+              f" {'streamed (ms)':>14} {'same':>5}")
+        for report_type in REPORTS:
+            for breakdown in BREAKDOWNS:
+                expected = single_groupby(df, report_type, breakdown)
+                actual = aggregate(df, report_type, breakdown)
+                start = time.perf_counter()
+                streamed = aggregate_chunks(pd.read_csv(ledger_path, chunksize=args.chunk_rows),
+                                            report_type, breakdown, args.workers)
+                streamed_ms = (time.perf_counter() - start) * 1000
+                both = same(expected, actual) and same(expected, streamed)
+                ok &= both
+                single_ms = best_of(lambda: single_groupby(df, report_type, breakdown), args.repeat)
+                aggregate_ms = best_of(lambda: aggregate(df, report_type, breakdown), args.repeat)
+                print(f"{report_type:>11} {breakdown:>10} {len(actual):>8} {single_ms:>13.1f} {aggregate_ms:>15.1f}"
+                      f" {streamed_ms:>14.1f} {both!s:>5}")
+
+    report = aggregate(df, 'emissions', 'mine')
+    formats = ['csv', 'csv.gz'] + (['parquet'] if parquet_available() else [])
+    print(f"\n{'format':>8} {'write (ms)':>11} {'size (MB)':>10}   emissions by mine")
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in formats:
+            path = os.path.join(tmp, f'report.{fmt}')
+            write_ms = best_of(lambda: write_report(report, path, fmt), args.repeat)
+            print(f"{fmt:>8} {write_ms:>11.1f} {os.path.getsize(path) / 1e6:>10.2f}")
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
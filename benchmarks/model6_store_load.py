@@ -0,0 +1,103 @@
+"""
+Concurrent load on the Model6 SQLite store: several processes, each with
+several threads, sending messages and reading one company's latest page,
+the same mix the dashboard produces under a multi-worker gunicorn.
+
+    python benchmarks/model6_store_load.py --processes 1 4 --threads 8
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Model6'))
+from store import Store  # noqa: E402
+
+COMPANIES = ['Coal India Limited', 'Bharat Coking Coal', 'Mahanadi Coalfields', 'Northern Coalfields',
+             'Singareni Collieries', 'South Eastern Coalfields', 'Western Coalfields', 'Central Coalfields']
+
+
+def worker(path, threads, ops, write_ratio, seed, results):
+    store = Store(path)
+    latencies = {'write': [], 'read': []}
+    lock = threading.Lock()
+
+    def client(i):
+        rng = np.random.default_rng(seed * 1000 + i)
+        local = {'write': [], 'read': []}
+        for _ in range(ops):
+            company = COMPANIES[rng.integers(len(COMPANIES))]
+            t0 = time.perf_counter()
+            if rng.random() < write_ratio:
+                store.add_message({"company": company, "text": "load test", "sender": company, "date": "01/01/2025 00:00"})
+                kind = 'write'
+            else:
+                store.list_messages(company, limit=100)
+                kind = 'read'
+            local[kind].append(time.perf_counter() - t0)
+        with lock:
+            for kind in local:
+                latencies[kind].extend(local[kind])
+
+    pool = [threading.Thread(target=client, args=(i,)) for i in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    results.put(latencies)
+
+
+def run(path, processes, threads, ops, write_ratio):
+    results = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=worker, args=(path, threads, ops, write_ratio, p, results))
+             for p in range(processes)]
+    t0 = time.perf_counter()
+    for p in procs:
+        p.start()
+    merged = {'write': [], 'read': []}
+    for _ in procs:
+        for kind, values in results.get().items():
+            merged[kind].extend(values)
+    for p in procs:
+        p.join()
+    return merged, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 4])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--ops', type=int, default=500, help='operations per thread')
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    parser.add_argument('--preload', type=int, default=100000, help='messages in the table before the run')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'model6.db')
+        store = Store(path)
+        rng = np.random.default_rng(0)
+        batch = [{"company": COMPANIES[i], "text": "history", "sender": "Government", "date": "01/01/2024 00:00"}
+                 for i in rng.integers(len(COMPANIES), size=args.preload)]
+        t0 = time.perf_counter()
+        store.add_messages(batch)
+        print(f"preloaded {args.preload} messages in one transaction: {time.perf_counter() - t0:.2f}s")
+
+        print(f"{'procs':>6} {'threads':>8} {'ops/s':>10} {'kind':>6} {'p50 (ms)':>10} {'p99 (ms)':>10}")
+        for processes in args.processes:
+            latencies, wall = run(path, processes, args.threads, args.ops, args.write_ratio)
+            total = sum(len(v) for v in latencies.values())
+            for kind, values in latencies.items():
+                if not values:
+                    continue
+                p50, p99 = np.percentile(values, [50, 99]) * 1000
+                print(f"{processes:>6} {args.threads:>8} {total / wall:>10.1f} {kind:>6} {p50:>10.3f} {p99:>10.3f}")
+        print(f"messages: {store.count_messages()}, version: {store.version()}")
+
+
+if __name__ == '__main__':
+    main()
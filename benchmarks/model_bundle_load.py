@@ -0,0 +1,94 @@
+"""
+Load time and memory of the model artefacts: the current pickles versus
+a model bundle (common.model_bundle), with and without hash verification
+and memory mapping.
+
+Bundles are packed from the pickles into a temporary directory first.
+Each measurement runs in a fresh interpreter with numpy, sklearn and
+joblib already imported, so only the load itself is timed.
+
+    python benchmarks/model_bundle_load.py --repeat 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Service -> component name -> pickle, as the apps load them today
+MODELS = {
+    'Model1': {'estimator': 'Model1/model/model4.pkl', 'scaler': 'Model1/model/scaler4.pkl',
+               'encoder': 'Model1/model/label_encoder4.pkl'},
+    'Model2': {'estimator': 'Model2/model/carbonCreditPrice1.pkl'},
+    'Model5': {'estimator': 'Model5/model/carbon_emission_model1.pkl'},
+}
+
+CHILD = r"""
+import json, sys, time
+sys.path.insert(0, {root!r})
+import joblib, numpy, sklearn.ensemble
+from common.model_bundle import load_bundle
+
+start = time.perf_counter()
+if {mode!r} == 'pickle':
+    components = {{name: joblib.load(path) for name, path in {pickles!r}.items()}}
+else:
+    components = load_bundle({bundle!r}, mmap={mmap!r}, verify={verify!r}).components
+loaded = time.perf_counter() - start
+
+mem = {{}}
+with open('/proc/self/smaps_rollup') as f:
+    for line in f:
+        key, _, value = line.partition(':')
+        if key in ('Rss', 'Private_Clean', 'Private_Dirty'):
+            mem[key] = int(value.split()[0])
+print(json.dumps({{'load_s': loaded, 'rss_kb': mem.get('Rss'),
+                  'private_kb': mem.get('Private_Clean', 0) + mem.get('Private_Dirty', 0)}}))
+"""
+
+MODES = {
+    'pickle': {'mode': 'pickle', 'mmap': False, 'verify': False},
+    'bundle': {'mode': 'bundle', 'mmap': True, 'verify': True},
+    'bundle-noverify': {'mode': 'bundle', 'mmap': True, 'verify': False},
+    'bundle-nommap': {'mode': 'bundle', 'mmap': False, 'verify': True},
+}
+
+
+def measure(pickles, bundle, options):
+    code = CHILD.format(root=ROOT, pickles=pickles, bundle=bundle, **options)
+    out = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    sys.path.insert(0, ROOT)
+    import joblib
+    from common.model_bundle import save_bundle
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--models', nargs='+', default=list(MODELS))
+    args = parser.parse_args()
+
+    print(f"{'service':>8} {'artefact':>16} {'size (MB)':>10} {'load (ms)':>10} {'RSS (MB)':>10} {'private (MB)':>13}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for service in args.models:
+            pickles = {name: os.path.join(ROOT, path) for name, path in MODELS[service].items()}
+            bundle = os.path.join(tmp, f'{service}.bundle')
+            manifest = save_bundle(bundle, {name: joblib.load(path) for name, path in pickles.items()},
+                                   feature_columns=['unused'])
+            sizes = {'pickle': sum(os.path.getsize(p) for p in pickles.values()), 'bundle': manifest['size']}
+
+            for name, options in MODES.items():
+                runs = [measure(pickles, bundle, options) for _ in range(args.repeat)]
+                best = min(runs, key=lambda r: r['load_s'])
+                size = sizes[options['mode']] / 1e6
+                print(f"{service:>8} {name:>16} {size:>10.1f} {best['load_s'] * 1000:>10.1f} "
+                      f"{best['rss_kb'] / 1024:>10.1f} {best['private_kb'] / 1024:>13.1f}")
+
+
+if __name__ == '__main__':
+    main()
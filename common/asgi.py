@@ -0,0 +1,399 @@
+"""
+ASGI serving mode for the predictor apps (Model1, Model2, Model5).
+
+Under the Flask dev server every request holds a thread while it waits on
+model.predict. AsgiApp answers an app's prediction routes from an event
+loop instead: the body is read, parsed and validated on the loop, and only
+the model call is handed to a bounded thread pool (NumPy and the sklearn
+forests release the GIL for most of it). Every other route (pages, static
+files, health checks, /metrics, ...) is passed to the Flask app on a
+separate thread pool, so both modes serve the same URLs.
+
+    import app as service
+    app = AsgiApp(service.app, service.metrics, service.warmup, threads=4, queue=64)
+
+    @app.route('/predict', ready=True)
+    async def predict(request):
+        data = request.get_json()
+        ...
+        prediction = await app.offload.run(service.model.predict, features)
+        return {'prediction': prediction.tolist()}
+
+    uvicorn asgi:app --port 5000
+
+Handlers take a Request (args, form and get_json() as on flask.request)
+and return what a Flask view would: a dict, (dict, status) or (dict,
+status, headers), encoded with the Flask app's JSON provider, or a Stream.
+
+At most `threads` model calls run at once and `queue` more wait for a
+thread. A request that would go past that is answered 429 with Retry-After
+straight away instead of queueing behind the rest. On shutdown (the ASGI
+lifespan event, sent once the server has stopped accepting connections)
+new requests get 503, requests in flight get up to `shutdown_timeout`
+seconds to finish, and then the pools are shut down.
+"""
+import asyncio
+import io
+import json
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
+from urllib.parse import parse_qsl
+
+from werkzeug.formparser import FormDataParser
+from werkzeug.http import parse_options_header
+
+logger = logging.getLogger(__name__)
+
+# Largest request body read into memory (bytes)
+MAX_BODY_BYTES = 32 * 1024 * 1024
+
+
+class HTTPError(Exception):
+    """Answer the request with {"error": message} and `status`."""
+
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+class Request:
+    def __init__(self, scope, path, body):
+        self.scope = scope
+        self.method = scope['method']
+        self.path = path
+        self.body = body
+        self.headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+        self.args = {}
+        for key, value in parse_qsl(scope.get('query_string', b'').decode('latin-1'), keep_blank_values=True):
+            self.args.setdefault(key, value)
+        self.mimetype, self.mimetype_params = parse_options_header(self.headers.get('content-type', ''))
+
+    @property
+    def is_json(self):
+        return self.mimetype == 'application/json' or (
+            self.mimetype.startswith('application/') and self.mimetype.endswith('+json'))
+
+    def get_json(self, silent=False):
+        """The parsed JSON body, as flask.request.get_json() (None when silent and it isn't JSON)."""
+        if not self.is_json:
+            if silent:
+                return None
+            raise HTTPError(415, "Did not attempt to load JSON data because the request "
+                                 "Content-Type was not 'application/json'.")
+        try:
+            return json.loads(self.body)
+        except ValueError:
+            if silent:
+                return None
+            raise HTTPError(400, 'Failed to decode JSON object')
+
+    @cached_property
+    def form(self):
+        """URL-encoded or multipart form fields, as flask.request.form."""
+        _, form, _ = FormDataParser().parse(io.BytesIO(self.body), self.mimetype, len(self.body),
+                                            self.mimetype_params)
+        return form
+
+
+class Stream:
+    """A response body of str or bytes chunks, each produced on the offload pool."""
+
+    def __init__(self, chunks, mimetype):
+        self.chunks = chunks
+        self.mimetype = mimetype
+
+
+class Offload:
+    """
+    Thread pool for blocking model calls. Calls past `threads` running plus
+    `queue` waiting are refused with a 429 HTTPError. The counters are only
+    touched from the event loop, so they need no lock.
+    """
+
+    def __init__(self, threads, queue, initializer=None):
+        self.threads = threads
+        self.queue = queue
+        self.pending = 0
+        self.rejected = 0
+        self._pool = ThreadPoolExecutor(threads, thread_name_prefix='predict', initializer=initializer)
+
+    def _admit(self):
+        if self.pending >= self.threads + self.queue:
+            self.rejected += 1
+            raise HTTPError(429, 'Too many predictions in progress; retry shortly', {'Retry-After': '1'})
+        self.pending += 1
+
+    async def run(self, fn, *args, admitted=False):
+        """
+        fn(*args) on the pool. With admitted=True the call continues a request
+        already let in (the next chunk of a stream) and is never refused.
+        """
+        if admitted:
+            self.pending += 1
+        else:
+            self._admit()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool, fn, *args)
+        finally:
+            self.pending -= 1
+
+    async def wait(self, submit, *args):
+        """Await the concurrent.futures.Future returned by submit(*args) (e.g. MicroBatcher.submit)."""
+        self._admit()
+        try:
+            return await asyncio.wrap_future(submit(*args))
+        finally:
+            self.pending -= 1
+
+    def stats(self):
+        return {'threads': self.threads, 'queue': self.queue, 'pending': self.pending, 'rejected': self.rejected}
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
+
+
+class AsgiApp:
+    def __init__(self, wsgi_app, metrics=None, warmup=None, threads=4, queue=64, wsgi_threads=8,
+                 shutdown_timeout=30, max_body=MAX_BODY_BYTES):
+        self.wsgi_app = wsgi_app
+        self.metrics = metrics
+        self.warmup = warmup
+        self.shutdown_timeout = shutdown_timeout
+        self.max_body = max_body
+        self.offload = Offload(threads, queue, initializer=metrics.bind_thread if metrics is not None else None)
+        self.closing = False
+        self._routes = {}
+        self._active = 0
+        self._idle = None
+        self._wsgi_pool = ThreadPoolExecutor(wsgi_threads, thread_name_prefix='wsgi')
+
+        if metrics is not None:
+            labels = (metrics.app_name,)
+            metrics.registry.callback('offload_pending', 'Model calls running or queued on the ASGI thread pool.',
+                                      ('app',)).set_function(labels, lambda: self.offload.pending)
+            metrics.registry.callback('offload_rejected_total', 'Requests answered 429 because the pool was full.',
+                                      ('app',), kind='counter').set_function(labels, lambda: self.offload.rejected)
+
+    def route(self, path, methods=('POST',), ready=False):
+        """Serve `path` from the event loop; with ready=True, only once the warmup has finished."""
+        def decorator(handler):
+            self._routes[path] = (frozenset(methods), handler, ready)
+            return handler
+        return decorator
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+        else:
+            raise RuntimeError(f"Unsupported ASGI scope type {scope['type']!r}")
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                if self.warmup is not None:
+                    self.warmup.start()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def shutdown(self):
+        """Refuse new requests, wait for the ones in flight, then stop the pools."""
+        self.closing = True
+        if self._active:
+            self._idle = asyncio.Event()
+            try:
+                await asyncio.wait_for(self._idle.wait(), self.shutdown_timeout)
+            except asyncio.TimeoutError:
+                logger.warning('Shutting down with %d requests still in progress', self._active)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.offload.shutdown)
+        await loop.run_in_executor(None, self._wsgi_pool.shutdown)
+
+    async def _http(self, scope, receive, send):
+        root = scope.get('root_path', '')
+        path = scope['path'][len(root):] if root and scope['path'].startswith(root) else scope['path']
+        route = self._routes.get(path)
+        if route is not None and scope['method'] not in route[0]:
+            route = None
+
+        self._active += 1
+        started = time.perf_counter()
+        status = 500
+        if route is not None and self.metrics is not None:
+            self.metrics.request_started()
+        try:
+            if self.closing:
+                raise HTTPError(503, 'Shutting down', {'Retry-After': '5'})
+            body = await self._read_body(scope, receive)
+            if route is None:
+                status = await self._call_wsgi(scope, path, body, send)
+            else:
+                status = await self._call_route(route, Request(scope, path, body), send)
+        except HTTPError as e:
+            status = await self._respond(send, *self._error(e))
+        except ClientDisconnected:
+            status = 499
+        finally:
+            self._active -= 1
+            if route is not None and self.metrics is not None:
+                self.metrics.request_finished(path, scope['method'], status, time.perf_counter() - started)
+            if self._idle is not None and not self._active:
+                self._idle.set()
+
+    async def _read_body(self, scope, receive):
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                raise ClientDisconnected
+            chunks.append(message.get('body', b''))
+            size += len(chunks[-1])
+            if size > self.max_body:
+                raise HTTPError(413, f'Request bodies are limited to {self.max_body} bytes')
+            if not message.get('more_body'):
+                return b''.join(chunks)
+
+    async def _call_route(self, route, request, send):
+        _, handler, ready = route
+        try:
+            if ready and self.warmup is not None and not self.warmup.ready:
+                loaded = await asyncio.get_running_loop().run_in_executor(
+                    self._wsgi_pool, self.warmup.wait, self.warmup.request_wait)
+                if not loaded:
+                    raise HTTPError(503, self.warmup.unavailable_message(), {'Retry-After': '5'})
+            result = await handler(request)
+            if isinstance(result, Stream):
+                return await self._stream(send, result)
+        except HTTPError as e:
+            result = self._error(e)
+        except Exception as e:
+            logger.exception('%s %s failed', request.method, request.path)
+            result = self._error(HTTPError(500, str(e)))
+        return await self._respond(send, *self._normalize(result))
+
+    @staticmethod
+    def _error(e):
+        return {'error': e.message}, e.status, e.headers
+
+    @staticmethod
+    def _normalize(result):
+        if not isinstance(result, tuple):
+            return result, 200, {}
+        body, status, headers = (result + ({},))[:3]
+        return body, status, headers
+
+    def _encode(self, body):
+        if self.metrics is None:
+            return self.wsgi_app.json.dumps(body, separators=(',', ':')) + '\n'
+        with self.metrics.timer('serialize'):
+            return self.wsgi_app.json.dumps(body, separators=(',', ':')) + '\n'
+
+    async def _respond(self, send, body, status, headers):
+        payload = self._encode(body).encode()
+        headers = dict(headers, **{'Content-Type': 'application/json', 'Content-Length': str(len(payload))})
+        await send({'type': 'http.response.start', 'status': status, 'headers': _header_list(headers)})
+        await send({'type': 'http.response.body', 'body': payload})
+        return status
+
+    async def _stream(self, send, stream):
+        # Each chunk is computed on the pool and sent from the loop, so a slow
+        # reader holds no pool thread while the client catches up
+        chunks = iter(stream.chunks)
+        chunk = await self.offload.run(next, chunks, None)
+        await send({'type': 'http.response.start', 'status': 200,
+                    'headers': _header_list({'Content-Type': stream.mimetype})})
+        while chunk is not None:
+            await send({'type': 'http.response.body', 'body': chunk.encode() if isinstance(chunk, str) else chunk,
+                        'more_body': True})
+            try:
+                chunk = await self.offload.run(next, chunks, None, admitted=True)
+            except Exception:
+                logger.exception('Streaming response failed part way')
+                break
+        await send({'type': 'http.response.body', 'body': b''})
+        return 200
+
+    async def _call_wsgi(self, scope, path, body, send):
+        loop = asyncio.get_running_loop()
+        environ = _environ(scope, path, body)
+        return await loop.run_in_executor(self._wsgi_pool, self._run_wsgi, loop, environ, send)
+
+    def _run_wsgi(self, loop, environ, send):
+        response = {}
+
+        def push(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                                   for name, value in headers]
+
+        def start():
+            if not response.get('started'):
+                response['started'] = True
+                push({'type': 'http.response.start', 'status': response['status'], 'headers': response['headers']})
+
+        result = self.wsgi_app(environ, start_response)
+        try:
+            for chunk in result:
+                if chunk:
+                    start()
+                    push({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        start()
+        push({'type': 'http.response.body', 'body': b''})
+        return response['status']
+
+
+def _header_list(headers):
+    return [(name.lower().encode('latin-1'), str(value).encode('latin-1')) for name, value in headers.items()]
+
+
+def _environ(scope, path, body):
+    """The WSGI environ for an ASGI HTTP scope whose body has been read."""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode().decode('latin-1'),
+        'PATH_INFO': path.encode().decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        key = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if key == 'CONTENT_LENGTH':
+            continue
+        if key != 'CONTENT_TYPE':
+            key = f'HTTP_{key}'
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
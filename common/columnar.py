@@ -0,0 +1,155 @@
+"""
+Column-per-file NumPy store for the company CSVs.
+
+Each column is saved as an uncompressed ``.npy`` file (string columns as
+categorical codes plus a category list, integer columns in the narrowest
+type that holds them) next to a ``manifest.json``. Loading
+memory-maps every file read-only, so worker processes on the same host share
+the page cache instead of each parsing and holding their own copy. With
+--sort-by the rows are stored stably sorted by one column, so a reader that
+groups by it finds each group contiguous without reordering (and so
+copying) the mapped columns.
+
+    python -m common.columnar ingest modified_indian_coal_companies.csv --sort-by CompanyName
+"""
+import argparse
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = 'manifest.json'
+DEFAULT_CATEGORICAL = ['CompanyID', 'CompanyName']
+
+
+def store_path(csv_path):
+    """Default store directory for a CSV: foo.csv -> foo.store"""
+    return os.path.splitext(csv_path)[0] + '.store'
+
+
+def downcast(values):
+    """
+    Integer values in the narrowest signed type that holds their range, so
+    the conversion is lossless. Other dtypes are returned unchanged: float32
+    cannot hold the ledger's ratios exactly, and sums of it lose precision.
+    """
+    values = np.asarray(values)
+    if values.dtype.kind not in 'iu' or not len(values):
+        return values
+    low, high = values.min(), values.max()
+    for dtype in (np.int8, np.int16, np.int32):
+        if np.dtype(dtype).itemsize >= values.dtype.itemsize:
+            break
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return values.astype(dtype)
+    return values
+
+
+def _source_stamp(csv_path):
+    stat = os.stat(csv_path)
+    return {'path': os.path.basename(csv_path), 'size': stat.st_size, 'mtime': stat.st_mtime}
+
+
+def _file_name(index, suffix):
+    # Column names may contain spaces or slashes, so files are numbered
+    return f'col{index:03d}{suffix}'
+
+
+def ingest(csv_path, out_dir=None, categorical=DEFAULT_CATEGORICAL, sort_by=None):
+    """Convert a CSV into a store directory, rows stably sorted by `sort_by` if given. Returns the directory path."""
+    out_dir = out_dir or store_path(csv_path)
+    os.makedirs(out_dir, exist_ok=True)
+    df = pd.read_csv(csv_path)
+    if sort_by:
+        # Missing values sort last
+        df = df.sort_values(sort_by, kind='stable', ignore_index=True)
+
+    columns = []
+    for i, name in enumerate(df.columns):
+        series = df[name]
+        # Every non-numeric column (object or the pandas string dtype) is stored as codes
+        if name in categorical or not pd.api.types.is_numeric_dtype(series):
+            cat = pd.Categorical(series)
+            data_file = _file_name(i, '.codes.npy')
+            np.save(os.path.join(out_dir, data_file), np.ascontiguousarray(cat.codes))
+            columns.append({'name': name, 'kind': 'categorical', 'file': data_file,
+                            'categories': [str(c) for c in cat.categories]})
+        else:
+            values = downcast(series.to_numpy())
+            if values.dtype.hasobject:
+                raise ValueError(f"Column {name!r} ({series.dtype}) cannot be memory-mapped; "
+                                 f"list it in categorical to store it as codes")
+            data_file = _file_name(i, '.npy')
+            np.save(os.path.join(out_dir, data_file), np.ascontiguousarray(values))
+            columns.append({'name': name, 'kind': 'numeric', 'file': data_file})
+
+    manifest = {'rows': len(df), 'columns': columns, 'sorted_by': sort_by, 'source': _source_stamp(csv_path)}
+    # Write the manifest last so a half-written store is never picked up
+    tmp = os.path.join(out_dir, MANIFEST + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, os.path.join(out_dir, MANIFEST))
+    return out_dir
+
+
+def is_fresh(store_dir, csv_path):
+    """True if store_dir exists and was built from the current csv_path."""
+    manifest_path = os.path.join(store_dir, MANIFEST)
+    if not os.path.exists(manifest_path):
+        return False
+    if not os.path.exists(csv_path):
+        return True
+    with open(manifest_path) as f:
+        source = json.load(f).get('source', {})
+    current = _source_stamp(csv_path)
+    return source.get('size') == current['size'] and source.get('mtime') == current['mtime']
+
+
+def load(store_dir):
+    """Memory-map a store directory into a DataFrame without copying the columns."""
+    with open(os.path.join(store_dir, MANIFEST)) as f:
+        manifest = json.load(f)
+
+    data = {}
+    for col in manifest['columns']:
+        values = np.load(os.path.join(store_dir, col['file']), mmap_mode='r')
+        if col['kind'] == 'categorical':
+            dtype = pd.CategoricalDtype(col['categories'])
+            values = pd.Categorical.from_codes(values, dtype=dtype)
+        data[col['name']] = values
+    return pd.DataFrame(data, copy=False)
+
+
+def load_table(csv_path, store_dir=None):
+    """Load from the store when it is up to date, otherwise parse the CSV."""
+    store_dir = store_dir or store_path(csv_path)
+    if is_fresh(store_dir, csv_path):
+        try:
+            return load(store_dir)
+        except ValueError:
+            # e.g. a store written before object columns were refused at ingest
+            logger.exception("Columnar store %s cannot be loaded; parsing %s instead", store_dir, csv_path)
+    return pd.read_csv(csv_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar store for the company CSVs.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    ingest_cmd = sub.add_parser('ingest', help='convert a CSV into a memory-mappable store')
+    ingest_cmd.add_argument('csv')
+    ingest_cmd.add_argument('--out', default=None)
+    ingest_cmd.add_argument('--categorical', nargs='*', default=DEFAULT_CATEGORICAL)
+    ingest_cmd.add_argument('--sort-by', default=None, help='store the rows sorted by this column')
+    args = parser.parse_args()
+
+    out_dir = ingest(args.csv, args.out, args.categorical, args.sort_by)
+    print(f"Wrote store '{out_dir}'")
+
+
+if __name__ == '__main__':
+    main()
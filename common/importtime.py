@@ -0,0 +1,97 @@
+"""
+Import-time profile of an app's startup, built on `python -X importtime`.
+
+Imports the app module in a fresh interpreter (without starting its
+server), then reports the wall time of the import, the time until its
+background warm-up finished, and the slowest modules by cumulative and by
+self time.
+
+    python -m common.importtime Model1/app.py
+    python -m common.importtime Model5/app.py --top 15 --no-warmup
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Runs in the child: import the app as a module (so app.run() is skipped)
+CHILD = r"""
+import json, os, runpy, sys, time
+sys.path.insert(0, {directory!r})
+start = time.perf_counter()
+module = runpy.run_path({path!r}, run_name='__importtime__')
+imported = time.perf_counter() - start
+warmup = module.get('warmup')
+ready = None
+if warmup is not None and {wait!r}:
+    warmup.wait()
+    ready = time.perf_counter() - start
+print('IMPORTTIME ' + json.dumps({{'import_s': imported, 'ready_s': ready,
+                                   'warmup': warmup.status() if warmup is not None else None}}))
+"""
+
+
+def parse(stderr):
+    """[(depth, module, self_us, cumulative_us)] from -X importtime output."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        stripped = name.lstrip()
+        depth = (len(name) - len(stripped) - 1) // 2
+        entries.append((depth, stripped.strip(), int(self_us), int(cumulative_us)))
+    return entries
+
+
+def profile(path, wait=True):
+    path = os.path.abspath(path)
+    directory = os.path.dirname(path)
+    code = CHILD.format(directory=directory, path=path, wait=wait)
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=directory,
+                          capture_output=True, text=True)
+    summary = None
+    for line in proc.stdout.splitlines():
+        if line.startswith('IMPORTTIME '):
+            summary = json.loads(line[len('IMPORTTIME '):])
+    if proc.returncode or summary is None:
+        raise RuntimeError(f'Importing {path} failed:\n{proc.stderr[-2000:]}')
+    return summary, parse(proc.stderr)
+
+
+def report(path, summary, entries, top=20):
+    lines = [f"{path}: imported in {summary['import_s'] * 1000:.0f} ms"]
+    if summary['ready_s'] is not None:
+        warmup = summary['warmup']
+        state = 'ready' if warmup['ready'] else f"failed ({warmup['error']})"
+        lines.append(f"  models {state} after {summary['ready_s'] * 1000:.0f} ms")
+    # Nested imports are reported before their parent, so totals come from depth 0
+    total_us = sum(cumulative for depth, _, _, cumulative in entries if depth == 0)
+    lines.append(f"  {len(entries)} modules, {total_us / 1000:.0f} ms in imports (interpreter startup included)")
+
+    lines.append(f"\n  {'cumulative ms':>14}  top-level import")
+    top_level = sorted((e for e in entries if e[0] == 0), key=lambda e: e[3], reverse=True)
+    lines += [f"  {cumulative / 1000:>14.1f}  {name}" for _, name, _, cumulative in top_level[:top]]
+
+    lines.append(f"\n  {'self ms':>14}  module")
+    by_self = sorted(entries, key=lambda e: e[2], reverse=True)
+    lines += [f"  {self_us / 1000:>14.1f}  {name}" for _, name, self_us, _ in by_self[:top]]
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('apps', nargs='+', help='paths to app.py files')
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--no-warmup', action='store_true', help="don't wait for background model loading")
+    args = parser.parse_args()
+
+    for path in args.apps:
+        summary, entries = profile(path, wait=not args.no_warmup)
+        print(report(path, summary, entries, args.top))
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,396 @@
+"""
+Request metrics for the Flask apps, in the Prometheus text format.
+
+    metrics = Metrics('model1').init_app(app)
+    metrics.track_warmup(warmup)
+    metrics.track_cache('responses', response_cache)
+
+    with timer('predict'):
+        predicted = model.predict(features)
+
+init_app records a latency histogram per endpoint (the route rule, so
+/results/<result_id> is one series), keeps an in-flight gauge, times JSON
+encoding as the 'serialize' stage and serves everything at /metrics.
+timer() adds to the per-stage histogram of the app serving the current
+request and does nothing elsewhere (background threads use
+metrics.timer(), which always records). The registry is per process:
+under the gateway every app reports into the same one, told apart by the
+`app` label, and each gunicorn worker reports only its own requests.
+
+Setting METRICS_PROFILE_SLOW_MS turns on the sampling profiler. The stacks
+of each request's thread are sampled every METRICS_PROFILE_INTERVAL_MS
+(5 ms by default). A request that takes longer than the threshold has
+its samples written to METRICS_PROFILE_DIR as a folded-stack file, which
+flamegraph.pl or speedscope can draw.
+"""
+import logging
+import math
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import Response, g, request
+from flask.json.provider import DefaultJSONProvider
+
+logger = logging.getLogger(__name__)
+
+# Seconds; from a cache hit to a multi-second report or chart
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+def _format_value(value):
+    if value is None:
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Per-bucket counts (made cumulative when rendered), sum, count
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} histogram'
+        with self._lock:
+            series = [(labels, list(counts), total, n) for labels, (counts, total, n) in self._series.items()]
+        names = self.labelnames + ('le',)
+        for labels, counts, total, n in sorted(series):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield f'{self.name}_bucket{_format_labels(names, labels + (_format_value(bound),))} {cumulative}'
+            yield f'{self.name}_bucket{_format_labels(names, labels + ("+Inf",))} {n}'
+            yield f'{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}'
+            yield f'{self.name}_count{_format_labels(self.labelnames, labels)} {n}'
+
+
+class Gauge:
+    def __init__(self, name, help, labelnames, kind='gauge'):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.kind = kind
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, labels, amount=1):
+        self.inc(labels, -amount)
+
+    def render(self):
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} {self.kind}'
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}'
+
+
+class CallbackGauge:
+    """A metric family read from callbacks when /metrics is scraped."""
+
+    def __init__(self, name, help, labelnames, kind='gauge'):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.kind = kind
+        self._callbacks = {}
+        self._lock = threading.Lock()
+
+    def set_function(self, labels, fn):
+        with self._lock:
+            self._callbacks[labels] = fn
+
+    def render(self):
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} {self.kind}'
+        with self._lock:
+            callbacks = sorted(self._callbacks.items())
+        for labels, fn in callbacks:
+            try:
+                value = fn()
+            except Exception:
+                logger.exception('Reading %s failed', self.name)
+                continue
+            yield f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}'
+
+
+class Registry:
+    """Metric families by name; each is created once and shared by every app in the process."""
+
+    def __init__(self):
+        self._families = {}
+        self._lock = threading.Lock()
+
+    def _family(self, cls, name, help, labelnames, **kwargs):
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = self._families[name] = cls(name, help, labelnames, **kwargs)
+            elif not isinstance(family, cls) or family.labelnames != tuple(labelnames):
+                raise ValueError(f'Metric {name} is already registered with other labels')
+            return family
+
+    def histogram(self, name, help, labelnames, buckets=LATENCY_BUCKETS):
+        return self._family(Histogram, name, help, labelnames, buckets=buckets)
+
+    def gauge(self, name, help, labelnames):
+        return self._family(Gauge, name, help, labelnames)
+
+    def counter(self, name, help, labelnames):
+        return self._family(Gauge, name, help, labelnames, kind='counter')
+
+    def callback(self, name, help, labelnames, kind='gauge'):
+        return self._family(CallbackGauge, name, help, labelnames, kind=kind)
+
+    def render(self):
+        with self._lock:
+            families = [self._families[name] for name in sorted(self._families)]
+        lines = [line for family in families for line in family.render()]
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+# The Metrics of the app serving the request on this thread
+_local = threading.local()
+
+
+@contextmanager
+def timer(stage):
+    """Time a block into the current request's app; a no-op outside a request."""
+    metrics = getattr(_local, 'metrics', None)
+    if metrics is None:
+        yield
+        return
+    with metrics.timer(stage):
+        yield
+
+
+class SlowRequestProfiler:
+    """
+    Samples the stacks of threads serving requests from one background
+    thread, and writes the samples of requests slower than `threshold`
+    seconds as folded stacks ("frame;frame;frame count" per line).
+    """
+
+    def __init__(self, threshold, directory, interval=0.005):
+        self.threshold = threshold
+        self.directory = directory
+        self.interval = interval
+        self.dumped = 0
+        self._active = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pid = None
+
+    def _ensure_thread(self):
+        # Once per process: a thread started before a fork does not exist in the child
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name='metrics-profiler', daemon=True).start()
+
+    def begin(self):
+        thread_id = threading.get_ident()
+        with self._lock:
+            self._ensure_thread()
+            self._active[thread_id] = Counter()
+        self._wake.set()
+        return thread_id
+
+    def end(self, thread_id, seconds, name):
+        """Stop sampling the thread; returns the written path when the request was slow."""
+        with self._lock:
+            samples = self._active.pop(thread_id, None)
+        if not samples or seconds < self.threshold:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        slug = re.sub(r'[^A-Za-z0-9_.-]+', '_', name)
+        path = os.path.join(self.directory, f"{slug}-{time.strftime('%Y%m%d-%H%M%S')}"
+                                            f"-{int(seconds * 1000)}ms-{thread_id}.folded")
+        with open(path, 'w') as f:
+            for stack, count in samples.most_common():
+                f.write(f'{stack} {count}\n')
+        self.dumped += 1
+        return path
+
+    def _run(self):
+        me = threading.get_ident()
+        while True:
+            with self._lock:
+                idle = not self._active
+                if idle:
+                    self._wake.clear()
+            if idle:
+                self._wake.wait()
+                continue
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, samples in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None and thread_id != me:
+                        samples[self._stack(frame)] += 1
+
+    @staticmethod
+    def _stack(frame):
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+
+class _TimedJSONProvider(DefaultJSONProvider):
+    def dumps(self, obj, **kwargs):
+        with timer('serialize'):
+            return super().dumps(obj, **kwargs)
+
+
+class Metrics:
+    def __init__(self, app_name, registry=REGISTRY, profile_slow_ms=None):
+        self.app_name = app_name
+        self.registry = registry
+        self._requests = registry.histogram(
+            'http_request_duration_seconds', 'Time spent handling requests, by route.',
+            ('app', 'endpoint', 'method', 'status'))
+        self._in_flight = registry.gauge(
+            'http_requests_in_flight', 'Requests being handled right now.', ('app',))
+        self._stages = registry.histogram(
+            'stage_duration_seconds', 'Time spent in timed stages (model load, predict, serialize, ...).',
+            ('app', 'stage'))
+
+        if profile_slow_ms is None and os.environ.get('METRICS_PROFILE_SLOW_MS'):
+            profile_slow_ms = float(os.environ['METRICS_PROFILE_SLOW_MS'])
+        self.profiler = None
+        if profile_slow_ms is not None:
+            directory = os.environ.get('METRICS_PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'profiles'))
+            interval = float(os.environ.get('METRICS_PROFILE_INTERVAL_MS', 5)) / 1000
+            self.profiler = SlowRequestProfiler(profile_slow_ms / 1000, directory, interval)
+            registry.callback('slow_request_profiles_total', 'Slow request profiles written.',
+                              ('app',), kind='counter').set_function((app_name,), lambda: self.profiler.dumped)
+
+    def init_app(self, app, path='/metrics'):
+        app.extensions['metrics'] = self
+        app.json = _TimedJSONProvider(app)
+        app.before_request(self._before)
+        app.after_request(self._after)
+        app.teardown_request(self._teardown)
+        app.add_url_rule(path, 'metrics', self.view)
+        return self
+
+    @contextmanager
+    def timer(self, stage):
+        """Time a block into this app's stage histogram (from any thread)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._stages.observe((self.app_name, stage), time.perf_counter() - start)
+
+    def track_cache(self, name, cache):
+        """Export a cache whose stats() has hits, misses and entries (ResponseCache, PriceCache, ...)."""
+        labels = (self.app_name, name)
+        stat = lambda key: lambda: cache.stats().get(key)  # noqa: E731
+        self.registry.callback('cache_hits_total', 'Cache lookups that found an entry.',
+                               ('app', 'cache'), kind='counter').set_function(labels, stat('hits'))
+        self.registry.callback('cache_misses_total', 'Cache lookups that missed.',
+                               ('app', 'cache'), kind='counter').set_function(labels, stat('misses'))
+        self.registry.callback('cache_hit_ratio', 'Hits over lookups since start (NaN before the first).',
+                               ('app', 'cache')).set_function(labels, stat('hit_ratio'))
+        self.registry.callback('cache_entries', 'Entries held by the cache.',
+                               ('app', 'cache')).set_function(labels, stat('entries'))
+        return self
+
+    def track_warmup(self, warmup):
+        """Export a common.warmup.Warmup: readiness and how long the models took to load."""
+        labels = (self.app_name,)
+        self.registry.callback('model_ready', '1 once the models are loaded.',
+                               ('app',)).set_function(labels, lambda: int(warmup.ready))
+        self.registry.callback('model_load_seconds', 'Time the background model load took.',
+                               ('app',)).set_function(labels, lambda: warmup.load_seconds)
+        return self
+
+    def bind_thread(self):
+        """Make timer() record into this app on the calling thread (a worker pool's initializer)."""
+        _local.metrics = self
+
+    def request_started(self):
+        """Count a request served outside Flask (common.asgi) as in flight."""
+        self._in_flight.inc((self.app_name,))
+
+    def request_finished(self, endpoint, method, status, seconds):
+        """Record a request begun with request_started()."""
+        self._requests.observe((self.app_name, endpoint, method, str(status)), seconds)
+        self._in_flight.dec((self.app_name,))
+
+    def _before(self):
+        _local.metrics = self
+        g._metrics_start = time.perf_counter()
+        g._metrics_status = 500
+        self._in_flight.inc((self.app_name,))
+        if self.profiler is not None:
+            g._metrics_profile = self.profiler.begin()
+
+    def _after(self, response):
+        g._metrics_status = response.status_code
+        return response
+
+    def _teardown(self, exc):
+        start = g.pop('_metrics_start', None)
+        if start is None:
+            return
+        seconds = time.perf_counter() - start
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        self._requests.observe((self.app_name, endpoint, request.method, str(g.pop('_metrics_status'))), seconds)
+        self._in_flight.dec((self.app_name,))
+        _local.metrics = None
+        if self.profiler is not None:
+            path = self.profiler.end(g.pop('_metrics_profile'), seconds, f'{self.app_name}-{request.endpoint}')
+            if path:
+                logger.warning('%s %s took %.0f ms; profile written to %s',
+                               request.method, request.path, seconds * 1000, path)
+
+    def view(self):
+        return Response(self.registry.render(), content_type=CONTENT_TYPE)
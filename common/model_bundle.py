@@ -0,0 +1,209 @@
+"""
+Versioned single-artefact bundles for the trained models.
+
+A bundle is a directory holding one uncompressed joblib file with every
+component a service needs (estimator, scaler, encoder, ...) and a
+``manifest.json`` with the bundle version, the library versions it was
+built with, the feature columns in model order and the sha256 of the
+joblib file. Loading checks the hash before unpickling and can memory-map
+the NumPy arrays inside (joblib's mmap_mode), so workers on one host share
+them through the page cache. sklearn's tree estimators copy their node
+arrays into their own buffers when unpickled, so for forests the gain is
+one read instead of several and an integrity check, not shared memory.
+
+    python -m common.model_bundle pack Model1/model/model1.bundle \\
+        estimator=Model1/model/model4.pkl scaler=Model1/model/scaler4.pkl \\
+        encoder=Model1/model/label_encoder4.pkl
+    python -m common.model_bundle pack Model2/model/model2.bundle \\
+        estimator=Model2/model/carbonCreditPrice1.pkl
+    python -m common.model_bundle pack Model5/model/model5.bundle \\
+        estimator=Model5/model/carbon_emission_model1.pkl
+    python -m common.model_bundle inspect Model1/model/model1.bundle
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import sys
+import warnings
+from datetime import datetime, timezone
+
+MANIFEST = 'manifest.json'
+PAYLOAD = 'bundle.joblib'
+FORMAT_VERSION = 1
+
+
+class BundleError(Exception):
+    """The bundle is missing, corrupt or does not match what the service expects."""
+
+
+def _digest(path, block_size=1 << 20):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def _library_versions():
+    import joblib
+    import numpy
+    import sklearn
+    return {'python': platform.python_version(), 'numpy': numpy.__version__,
+            'scikit-learn': sklearn.__version__, 'joblib': joblib.__version__}
+
+
+def _feature_names(components):
+    for component in components.values():
+        names = getattr(component, 'feature_names_in_', None)
+        if names is not None:
+            return [str(name) for name in names]
+    return None
+
+
+def save_bundle(path, components, feature_columns=None, version=None, metadata=None):
+    """
+    Write `components` (name -> fitted object) as a bundle directory.
+
+    feature_columns defaults to the first component's feature_names_in_.
+    Returns the manifest.
+    """
+    import joblib
+
+    feature_columns = list(feature_columns) if feature_columns is not None else _feature_names(components)
+    if not feature_columns:
+        raise BundleError('feature_columns are required when no component records feature_names_in_')
+
+    os.makedirs(path, exist_ok=True)
+    payload = os.path.join(path, PAYLOAD)
+    tmp = f'{payload}.{os.getpid()}.tmp'
+    # compress=0 keeps arrays as raw, aligned buffers that mmap_mode can map
+    joblib.dump(dict(components), tmp, compress=0)
+    os.replace(tmp, payload)
+
+    created = datetime.now(timezone.utc)
+    manifest = {
+        'format': FORMAT_VERSION,
+        'version': version or created.strftime('%Y%m%d%H%M%S'),
+        'created': created.isoformat(timespec='seconds'),
+        'components': sorted(components),
+        'feature_columns': feature_columns,
+        'sha256': _digest(payload),
+        'size': os.path.getsize(payload),
+        'libraries': _library_versions(),
+        'metadata': metadata or {},
+    }
+    with open(os.path.join(path, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def read_manifest(path):
+    try:
+        with open(os.path.join(path, MANIFEST)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        raise BundleError(f'Unreadable bundle manifest in {path}: {e}') from e
+    if manifest.get('format') != FORMAT_VERSION:
+        raise BundleError(f"Unsupported bundle format {manifest.get('format')!r} in {path}")
+    return manifest
+
+
+class Bundle:
+    """A loaded bundle: components by name plus the manifest."""
+
+    def __init__(self, path, manifest, components):
+        self.path = path
+        self.manifest = manifest
+        self.components = components
+
+    @property
+    def version(self):
+        return self.manifest['version']
+
+    @property
+    def feature_columns(self):
+        return self.manifest['feature_columns']
+
+    def __getitem__(self, name):
+        try:
+            return self.components[name]
+        except KeyError:
+            raise BundleError(f'Bundle {self.path} has no {name!r} component') from None
+
+    def get(self, name, default=None):
+        return self.components.get(name, default)
+
+    def require_features(self, columns):
+        """Fail if the bundle was built for a different feature order."""
+        if list(columns) != self.feature_columns:
+            raise BundleError(f'Bundle {self.path} expects features {self.feature_columns}, '
+                              f'the service sends {list(columns)}')
+        return self
+
+
+def load_bundle(path, mmap=True, verify=True):
+    """
+    Load a bundle directory.
+
+    verify checks the payload against the manifest's sha256 first; mmap
+    maps its arrays read-only instead of copying them into the heap.
+    """
+    import joblib
+
+    manifest = read_manifest(path)
+    payload = os.path.join(path, PAYLOAD)
+    if not os.path.exists(payload):
+        raise BundleError(f'Bundle {path} has no {PAYLOAD}')
+    if verify and _digest(payload) != manifest['sha256']:
+        raise BundleError(f'Bundle {path} does not match its manifest hash')
+
+    built_with = manifest.get('libraries', {}).get('scikit-learn')
+    current = _library_versions()['scikit-learn']
+    if built_with and built_with != current:
+        warnings.warn(f'Bundle {path} was built with scikit-learn {built_with}, running {current}')
+
+    components = joblib.load(payload, mmap_mode='r' if mmap else None)
+    missing = set(manifest['components']) - set(components)
+    if missing:
+        raise BundleError(f"Bundle {path} is missing components: {', '.join(sorted(missing))}")
+    return Bundle(path, manifest, components)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    pack = sub.add_parser('pack', help='bundle pickled components')
+    pack.add_argument('bundle')
+    pack.add_argument('components', nargs='+', metavar='name=path', help='pickle or joblib file per component')
+    pack.add_argument('--features', nargs='+', help="feature columns (default: the estimator's feature_names_in_)")
+    pack.add_argument('--version')
+
+    inspect = sub.add_parser('inspect', help='print and verify a manifest')
+    inspect.add_argument('bundle')
+
+    args = parser.parse_args()
+    if args.command == 'pack':
+        import joblib
+        components, sources = {}, {}
+        for spec in args.components:
+            name, sep, source = spec.partition('=')
+            if not sep:
+                parser.error(f'expected name=path, got {spec!r}')
+            components[name] = joblib.load(source)
+            sources[name] = os.path.basename(source)
+        manifest = save_bundle(args.bundle, components, args.features, args.version,
+                               metadata={'sources': sources})
+        print(json.dumps(manifest, indent=2))
+    else:
+        manifest = read_manifest(args.bundle)
+        ok = _digest(os.path.join(args.bundle, PAYLOAD)) == manifest['sha256']
+        print(json.dumps(manifest, indent=2))
+        print('hash: ok' if ok else 'hash: MISMATCH')
+        sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
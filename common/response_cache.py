@@ -0,0 +1,120 @@
+"""
+In-process cache for JSON endpoints whose output only changes with the data.
+
+Entries are keyed by endpoint, view arguments, query string and the current
+data version. Handlers that change what the cached endpoints return call
+``bump()``, which moves to a new version and drops the old entries. State
+shared with other processes can also feed the version through
+``version_source``, a callable returning a counter that changes with it. Every
+cached response carries a strong ETag, so a polling client that sends it
+back in If-None-Match gets an empty 304.
+
+    cache = ResponseCache(max_entries=256)
+
+    @app.route('/api/companies')
+    @cache.cached
+    def get_all_companies(): ...
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, jsonify, make_response, request
+
+
+class ResponseCache:
+    def __init__(self, max_entries=256, version_source=None):
+        self.max_entries = max_entries
+        self.version_source = version_source
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def bump(self):
+        """Mark the underlying data as changed."""
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+
+    def _current_version(self):
+        if self.version_source is None:
+            return self.version
+        return (self.version, self.version_source())
+
+    def _key(self, kwargs):
+        args = tuple(sorted(request.args.items(multi=True)))
+        return (request.endpoint, tuple(sorted(kwargs.items())), args, self._current_version())
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def _put(self, key, entry):
+        version = self._current_version()
+        with self._lock:
+            # A bump while the view was running makes this entry stale already
+            if key[-1] != version:
+                return
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                # Entries from an older external version are evicted here too
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def cached(self, view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = self._key(kwargs)
+            entry = self._get(key)
+            if entry is None:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                body = response.get_data()
+                # Custom headers (e.g. X-Total-Count) are part of the cached response
+                extra = [(k, v) for k, v in response.headers.items() if k.startswith('X-')]
+                entry = (body, hashlib.sha256(body).hexdigest(), response.mimetype, extra)
+                self._put(key, entry)
+
+            body, etag, mimetype, extra = entry
+            if request.if_none_match.contains(etag):
+                with self._lock:
+                    self.not_modified += 1
+                response = Response(status=304)
+            else:
+                response = Response(body, mimetype=mimetype)
+            response.headers.extend(extra)
+            response.set_etag(etag)
+            # Let browsers keep the body but always revalidate with the ETag
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'version': self.version,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'not_modified': self.not_modified,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+            }
+
+    def stats_view(self):
+        return jsonify(self.stats())
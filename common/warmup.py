@@ -0,0 +1,103 @@
+"""
+Background model loading, so a service answers `/` and health checks while
+its pickles are still being read.
+
+    def load_models():
+        global model
+        model = joblib.load(...)
+
+    warmup = Warmup(load_models).start()
+    app.add_url_rule('/healthz', view_func=warmup.health_view)
+    app.add_url_rule('/readyz', view_func=warmup.readiness_view)
+
+    @app.route('/predict', methods=['POST'])
+    @warmup.required
+    def predict(): ...
+
+Views behind `required` wait up to `request_wait` seconds for the load to
+finish and then answer 503 with Retry-After. The loader runs once per
+process: if the process forks before it has finished (gunicorn preload),
+the child starts its own load on first use instead of waiting on a thread
+that only exists in the parent.
+"""
+import logging
+import os
+import threading
+import time
+from functools import wraps
+
+from flask import jsonify
+
+logger = logging.getLogger(__name__)
+
+
+class Warmup:
+    def __init__(self, load, name='models', request_wait=5.0):
+        self.load = load
+        self.name = name
+        self.request_wait = request_wait
+        self.error = None
+        self.load_seconds = None
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def start(self):
+        """Start loading in the background (once per process)."""
+        with self._lock:
+            if self._pid != os.getpid() and not self._done.is_set():
+                self._pid = os.getpid()
+                self.error = None
+                threading.Thread(target=self._run, name=f'warmup-{self.name}', daemon=True).start()
+        return self
+
+    def _run(self):
+        started = time.perf_counter()
+        try:
+            self.load()
+        except Exception as e:
+            self.error = f'{type(e).__name__}: {e}'
+            logger.exception('Loading %s failed', self.name)
+        self.load_seconds = round(time.perf_counter() - started, 3)
+        self._done.set()
+
+    @property
+    def ready(self):
+        return self._done.is_set() and self.error is None
+
+    def wait(self, timeout=None):
+        """Block until loading has finished; True if it succeeded."""
+        self.start()
+        self._done.wait(timeout)
+        return self.ready
+
+    def status(self):
+        return {
+            'name': self.name,
+            'ready': self.ready,
+            'loading': not self._done.is_set(),
+            'error': self.error,
+            'load_seconds': self.load_seconds,
+        }
+
+    def unavailable_message(self):
+        return f'{self.name} failed to load' if self.error else f'{self.name} are still loading'
+
+    def required(self, view):
+        """Answer 503 from `view` until the models are loaded."""
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not self.wait(self.request_wait):
+                response = jsonify({'error': self.unavailable_message()})
+                response.status_code = 503
+                response.headers['Retry-After'] = '5'
+                return response
+            return view(*args, **kwargs)
+        return wrapper
+
+    def health_view(self):
+        return jsonify({'status': 'ok'})
+
+    def readiness_view(self):
+        status = self.status()
+        return jsonify(status), 200 if status['ready'] else 503
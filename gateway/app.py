@@ -0,0 +1,148 @@
+"""
+One WSGI application serving the dashboard and all six model apps.
+
+    /          Main-Dashboard
+    /model1    Neutralisation pathway (Model1)
+    ...
+    /model6    BCCL dashboard (Model6)
+    /healthz   liveness
+    /readyz    per-app readiness, 503 until every app has loaded
+    /metrics   Prometheus metrics of every app in this worker (common.metrics)
+
+Every app is imported here, at module load, and the gateway waits for
+their background model warm-ups (common.warmup) to finish, so under
+gunicorn with preload_app (see gunicorn.conf.py) the pickles, scalers,
+encoders and pandas frames are read once in the master and shared
+copy-on-write by the forked workers. The warm-ups run concurrently. An app
+that fails to load answers 503 under its prefix instead of taking the
+others down.
+
+    gunicorn -c gateway/gunicorn.conf.py gateway.app:app
+    python gateway/app.py            # development server on port 8000
+"""
+import importlib.util
+import json
+import logging
+import os
+import sys
+import time
+
+from flask import Flask, Response, jsonify
+from werkzeug.middleware.dispatcher import DispatcherMiddleware
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+from common.metrics import CONTENT_TYPE, REGISTRY  # noqa: E402
+
+# URL prefix -> directory holding the app's app.py
+APPS = {
+    '/model1': 'Model1',
+    '/model2': 'Model2',
+    '/model3': 'Model3',
+    '/model4': 'Model4',
+    '/model5': 'Model5',
+    '/model6': 'Model6',
+}
+DASHBOARD = 'Main-Dashboard'
+
+logger = logging.getLogger(__name__)
+
+
+class MountedApp:
+    """
+    Readiness gate in front of one sub-app: requests pass through once the
+    app has been imported, and get a 503 with the load error otherwise.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.app = None
+        self.warmup = None
+        self.error = 'not loaded'
+        self.load_seconds = None
+
+    def load(self):
+        path = os.path.join(ROOT, self.directory, 'app.py')
+        # Sibling modules (recommender, pricing, ledger, ...) are imported by bare name
+        sys.path.insert(0, os.path.dirname(path))
+        module_name = self.directory.replace('-', '_').lower() + '_app'
+        t0 = time.perf_counter()
+        try:
+            spec = importlib.util.spec_from_file_location(module_name, path)
+            module = importlib.util.module_from_spec(spec)
+            sys.modules[module_name] = module
+            spec.loader.exec_module(module)
+        except Exception as e:
+            sys.modules.pop(module_name, None)
+            self.error = f'{type(e).__name__}: {e}'
+            logger.exception('Failed to load %s', self.directory)
+        else:
+            self.app = module.app
+            self.warmup = module.__dict__.get('warmup')
+            self.error = None
+        self.load_seconds = round(time.perf_counter() - t0, 3)
+        return self
+
+    @property
+    def ready(self):
+        return self.app is not None and (self.warmup is None or self.warmup.ready)
+
+    def status(self):
+        return {'ready': self.ready, 'error': self.error, 'load_seconds': self.load_seconds,
+                'warmup': self.warmup.status() if self.warmup is not None else None}
+
+    def __call__(self, environ, start_response):
+        if self.app is not None:
+            return self.app(environ, start_response)
+        start_response('503 Service Unavailable', [('Content-Type', 'application/json'), ('Retry-After', '5')])
+        body = {'error': f'{self.directory} is not available', 'detail': self.error}
+        return [json.dumps(body).encode()]
+
+
+started = time.perf_counter()
+dashboard = MountedApp(DASHBOARD).load()
+mounts = {prefix: MountedApp(directory).load() for prefix, directory in APPS.items()}
+for mount in mounts.values():
+    if mount.warmup is not None:
+        mount.warmup.wait()
+startup_seconds = round(time.perf_counter() - started, 3)
+
+if dashboard.ready:
+    # The dashboard's iframes point at the mounts on this origin
+    dashboard.app.config['MODEL_URLS'] = {directory.lower(): prefix for prefix, directory in APPS.items()}
+
+# Health endpoints live in their own tiny app so they answer even if the dashboard failed
+health = Flask(__name__)
+
+
+@health.route('/healthz')
+def healthz():
+    return jsonify({'status': 'ok'})
+
+
+@health.route('/readyz')
+def readyz():
+    apps = {mount.directory: mount.status() for mount in [dashboard, *mounts.values()]}
+    ready = all(status['ready'] for status in apps.values())
+    return jsonify({'ready': ready, 'startup_seconds': startup_seconds, 'pid': os.getpid(), 'apps': apps}), \
+        200 if ready else 503
+
+
+@health.route('/metrics')
+def metrics():
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+
+def root(environ, start_response):
+    if environ.get('PATH_INFO') in ('/healthz', '/readyz', '/metrics'):
+        return health(environ, start_response)
+    return dashboard(environ, start_response)
+
+
+app = DispatcherMiddleware(root, mounts)
+
+
+if __name__ == '__main__':
+    from werkzeug.serving import run_simple
+    run_simple('0.0.0.0', int(os.environ.get('GATEWAY_PORT', 8000)), app, threaded=True)
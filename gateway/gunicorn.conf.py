@@ -0,0 +1,29 @@
+# Production server for the dashboard and all six model apps:
+#
+#     gunicorn -c gateway/gunicorn.conf.py gateway.app:app
+#
+# preload_app imports every app (and reads every pickle and ledger) once in
+# the master before forking, so workers share those pages copy-on-write.
+# gc.freeze() moves the preloaded objects out of the collector's reach, so
+# collections in the workers don't write to (and un-share) their pages.
+#
+# Threads rather than gevent: monkey-patching after the preload would leave
+# the apps holding unpatched locks. Each open Model6 /api/events stream ties
+# up one thread, so raise GATEWAY_THREADS for many live dashboards (or keep
+# Model6 on its own gevent server). With more than one worker set
+# EVENT_HUB_URL=redis://... so every worker sees the same events.
+import gc
+import os
+
+bind = os.environ.get('GATEWAY_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GATEWAY_WORKERS', 2))
+threads = int(os.environ.get('GATEWAY_THREADS', 16))
+worker_class = 'gthread'
+preload_app = True
+chdir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+timeout = 60
+keepalive = 75
+
+
+def pre_fork(server, worker):
+    gc.freeze()
@@ -0,0 +1,112 @@
+"""
+FlatForest (Model1/forest.py) must predict exactly what the sklearn model
+it was flattened from predicts, so the 'flat' and 'sklearn' backends of
+Model1 recommend the same strategies.
+
+    python -m pytest tests
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.preprocessing import StandardScaler
+from sklearn.tree import DecisionTreeRegressor
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'Model1'))
+from forest import FlatForest  # noqa: E402
+from recommender import FEATURE_COLUMNS, NUMERIC_COLS, build_features, recommend  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(400, 5))
+    y = X[:, 0] * 3 + np.sin(X[:, 1]) + rng.normal(scale=0.1, size=len(X))
+    return X, y
+
+
+def assert_same(model, X):
+    np.testing.assert_array_equal(FlatForest.from_sklearn(model).predict(X), model.predict(X))
+
+
+def test_forest_matches_sklearn(data):
+    X, y = data
+    model = RandomForestRegressor(n_estimators=25, random_state=0).fit(X, y)
+    assert_same(model, np.random.default_rng(1).normal(size=(1000, 5)))
+
+
+def test_single_tree_matches_sklearn(data):
+    X, y = data
+    assert_same(DecisionTreeRegressor(max_depth=6, random_state=0).fit(X, y), X)
+
+
+def test_one_leaf_trees(data):
+    X, _ = data
+    # A constant target leaves every tree a single leaf (max_depth 0)
+    model = RandomForestRegressor(n_estimators=5, random_state=0).fit(X, np.full(len(X), 2.5))
+    assert FlatForest.from_sklearn(model).max_depth == 0
+    assert_same(model, X)
+
+
+def test_one_leaf_trees_mixed_with_deep_ones(data):
+    X, y = data
+    model = RandomForestRegressor(n_estimators=10, random_state=0).fit(X, y)
+    stump = DecisionTreeRegressor().fit(X, np.full(len(X), 7.0))
+    model.estimators_[3] = stump
+    assert stump.tree_.node_count == 1
+    assert_same(model, X)
+
+
+def test_threshold_boundary_inputs(data):
+    X, y = data
+    model = RandomForestRegressor(n_estimators=10, max_depth=8, random_state=0).fit(X, y)
+    flat = FlatForest.from_sklearn(model)
+    # Inputs sitting exactly on split thresholds, and one float32 step either side
+    split = flat.threshold != np.inf
+    thresholds = flat.threshold[split].astype(np.float32)
+    features = flat.feature[split]
+    rows = []
+    for delta in (0, -np.inf, np.inf):
+        values = thresholds if delta == 0 else np.nextafter(thresholds, np.float32(delta))
+        boundary = np.tile(X[:len(values)].astype(np.float32).mean(axis=0), (len(values), 1))
+        boundary[np.arange(len(values)), features] = values
+        rows.append(boundary)
+    assert_same(model, np.vstack(rows))
+
+
+def test_rejects_non_finite_inputs(data):
+    X, y = data
+    flat = FlatForest.from_sklearn(DecisionTreeRegressor(max_depth=3).fit(X, y))
+    with pytest.raises(ValueError):
+        flat.predict(np.full((1, 5), np.inf))
+
+
+def test_rejects_multi_output_models(data):
+    X, y = data
+    with pytest.raises(ValueError):
+        FlatForest.from_sklearn(DecisionTreeRegressor(max_depth=3).fit(X, np.column_stack([y, y])))
+
+
+def test_recommend_backends_agree():
+    rng = np.random.default_rng(2)
+    strategy_codes = np.arange(5)
+    emissions, costs = 10 ** rng.uniform(1, 7, 300), 10 ** rng.uniform(3, 9, 300)
+
+    # The model is trained like Model1's: scaled numeric columns, on a named frame
+    scaler = StandardScaler().fit(pd.DataFrame(
+        np.column_stack([emissions, costs, costs / emissions, np.log1p(costs), np.log1p(emissions)]),
+        columns=NUMERIC_COLS))
+    features = build_features(emissions, costs, strategy_codes, scaler)
+    target = features[:, 0] * (1 + features[:, 2]) - features[:, 3] + rng.normal(scale=0.1, size=len(features))
+    model = RandomForestRegressor(n_estimators=20, random_state=0).fit(
+        pd.DataFrame(features, columns=FEATURE_COLUMNS), target)
+
+    sk_index, sk_best = recommend(model, scaler, strategy_codes, emissions, costs)
+    flat_index, flat_best = recommend(FlatForest.from_sklearn(model), scaler, strategy_codes, emissions, costs)
+    np.testing.assert_array_equal(flat_index, sk_index)
+    np.testing.assert_array_equal(flat_best, sk_best)